@@ -0,0 +1,6 @@
+# ==============================================================================
+# BENCHMARKS COM DADOS SINTÉTICOS
+# ==============================================================================
+# geradores.py cria TAs, Valorações e NewPiits de qualquer tamanho; rodar.py
+# mede cada etapa. Uso: python -m benchmarks.rodar --help (na pasta Automacoes).
+# ==============================================================================
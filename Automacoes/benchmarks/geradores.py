@@ -0,0 +1,260 @@
+# ==============================================================================
+# GERADORES DE DADOS SINTÉTICOS
+# ==============================================================================
+# TAs, planilhas de Valoração e modelos de NewPiit com a mesma estrutura dos
+# arquivos reais, para medir as ferramentas em qualquer tamanho:
+#   * TA: as 21 tabelas na ordem que `extrair_dados_ta` espera, com os
+#     checkboxes nos três formatos do Word (controle de conteúdo, símbolo
+#     Wingdings e campo de formulário legado);
+#   * Valoração: abas Resumo Geral, Timesheet_<ano> (cabeçalho abaixo de
+#     linhas de título) e Serviços de Terceiros e Viagens, com os totais do
+#     Resumo batendo com as linhas geradas;
+#   * NewPiit: abas GERAL, DISPÊNDIOS ST, DISPÊNDIOS MC e RH com o cabeçalho
+#     na linha 10, linhas antigas formatadas, células mescladas, fórmulas e
+#     validação de dados.
+# Tudo é determinístico a partir da semente.
+# ==============================================================================
+
+import io
+import random
+
+PALAVRAS = (
+    "desenvolvimento de plataforma integrada para monitoramento remoto de processos industriais com "
+    "algoritmos de aprendizado de máquina sensores embarcados análise preditiva de falhas redução do "
+    "consumo de energia validação experimental em ambiente relevante prototipagem ensaios de campo "
+    "otimização de parâmetros modelagem computacional integração com sistemas legados segurança da "
+    "informação novos materiais compósitos rastreabilidade da cadeia produtiva automação de testes"
+).split()
+
+CLASSIFICACOES = ["Pesquisa básica dirigida", "Pesquisa aplicada", "Desenvolvimento experimental"]
+AREAS = ["Tecnologia da Informação e Comunicação", "Química", "Agroindústria e Alimentos", "Mecânica e Transportes", "Eletroeletrônica"]
+NATUREZAS = ["Processos Empresariais", "Produto - Bens", "Produto - Serviços"]
+ODS = [(3, "Saúde e bem-estar"), (7, "Energia limpa e acessível"), (8, "Trabalho decente e crescimento econômico"),
+       (9, "Indústria, inovação e infraestrutura"), (12, "Consumo e produção responsáveis"), (13, "Ação contra a mudança global do clima")]
+ESTILOS_CHECKBOX = ("sdt", "simbolo", "campo")
+
+ESCOLARIDADES = ["Doutor", "mestre", "Superior Completo", "Ensino superior incompleto", "Especialização", "Médio completo",
+                 "Tecnólogo", "Pós-Graduado", "graduado", "Técnico de nível médio", "Ensino Superior Completa", "Fundamental"]
+CARGOS = ["Engenheiro de Software", "Analista de Sistemas", "Estagiario de TI", "Gerente de Projetos", "Técnico de Laboratório", "Pesquisador"]
+PORTES = ["ME", "EPP", "DEMAIS"]
+
+CABECALHO_GERAL = [
+    '#', 'Nome da atividade de PD&I: \xa0', 'Descrição do Projeto:', 'PB, PA ou DE:', 'Área do Projeto:', 'Palavras-Chave (Separadas por vírgula):',
+    'Natureza (Produto, Processo ou Serviço):', 'Destaque o elemento tecnologicamente novo ou inovador da atividade: \xa0',
+    'Qual a barreira ou desafio tecnológico superável: \xa0', 'Qual a metodologia / métodos utilizados: \xa0',
+    'A atividade é contínua (ciclo de vida maior que 1 ano)?\xa0 (Sim ou Não)', 'Data de início: (formato dd/mm/aaaa)',
+    'Previsão de término: (formato dd/mm/aaaa)', 'Caso a atividade/projeto seja continuada, informar Atividade de PD&I desenvolvida no ano-base',
+    'Descrição Complementar: ', 'Resultado Econômico:', 'Resultado de Inovação:', 'TRL Inicial', 'TRL Final', 'Justificativa TRL', 'ODS',
+    'Justificativa ODS', 'Os projetos de PD&I da empresa se alinham com as políticas públicas nacionais? (Sim ou Não)',
+    'Alinhamento do Projeto com Políticas, Programas e Estratégias Governamentais',
+]
+CABECALHO_ST = [
+    '#', 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)', 'TIPO', 'Situação (Contratado, Em Execução, Terminado)',
+    'Prestador de Serviço', 'CNPJ/CPF', 'Caracterizar o Serviço Realizado', 'Valor Total',
+    'Centro, departamento ou grupo de pesquisa da universidade/instituição de pesquisa contratada ',
+    'Centro, Departamento ou Grupo de Pesquisa (caso seja credenciada Embrapii)', 'Código do projeto Embrapii (caso seja credenciada Embrapii)',
+]
+CABECALHO_MC = ['#', 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)', 'Identificação do Material', 'Descrição', 'Valor Total']
+CABECALHO_RH = [
+    '#', 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)', 'CPF', 'NOME', 'TITULAÇÃO', 'FUNÇÃO', 'SEXO',
+    'Total Horas (Anual)', 'DEDICAÇÃO', 'Valor (R$)',
+    'Descreva as atividades realizadas pelo profissional (cargo, atividades exercidas e contribuições no projeto)',
+]
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" xmlns:w14="http://schemas.microsoft.com/office/word/2010/wordml"'
+
+
+def texto(rnd, palavras):
+    """Frase com `palavras` palavras sorteadas."""
+    frase = " ".join(rnd.choice(PALAVRAS) for _ in range(palavras))
+    return frase[0].upper() + frase[1:] + "."
+
+def paragrafos(rnd, quantidade, palavras=60):
+    return "\n".join(texto(rnd, palavras) for _ in range(quantidade))
+
+
+# ------------------------------------------------------------------------------
+# TA (.docx)
+# ------------------------------------------------------------------------------
+def _checkbox(paragrafo, marcado, rotulo, estilo):
+    from docx.oxml import parse_xml
+    if estilo == "sdt":
+        partes = [f'<w:sdt {W}><w:sdtPr><w14:checkbox><w14:checked w14:val="{int(marcado)}"/>'
+                  '<w14:checkedState w14:val="2612" w14:font="MS Gothic"/><w14:uncheckedState w14:val="2610" w14:font="MS Gothic"/>'
+                  f'</w14:checkbox></w:sdtPr><w:sdtContent><w:r><w:t>{"☒" if marcado else "☐"}</w:t></w:r></w:sdtContent></w:sdt>']
+    elif estilo == "simbolo":
+        partes = [f'<w:r {W}><w:sym w:font="Wingdings" w:char="{"F0FE" if marcado else "F0A8"}"/></w:r>']
+    else:
+        partes = [f'<w:r {W}><w:fldChar w:fldCharType="begin"><w:ffData><w:name w:val="Selecionar"/><w:enabled/><w:calcOnExit w:val="0"/>'
+                  f'<w:checkBox><w:sizeAuto/><w:default w:val="{int(marcado)}"/></w:checkBox></w:ffData></w:fldChar></w:r>',
+                  f'<w:r {W}><w:instrText xml:space="preserve"> FORMCHECKBOX </w:instrText></w:r>',
+                  f'<w:r {W}><w:fldChar w:fldCharType="end"/></w:r>']
+    partes.append(f'<w:r {W}><w:t xml:space="preserve"> {rotulo}  </w:t></w:r>')
+    for parte in partes:
+        paragrafo._p.append(parse_xml(parte))
+
+def _tabela_texto(doc, conteudo):
+    tabela = doc.add_table(rows=1, cols=1)
+    tabela.cell(0, 0).text = conteudo
+
+def _tabela_rotulos(doc, pares):
+    tabela = doc.add_table(rows=len(pares), cols=2)
+    for i, (rotulo, valor) in enumerate(pares):
+        tabela.cell(i, 0).text, tabela.cell(i, 1).text = rotulo, valor
+
+def gerar_ta(nome_projeto, seed=0, estilo_checkbox=None, paragrafos_por_campo=2):
+    """
+    Bytes de um TA (.docx) do projeto `nome_projeto`. `estilo_checkbox`:
+    'sdt', 'simbolo' ou 'campo' (padrão: sorteado pela semente).
+    """
+    import docx
+    rnd = random.Random(seed)
+    estilo = estilo_checkbox or rnd.choice(ESTILOS_CHECKBOX)
+    campo = lambda: paragrafos(rnd, paragrafos_por_campo)
+    doc = docx.Document()
+    doc.add_heading("TERMO DE ABERTURA DE PROJETO DE PD&I", level=1)
+
+    tabela = doc.add_table(rows=2, cols=1)                                          # 0
+    tabela.cell(0, 0).text, tabela.cell(1, 0).text = "Nome da atividade de PD&I", nome_projeto
+    inicio = rnd.randint(2018, 2024)
+    _tabela_rotulos(doc, [("Data de início (dia/mês/ano):", f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{inicio}"),
+                          ("Data de término (dia/mês/ano):", f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{inicio + rnd.randint(1, 4)}")])  # 1
+    _tabela_texto(doc, campo())                                                     # 2: descrição
+    doc.add_paragraph("Classificação da pesquisa:")
+    classificacao = rnd.randrange(len(CLASSIFICACOES))
+    for i, opcao in enumerate(CLASSIFICACOES):
+        _checkbox(doc.add_paragraph(), i == classificacao, opcao, estilo)
+    trl = rnd.randint(1, 6)
+    _tabela_rotulos(doc, [("TRL Inicial:", f"TRL {trl} - {texto(rnd, 4)}"), ("TRL Final:", f"TRL {trl + rnd.randint(1, 3)}")])  # 3
+    _tabela_texto(doc, "Descrição dos níveis de maturidade tecnológica")           # 4
+    _tabela_texto(doc, campo())                                                     # 5: justificativa TRL
+    doc.add_paragraph("Área do projeto:")
+    paragrafo = doc.add_paragraph()
+    areas = rnd.sample(range(len(AREAS)), rnd.randint(1, 2))
+    for i, opcao in enumerate(AREAS):
+        _checkbox(paragrafo, i in areas, opcao, estilo)
+    doc.add_paragraph("Palavras-Chave")
+    _tabela_texto(doc, "Informe até cinco palavras-chave")                         # 6
+    _tabela_texto(doc, "")                                                          # 7
+    _tabela_rotulos(doc, [(f"Palavra-chave {i + 1}", rnd.choice(PALAVRAS) if i < rnd.randint(2, 5) else "") for i in range(5)])  # 8
+    doc.add_paragraph("Natureza Predominante")
+    natureza = rnd.randrange(len(NATUREZAS))
+    for i, opcao in enumerate(NATUREZAS):
+        _checkbox(doc.add_paragraph(), i == natureza, opcao, estilo)
+    doc.add_paragraph("Elemento Tecnologicamente Novo")
+    for _ in range(3):
+        _tabela_texto(doc, campo())                                                 # 9, 10, 11: elemento, barreiras, metodologia
+    doc.add_paragraph("A atividade é contínua (ciclo de vida maior que 1 ano)?")
+    paragrafo, continua = doc.add_paragraph(), rnd.random() < 0.7
+    _checkbox(paragrafo, continua, "Sim", estilo); _checkbox(paragrafo, not continua, "Não", estilo)
+    doc.add_paragraph("ATIVIDADES DE P,D&I")
+    _tabela_texto(doc, "Descreva as atividades do ano-base")                      # 12
+    _tabela_texto(doc, "")                                                          # 13
+    for _ in range(4):
+        _tabela_texto(doc, campo())                                                 # 14..17: ano-base, complementar, resultados
+    doc.add_paragraph("Objetivos de Desenvolvimento Sustentável")
+    marcados = rnd.sample(range(len(ODS)), rnd.randint(1, 3))
+    for i, (numero, opcao) in enumerate(ODS):
+        _checkbox(doc.add_paragraph(), i in marcados, f"{numero}. {opcao}", estilo)
+    doc.add_paragraph("Justificativa (ODS)")
+    _tabela_texto(doc, "Relacione o projeto aos ODS marcados")                      # 18
+    _tabela_texto(doc, campo())                                                     # 19: justificativa ODS
+    doc.add_paragraph("Os projetos de PD&I da empresa se alinham com as políticas públicas nacionais?")
+    paragrafo, alinhado = doc.add_paragraph(), rnd.random() < 0.6
+    _checkbox(paragrafo, alinhado, "Sim", estilo); _checkbox(paragrafo, not alinhado, "Não", estilo)
+    doc.add_paragraph("Alinhamento do Projeto com Políticas, Programas e Estratégias Governamentais")
+    _tabela_texto(doc, campo())                                                     # 20
+    saida = io.BytesIO()
+    doc.save(saida)
+    return saida.getvalue()
+
+
+# ------------------------------------------------------------------------------
+# Valoração (.xlsx)
+# ------------------------------------------------------------------------------
+def nomes_lps(n_lps):
+    return [f"LP {i:03d} - {PALAVRAS[i % len(PALAVRAS)].title()}" for i in range(n_lps)]
+
+def gerar_valoracao(linhas_timesheet=1000, n_lps=10, n_colaboradores=100, linhas_st=200, seed=0):
+    """
+    Bytes de uma planilha de Valoração e {LP: [projetos]}. Cerca de 10% das
+    horas não têm valor de Lei do Bem e 20% das despesas de ST não são
+    válidas para o PIT.
+    """
+    import openpyxl
+    rnd = random.Random(seed)
+    lps = nomes_lps(n_lps)
+    projetos = {lp: [f"Projeto {lp[3:6]}.{j}" for j in range(rnd.randint(1, 3))] for lp in lps}
+    colaboradores = [(f"{rnd.randrange(10**9, 10**11)}", f"Colaborador {c:05d}", rnd.choice(CARGOS), rnd.choice(ESCOLARIDADES)) for c in range(n_colaboradores)]
+    totais = {}
+
+    wb = openpyxl.Workbook(write_only=True)
+    resumo = wb.create_sheet("Resumo Geral")
+    timesheet = wb.create_sheet(f"Timesheet_{2020 + seed % 5}")
+    timesheet.append([f"Timesheet {2020 + seed % 5}"]); timesheet.append([]); timesheet.append(["Empresa Exemplo S.A."])
+    timesheet.append(["LINHA DE PESQUISA", "PROJETO", "NOME DO  COLABORADOR", "C.P.F.", "CARGO", "ESCOLARIDADE", "MÊS", "SALÁRIO",
+                      "ENCARGOS", "HORAS APROPRIADAS A HORAS ÚTEIS", "CUSTO HORA", "LEI DO BEM", "LEI DO BEM?", "OBSERVAÇÃO"])
+    for _ in range(linhas_timesheet):
+        lp = rnd.choice(lps); projeto = rnd.choice(projetos[lp])
+        cpf, nome, cargo, escolaridade = rnd.choice(colaboradores)
+        salario = round(rnd.uniform(2000, 25000), 2); horas = round(rnd.uniform(1, 160), 2); custo = round(salario * 1.7 / 220, 2)
+        valor = round(horas * custo, 2) if rnd.random() > 0.1 else 0
+        timesheet.append([lp, projeto, nome, cpf, cargo, escolaridade, rnd.randint(1, 12), salario, round(salario * 0.7, 2), horas, custo, valor, "Sim" if valor else "Não", ""])
+        if "Estag" not in cargo: totais.setdefault(projeto, [0, 0])[0] += valor
+
+    servicos = wb.create_sheet("Serviços de Terceiros e Viagens")
+    servicos.append(["SERVIÇOS DE TERCEIROS E VIAGENS"])
+    servicos.append(["LINHA DE PESQUISA", "PROJETO", "RAZÃO SOCIAL PRESTADOR", "CNPJ PRESTADOR", "PORTE DA EMPRESA", "DESCRIÇÃO DO SERVIÇO",
+                     "NOTA FISCAL", "R$ FINAL", "DESPESA VÁLIDA PARA O PIT?"])
+    prestadores = [(f"{rnd.randrange(10**13, 10**14)}", f"Prestador {p:04d} Ltda", rnd.choice(PORTES)) for p in range(max(1, linhas_st // 4))]
+    for _ in range(linhas_st):
+        lp = rnd.choice(lps); projeto = rnd.choice(projetos[lp])
+        cnpj, razao, porte = rnd.choice(prestadores)
+        valor, valida = round(rnd.uniform(100, 50000), 2), "Sim" if rnd.random() > 0.2 else "Não"
+        servicos.append([lp, projeto, razao, cnpj, porte, texto(rnd, 8), rnd.randint(1000, 99999), valor, valida])
+        if valida == "Sim": totais.setdefault(projeto, [0, 0])[1] += valor
+
+    resumo.append(["RESUMO DA VALORAÇÃO", None, None, None, None, None])
+    resumo.append([None, None, "Projeto", None, "RH", "ST"])
+    for projeto, (rh, st) in totais.items():
+        resumo.append([None, None, projeto, None, round(rh, 2), round(st, 2)])
+    resumo.append([None, None, "Total", None, round(sum(t[0] for t in totais.values()), 2), round(sum(t[1] for t in totais.values()), 2)])
+    saida = io.BytesIO()
+    wb.save(saida)
+    return saida.getvalue(), projetos
+
+
+# ------------------------------------------------------------------------------
+# NewPiit modelo (.xlsx)
+# ------------------------------------------------------------------------------
+def gerar_newpiit(linhas_antigas=15):
+    """Bytes de um NewPiit modelo com `linhas_antigas` linhas já preenchidas em cada aba."""
+    import openpyxl
+    from openpyxl.formatting.rule import CellIsRule
+    from openpyxl.styles import Border, Font, PatternFill, Side
+    from openpyxl.worksheet.datavalidation import DataValidation
+    wb = openpyxl.Workbook()
+    wb.active.title = "Instruções"
+    wb.active["A1"] = "Preencha as abas GERAL, DISPÊNDIOS e RH a partir da linha 11."
+    borda = Border(left=Side("thin"), right=Side("thin"), top=Side("thin"), bottom=Side("thin"))
+    for nome, cabecalho in (("GERAL", CABECALHO_GERAL), ("DISPÊNDIOS ST", CABECALHO_ST), ("DISPÊNDIOS MC", CABECALHO_MC), ("RH", CABECALHO_RH)):
+        ws = wb.create_sheet(nome)
+        ws["A1"] = f"Aba {nome}"; ws["A1"].font = Font(bold=True, size=14)
+        ws.merge_cells("A2:D2"); ws["A2"] = "Ano-base"
+        for c, titulo in enumerate(cabecalho, 1):
+            celula = ws.cell(10, c, titulo)
+            celula.fill, celula.font = PatternFill("solid", fgColor="FFCC00"), Font(bold=True)
+        for r in range(11, 11 + linhas_antigas):
+            for c in range(1, len(cabecalho) + 1):
+                celula = ws.cell(r, c, r - 10 if c == 1 else f"antigo {r}-{c}")
+                celula.border = borda
+        ws.cell(11 + linhas_antigas + 2, 1, f"=COUNTA(A11:A{10 + linhas_antigas})")
+        ws.column_dimensions["B"].width = 40
+    rh = wb["RH"]
+    validacao = DataValidation(type="list", formula1='"Doutor,Mestre,Graduado,Especialista,Técnico de Nível Médio,Apoio Técnico"', allow_blank=True)
+    rh.add_data_validation(validacao); validacao.add("E11:E5000")
+    rh.conditional_formatting.add("J11:J5000", CellIsRule(operator="greaterThan", formula=["100000"], font=Font(bold=True)))
+    wb.create_sheet("Totais")["A1"] = "=SUM(RH!J11:J5000)"
+    saida = io.BytesIO()
+    wb.save(saida)
+    return saida.getvalue()
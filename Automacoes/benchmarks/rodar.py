@@ -0,0 +1,265 @@
+# ==============================================================================
+# BENCHMARKS DAS ETAPAS DO PREENCHIMENTO, DO EXTRATOR E DO FORMATADOR
+# ==============================================================================
+# Gera dados sintéticos (ver geradores.py) e mede, separadamente, o tempo e o
+# pico de memória de cada etapa:
+#   extracao_ta        extrair_lote dos TAs (sem o cache em disco)
+#   carga_valoracao    carregar_valoracao (sem o snapshot)
+#   agregacao          titulações + linhas de ST e RH por Linha de Pesquisa
+#   validacao          montagem das linhas + validar_totais
+#   escrita_newpiit    preencher_newpiit
+#   relatorio_extrator resumos LP/RH/ST + relatorio_xlsx
+#   formatador_leitura leitura de todas as abas do CONFIG_ABAS (NewPiitLido)
+#   formatador_texto   mapeamento de colunas + tipos + texto do GERAL, DISPÊNDIOS ST e RH
+#
+# A memória é o pico do tracemalloc numa segunda execução da etapa (o
+# tracemalloc deixa o código mais lento, por isso o tempo vem da primeira).
+# Os dados gerados ficam guardados em --dados e são reaproveitados. Como
+# referência, num núcleo o cenário de 100 TAs e 100 mil linhas leva cerca de
+# 6 minutos com a medição de memória (2 sem ela); o conjunto 'completo', que
+# vai até 500 TAs e 500 mil linhas, leva perto de meia hora.
+#
+# O resultado é um JSON com a versão (commit do git), o ambiente e as
+# medidas; com --comparar, as medidas são comparadas com as de outro JSON.
+#
+# Uso (na pasta Automacoes):
+#   python -m benchmarks.rodar [--tamanhos rapido|padrao|completo] [--saida resultado.json]
+#   python -m benchmarks.rodar --tas 50 --linhas 20000
+#   python -m benchmarks.rodar --comparar antes.json
+# ==============================================================================
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import pandas as pd
+from benchmarks import geradores
+from nucleo.agregacao import agregar_rh, agregar_st, relatorio_lp, relatorio_rh, relatorio_st, tabela_escolaridade
+from nucleo.escrita_newpiit import preencher_newpiit
+from nucleo.escrita_relatorio import relatorio_xlsx
+from nucleo.extracao_ta import extrair_lote
+from nucleo.formatador import CONFIG_ABAS, NewPiitLido, preparar_aba
+from nucleo.instrumentacao import ambiente
+from nucleo.preenchimento import MAPA_GERAL, montar_linhas, nome_sem_copia
+from nucleo.validacao import validar_totais
+from nucleo.valoracao import carregar_valoracao
+
+# (TAs, linhas do timesheet) de cada cenário
+TAMANHOS = {
+    'rapido': [(5, 1_000)],
+    'padrao': [(5, 1_000), (50, 10_000), (100, 100_000)],
+    'completo': [(5, 1_000), (50, 10_000), (200, 100_000), (500, 500_000)],
+}
+# Versão dos geradores: entra no nome dos arquivos guardados em --dados
+VERSAO_DADOS = 1
+ABAS_FORMATADOR = [nome for nome, config in CONFIG_ABAS.items() if config['sheet_name'] in ('GERAL', 'DISPÊNDIOS ST', 'RH')]
+PASTA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cenario(tas, linhas_timesheet):
+    """Parâmetros dos geradores para um cenário: uma LP por TA, ST com 1/10 das linhas do timesheet."""
+    return {'nome': f"{tas}ta_{linhas_timesheet}ts", 'tas': tas, 'linhas_timesheet': linhas_timesheet,
+            'linhas_st': max(50, linhas_timesheet // 10), 'colaboradores': max(20, linhas_timesheet // 50)}
+
+def _guardado(pasta, nome, gerar):
+    """Conteúdo de `pasta/nome`, gerado (e gravado) na primeira vez."""
+    caminho = os.path.join(pasta, nome)
+    if os.path.exists(caminho):
+        with open(caminho, 'rb') as arquivo:
+            return arquivo.read()
+    conteudo = gerar()
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+    return conteudo
+
+def dados_cenario(c, pasta, seed=0):
+    """{'valoracao', 'tas' [(nome, bytes)], 'newpiit'} do cenário, gerados ou lidos de `pasta`."""
+    os.makedirs(pasta, exist_ok=True)
+    prefixo = f"v{VERSAO_DADOS}_s{seed}"
+    valoracao = _guardado(pasta, f"{prefixo}_valoracao_{c['tas']}lp_{c['linhas_timesheet']}ts.xlsx",
+                          lambda: geradores.gerar_valoracao(c['linhas_timesheet'], c['tas'], c['colaboradores'], c['linhas_st'], seed)[0])
+    tas = []
+    for i, lp in enumerate(geradores.nomes_lps(c['tas'])):
+        # A ligação com a Valoração é pela LP (nome do arquivo); o projeto do TA é o primeiro da LP
+        conteudo = _guardado(pasta, f"{prefixo}_ta_{i:04d}.docx", lambda: geradores.gerar_ta(f"Projeto {lp[3:6]}.0", seed * 100_003 + i))
+        tas.append((f"{lp}.docx", conteudo))
+    newpiit = _guardado(pasta, f"{prefixo}_newpiit.xlsx", geradores.gerar_newpiit)
+    return {'valoracao': valoracao, 'tas': tas, 'newpiit': newpiit}
+
+
+# ------------------------------------------------------------------------------
+# Etapas: cada uma recebe o estado das anteriores e devolve o seu resultado
+# ------------------------------------------------------------------------------
+def etapa_extracao_ta(estado, processos):
+    return extrair_lote([conteudo for _, conteudo in estado['tas']], processos=processos, usar_cache=False)
+
+def etapa_carga_valoracao(estado, processos):
+    return carregar_valoracao(estado['valoracao'], usar_snapshot=False)
+
+def etapa_agregacao(estado, processos):
+    valoracao = estado['carga_valoracao']
+    df_disp = valoracao['st'].assign(**{'LINHA DE PESQUISA': lambda df: df['LINHA DE PESQUISA'].astype(str).str.strip()})
+    df_rh = valoracao['timesheet'].assign(**{'LINHA DE PESQUISA': lambda df: df['LINHA DE PESQUISA'].astype(str).str.strip()})
+    titulacoes = tabela_escolaridade(df_rh['ESCOLARIDADE'])
+    return {'df_disp': df_disp, 'df_rh': df_rh, 'st': agregar_st(df_disp), 'rh': agregar_rh(df_rh, titulacoes)}
+
+def etapa_validacao(estado, processos):
+    agregado = estado['agregacao']
+    geral, st, rh, tas_validacao = montar_linhas(estado['tas'], estado['extracao_ta'], agregado['st'], agregado['rh'])
+    por_lp, _ = validar_totais(tas_validacao, agregado['df_rh'], agregado['df_disp'], estado['carga_valoracao']['resumo'], st, rh)
+    return {'geral': geral, 'st': st, 'rh': rh, 'validacao_lp': por_lp}
+
+def etapa_escrita_newpiit(estado, processos):
+    linhas = estado['validacao']
+    geral = pd.DataFrame(linhas['geral']).rename(columns=MAPA_GERAL).to_dict('records')
+    return preencher_newpiit(estado['newpiit'], {'GERAL': geral, 'DISPÊNDIOS ST': linhas['st'], 'RH': linhas['rh']})
+
+def etapa_relatorio_extrator(estado, processos):
+    linhas_lp = [dict(dados, **{'Linha de Pesquisa': nome_sem_copia(nome)}) for (nome, _), (dados, _) in zip(estado['tas'], estado['extracao_ta']) if dados]
+    valoracao = estado['carga_valoracao']
+    return relatorio_xlsx({'LP': relatorio_lp(linhas_lp), 'RH': relatorio_rh(valoracao['timesheet']), 'ST': relatorio_st(valoracao['st'])})
+
+def etapa_formatador_leitura(estado, processos):
+    return NewPiitLido(estado['escrita_newpiit'])
+
+def etapa_formatador_texto(estado, processos):
+    # preparar_aba direto (e não NewPiitLido.aba, que guarda o resultado) para medir o mapeamento a cada repetição
+    textos = {}
+    for nome in ABAS_FORMATADOR:
+        config = CONFIG_ABAS[nome]
+        df, mapeamento, nao_encontradas = preparar_aba(nome, estado['formatador_leitura'].planilhas[config['sheet_name']])
+        if nao_encontradas: raise ValueError(f"Colunas não encontradas na aba {config['sheet_name']}: {nao_encontradas}")
+        textos[nome] = config['funcao_processamento'](df, mapeamento, config['label_filtro_todos'])
+    return textos
+
+ETAPAS = [
+    ('extracao_ta', etapa_extracao_ta, lambda c: c['tas']),
+    ('carga_valoracao', etapa_carga_valoracao, lambda c: c['linhas_timesheet'] + c['linhas_st']),
+    ('agregacao', etapa_agregacao, lambda c: c['linhas_timesheet'] + c['linhas_st']),
+    ('validacao', etapa_validacao, lambda c: c['linhas_timesheet'] + c['linhas_st']),
+    ('escrita_newpiit', etapa_escrita_newpiit, None),
+    ('relatorio_extrator', etapa_relatorio_extrator, None),
+    ('formatador_leitura', etapa_formatador_leitura, None),
+    ('formatador_texto', etapa_formatador_texto, None),
+]
+
+
+def medir(funcao, memoria=True, repeticoes=1):
+    """(resultado, melhor tempo em segundos, pico de memória em MB ou None)."""
+    tempos = []
+    for _ in range(max(1, repeticoes)):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    pico = None
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao()
+            pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+    return resultado, min(tempos), pico
+
+def _itens_saida(nome, resultado):
+    """Tamanho da saída de cada etapa (linhas, bytes ou caracteres), para conferir a escala."""
+    if nome == 'validacao': return len(resultado['st']) + len(resultado['rh'])
+    if nome in ('escrita_newpiit', 'relatorio_extrator'): return len(resultado)
+    if nome == 'formatador_leitura': return sum(len(df) for df in resultado.planilhas.values())
+    if nome == 'formatador_texto': return sum(len(t) for t in resultado.values())
+    return None
+
+def rodar_cenario(c, pasta_dados, processos=1, memoria=True, repeticoes=1, etapas=None, relatar=print):
+    """Medidas [{'cenario', 'etapa', 'segundos', 'pico_mb', 'entrada', 'saida'}] de um cenário."""
+    inicio = time.perf_counter()
+    estado = dados_cenario(c, pasta_dados)
+    relatar(f"{c['nome']}: dados prontos em {time.perf_counter() - inicio:.1f} s")
+    medidas = []
+    for nome, funcao, entrada in ETAPAS:
+        resultado, segundos, pico = medir(lambda: funcao(estado, processos), memoria and (etapas is None or nome in etapas), repeticoes)
+        estado[nome] = resultado
+        if nome == 'extracao_ta':
+            erros = [erro for _, erro in resultado if erro]
+            if erros: raise RuntimeError(f"{len(erros)} TA(s) não extraídos: {erros[0]}")
+        if etapas is not None and nome not in etapas: continue
+        medidas.append({'cenario': c['nome'], 'etapa': nome, 'segundos': round(segundos, 4), 'pico_mb': None if pico is None else round(pico, 2),
+                        'entrada': entrada(c) if entrada else None, 'saida': _itens_saida(nome, resultado)})
+        relatar(f"  {nome:20} {segundos:9.3f} s" + ("" if pico is None else f" {pico:9.1f} MB"))
+    return medidas
+
+
+# ------------------------------------------------------------------------------
+# Relatório
+# ------------------------------------------------------------------------------
+def versao_codigo():
+    """Commit atual (com '+' se houver alterações não commitadas), ou None fora de um repositório git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA, capture_output=True, text=True, check=True).stdout.strip()
+        alterado = subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=PASTA, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if alterado else '')
+
+def tabela_comparacao(anterior, atual):
+    """DataFrame com as medidas de `atual` ao lado das de `anterior` (mesmo cenário e etapa) e a razão entre elas."""
+    chaves = ['cenario', 'etapa']
+    antes = pd.DataFrame(anterior['medidas'], columns=chaves + ['segundos', 'pico_mb']).astype({'segundos': float, 'pico_mb': float})
+    depois = pd.DataFrame(atual['medidas'], columns=chaves + ['segundos', 'pico_mb']).astype({'segundos': float, 'pico_mb': float})
+    tabela = antes.merge(depois, on=chaves, how='outer', suffixes=(' antes', ' depois'))
+    # Na ordem dos cenários e das etapas, não na alfabética do merge
+    cenarios = list(dict.fromkeys([m['cenario'] for m in atual['medidas']] + [m['cenario'] for m in anterior['medidas']]))
+    ordem_etapas = [nome for nome, _, _ in ETAPAS]
+    tabela = tabela.sort_values(chaves, key=lambda coluna: coluna.map((cenarios if coluna.name == 'cenario' else ordem_etapas).index), ignore_index=True)
+    tabela['tempo (x)'] = (tabela['segundos depois'] / tabela['segundos antes']).round(2)
+    tabela['memória (x)'] = (tabela['pico_mb depois'] / tabela['pico_mb antes']).round(2)
+    return tabela
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo e a memória de cada etapa com dados sintéticos.")
+    parser.add_argument('--tamanhos', choices=list(TAMANHOS), default='rapido', help="conjunto de cenários (padrão: rapido)")
+    parser.add_argument('--tas', type=int, help="cenário único com este número de TAs (use com --linhas)")
+    parser.add_argument('--linhas', type=int, help="linhas do timesheet do cenário único")
+    parser.add_argument('--etapas', nargs='+', choices=[nome for nome, _, _ in ETAPAS], help="medir só estas etapas (as anteriores rodam sem medição)")
+    parser.add_argument('--processos', type=int, default=1, help="processos da extração dos TAs (padrão: 1)")
+    parser.add_argument('--repeticoes', type=int, default=1, help="execuções de cada etapa; vale o menor tempo (padrão: 1)")
+    parser.add_argument('--sem-memoria', action='store_true', help="não medir o pico de memória (metade do tempo)")
+    parser.add_argument('--dados', default=os.path.join(tempfile.gettempdir(), 'piera_benchmarks'), help="pasta dos dados gerados")
+    parser.add_argument('--saida', help="arquivo JSON do resultado (padrão: benchmark_<versão>_<data>.json)")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argumentos)
+
+    if (args.tas is None) != (args.linhas is None): parser.error("--tas e --linhas devem ser usados juntos")
+    tamanhos = [(args.tas, args.linhas)] if args.tas is not None else TAMANHOS[args.tamanhos]
+    versao = versao_codigo()
+    resultado = {'versao': versao, 'data': datetime.now().isoformat(timespec='seconds'), 'ambiente': ambiente(),
+                 'parametros': {'processos': args.processos, 'repeticoes': args.repeticoes, 'memoria': not args.sem_memoria},
+                 'cenarios': [], 'medidas': []}
+    for tas, linhas in tamanhos:
+        c = cenario(tas, linhas)
+        resultado['cenarios'].append(c)
+        resultado['medidas'] += rodar_cenario(c, args.dados, args.processos, not args.sem_memoria, args.repeticoes, args.etapas)
+
+    saida = args.saida or f"benchmark_{(versao or 'local').replace('+', '-mod')}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultado: {saida}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        print(f"\nComparação com {args.comparar} (versão {anterior.get('versao')}):")
+        print(tabela_comparacao(anterior, resultado).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# ==============================================================================
+# COMPONENTES DE INTERFACE COMPARTILHADOS PELAS PÁGINAS
+# ==============================================================================
+# Pedaços de tela do Streamlit usados por mais de uma página. A lógica fica
+# no nucleo; aqui só a apresentação.
+# ==============================================================================
+
+import streamlit as st
+
+
+def painel_instrumentacao(instrumentacao):
+    """
+    Painel recolhido com o tempo, a memória e as contagens de cada etapa da
+    execução, a lista de TAs do mais lento para o mais rápido e o botão para
+    baixar tudo em JSON (para anexar a chamados de suporte).
+    """
+    if not instrumentacao.etapas and not instrumentacao.documentos: return
+    with st.expander(f"⏱️ Tempo e memória por etapa ({instrumentacao.total_segundos:.1f} s no total)"):
+        st.caption("Pico de memória: maior memória do processo durante a etapa (não inclui os processos paralelos de leitura dos TAs).")
+        st.dataframe(instrumentacao.tabela(), use_container_width=True, hide_index=True,
+                     column_config={'segundos': st.column_config.NumberColumn("tempo (s)", format="%.3f"),
+                                    'pico_mb': st.column_config.NumberColumn("pico de memória (MB)", format="%.1f"),
+                                    'variacao_mb': st.column_config.NumberColumn("variação de memória (MB)", format="%.1f")})
+        documentos = instrumentacao.tabela_documentos()
+        if not documentos.empty:
+            st.markdown("**Tempo de cada TA:**")
+            st.dataframe(documentos, use_container_width=True, hide_index=True,
+                         column_config={'segundos': st.column_config.NumberColumn("tempo (s)", format="%.3f")})
+        st.download_button("📥 Baixar medições (.json)", data=instrumentacao.json_bytes(), file_name=instrumentacao.nome_arquivo(), mime="application/json")
+
+
+BLOCOS_POR_PAGINA = (10, 25, 50, 100)
+
+def _voltar_para_primeira_pagina(chave):
+    st.session_state[f"{chave}_pagina"] = 1
+
+def _pular_para_projeto(chave, primeiros):
+    projeto = st.session_state[f"{chave}_projeto"]
+    if projeto is None: return
+    st.session_state[f"{chave}_busca"] = ""
+    st.session_state[f"{chave}_pagina"] = primeiros[projeto] // st.session_state[f"{chave}_por_pagina"] + 1
+
+def visualizador_paginado(texto, chave, nome_arquivo):
+    """
+    Mostra um TextoFormatado (nucleo.formatador) alguns blocos por vez, com
+    busca e um menu para pular até o primeiro bloco de um projeto. O texto
+    inteiro não vai para a página, só para o botão de download: com milhares
+    de colaboradores ele teria vários MB e deixaria o navegador lento.
+    `chave` separa o estado (página, busca) de cada resultado.
+    """
+    st.download_button("📥 Baixar texto completo (.txt)", data=texto.encode("utf-8"), file_name=nome_arquivo, mime="text/plain")
+
+    primeiros = texto.primeiros_blocos()
+    coluna_busca, coluna_projeto, coluna_tamanho = st.columns([3, 2, 1])
+    with coluna_busca:
+        termo = st.text_input("🔎 Buscar no texto", key=f"{chave}_busca", on_change=_voltar_para_primeira_pagina, args=(chave,))
+    with coluna_projeto:
+        if len(primeiros) > 1:
+            st.selectbox("Ir para o projeto", options=list(primeiros), index=None, format_func=str, placeholder="Escolha um projeto...",
+                         key=f"{chave}_projeto", on_change=_pular_para_projeto, args=(chave, primeiros))
+    with coluna_tamanho:
+        por_pagina = st.selectbox("Blocos por página", options=BLOCOS_POR_PAGINA, index=1, key=f"{chave}_por_pagina")
+
+    blocos = texto.buscar(termo)
+    if len(blocos) == 0:
+        st.info(f"Nenhum bloco contém '{termo}'.")
+        return
+    total_paginas = -(-len(blocos) // por_pagina)
+    # Página guardada de uma busca ou tamanho de página anterior pode ter passado do fim
+    chave_pagina = f"{chave}_pagina"
+    if not 1 <= st.session_state.get(chave_pagina, 1) <= total_paginas: st.session_state[chave_pagina] = 1
+    pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, step=1, key=chave_pagina) if total_paginas > 1 else 1
+
+    inicio = (pagina - 1) * por_pagina
+    da_pagina = blocos[inicio:inicio + por_pagina]
+    encontrados = f" de {len(blocos)} encontrados (em {texto.quantidade_blocos})" if termo else f" de {texto.quantidade_blocos}"
+    st.caption(f"Blocos {inicio + 1} a {inicio + len(da_pagina)}{encontrados}")
+    st.code(texto.trecho(da_pagina), language=None, line_numbers=True)
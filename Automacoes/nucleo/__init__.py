@@ -0,0 +1,8 @@
+# ==============================================================================
+# NÚCLEO DAS FERRAMENTAS DE AUTOMAÇÃO
+# ==============================================================================
+# Lógica compartilhada pelas páginas do Streamlit (extração dos TAs, leitura
+# da Valoração, etc.). Nada aqui depende do Streamlit, e as bibliotecas
+# pesadas (python-docx, openpyxl, Gemini, thefuzz) só são importadas dentro
+# das funções que as usam: ver verificar_importacao.py.
+# ==============================================================================
@@ -0,0 +1,194 @@
+# ==============================================================================
+# AGREGAÇÃO DE RH E ST POR LINHA DE PESQUISA (PREENCHIMENTO NEWPIIT)
+# ==============================================================================
+# Em vez de filtrar a Valoração inteira a cada TA, os tipos são convertidos e
+# os filtros aplicados uma única vez, e um único groupby por
+# (LINHA DE PESQUISA, CNPJ/CPF) agrupa todas as linhas. Cada TA só consulta as
+# linhas já prontas da sua Linha de Pesquisa.
+#
+# As regras são as mesmas de antes: texto do primeiro registro de cada grupo
+# (mesmo vazio), somas arredondadas em 2 casas e grupos em ordem de CNPJ/CPF.
+#
+# A titulação do RH vem de uma tabela ESCOLARIDADE -> TITULAÇÃO montada com os
+# valores distintos do timesheet (cada um classificado uma única vez). A tabela
+# pode ser revisada e ajustada pelos analistas (CSV com as colunas
+# ESCOLARIDADE e TITULAÇÃO).
+#
+# No fim, os resumos de RH e ST do relatório LP&RH&ST (Extrator), que seguem
+# regras próprias: RH com qualquer valor positivo de Lei do Bem (estagiários
+# incluídos) e texto do primeiro registro não vazio de cada grupo.
+# ==============================================================================
+
+import io
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+COLUNA_LP = 'LINHA DE PESQUISA'
+
+COLUNAS_RELATORIO_LP = [
+    'Linha de Pesquisa', 'Nome do Projeto', 'Descrição do Projeto', 'Classificação (PB, PA, DE)', 'Área do projeto', 'Palavras-chave',
+    'Natureza', 'Elemento Inovador', 'Barreiras/Desafios', 'Metodologias', 'Atividade Contínua', 'Data de início', 'Data de término',
+    'Atividades Ano-Base', 'Informações complementares', 'Resultado Econômico', 'Resultado de inovação', 'TRL Inicial', 'TRL Final',
+    'Justificativa TRL', 'ODS', 'Justificativa ODS', 'Alinhamento Políticas (Sim/Não)', 'Alinhamento Políticas (Justificativa)',
+]
+
+
+def coluna_lei_do_bem(df_rh):
+    """Primeira coluna com "LEI DO BEM" no nome que não seja a pergunta ("?")."""
+    return next((c for c in df_rh.columns if "LEI DO BEM" in c.upper() and "?" not in c), None)
+
+def categorizar_escolaridade(texto):
+    texto_limpo_title, texto_limpo_lower = str(texto).strip().title(), str(texto).lower().strip()
+    lista_validos = ["Doutor", "Mestre", "Pós-Graduado", "Graduado", "Tecnólogo", "Técnico De Nível Médio", "Apoio Técnico"]
+    if texto_limpo_title in lista_validos: return texto_limpo_title
+    if any(s in texto_limpo_lower for s in ['especialização', 'pós-graduado']): return 'Pós-graduado'
+    if any(s in texto_limpo_lower for s in ['superior completa', 'superior completo']): return 'Graduado'
+    if any(s in texto_limpo_lower for s in ['superior incompleta', 'superior incompleto', 'médio completo']): return 'Apoio Técnico'
+    return "Apoio Técnico"
+
+def _chave_escolaridade(valor):
+    # Vazio vira '' dos dois lados: no CSV exportado a escolaridade em branco é um campo vazio
+    return '' if pd.isna(valor) else str(valor).strip().lower()
+
+def ler_ajustes_titulacao(conteudo):
+    """{escolaridade normalizada: titulação} de um CSV com as colunas ESCOLARIDADE e TITULAÇÃO."""
+    df = pd.read_csv(io.BytesIO(conteudo), sep=None, engine='python', dtype=str, encoding='utf-8-sig', keep_default_na=False)
+    df.columns = [str(c).strip().upper() for c in df.columns]
+    if not {'ESCOLARIDADE', 'TITULAÇÃO'} <= set(df.columns):
+        raise ValueError("O CSV de titulações precisa das colunas ESCOLARIDADE e TITULAÇÃO.")
+    regras = df['TITULAÇÃO (REGRA)'] if 'TITULAÇÃO (REGRA)' in df.columns else [''] * len(df)
+    ajustes = {}
+    for escolaridade, titulacao, regra in zip(df['ESCOLARIDADE'], df['TITULAÇÃO'], regras):
+        chave, titulacao = _chave_escolaridade(escolaridade), titulacao.strip()
+        if not titulacao: continue
+        # Linhas que viram a mesma chave (em branco e só espaços): vale a que foi alterada
+        if chave not in ajustes or titulacao != regra.strip(): ajustes[chave] = titulacao
+    return ajustes
+
+def tabela_escolaridade(escolaridades, ajustes=None):
+    """
+    Uma linha por valor distinto de ESCOLARIDADE, com a titulação da regra,
+    a titulação usada (a do ajuste, quando houver) e quantas linhas do
+    timesheet têm esse valor.
+    """
+    ajustes = {_chave_escolaridade(e): t for e, t in (ajustes or {}).items()}
+    linhas = []
+    for valor, quantidade in escolaridades.value_counts(dropna=False, sort=False).items():
+        regra = categorizar_escolaridade(valor)
+        linhas.append({'ESCOLARIDADE': valor, 'TITULAÇÃO (regra)': regra, 'TITULAÇÃO': ajustes.get(_chave_escolaridade(valor), regra), 'LINHAS': quantidade})
+    tabela = pd.DataFrame(linhas, columns=['ESCOLARIDADE', 'TITULAÇÃO (regra)', 'TITULAÇÃO', 'LINHAS'])
+    return tabela.sort_values('LINHAS', ascending=False, kind='stable', ignore_index=True)
+
+def tabela_escolaridade_csv(tabela):
+    """CSV (;) da tabela, no formato aceito de volta por `ler_ajustes_titulacao`."""
+    return tabela[['ESCOLARIDADE', 'TITULAÇÃO', 'TITULAÇÃO (regra)', 'LINHAS']].to_csv(index=False, sep=';').encode('utf-8-sig')
+
+def aplicar_titulacao(escolaridades, tabela):
+    """Titulação de cada valor de `escolaridades`, consultada na tabela."""
+    return escolaridades.map(pd.Series(tabela['TITULAÇÃO'].values, index=pd.Index(tabela['ESCOLARIDADE'], dtype=object)))
+
+def _arredondar(serie):
+    return serie.round(2) if is_numeric_dtype(serie) else serie.map(lambda v: round(v, 2))
+
+def _agrupar(df, chave, colunas_soma):
+    """
+    Um groupby (LP, chave) sobre todas as linhas: devolve as somas e, alinhado
+    a elas, o primeiro registro de cada grupo (iloc[0], sem pular vazios).
+    """
+    df = df.dropna(subset=[chave])
+    somas = df.groupby([COLUNA_LP, chave])[colunas_soma].sum()
+    primeiros = df.drop_duplicates(subset=[COLUNA_LP, chave]).set_index([COLUNA_LP, chave]).loc[somas.index]
+    return somas, primeiros
+
+def _por_lp(linhas, lps):
+    grupos = {}
+    for lp, linha in zip(lps, linhas):
+        grupos.setdefault(lp, []).append(linha)
+    return grupos
+
+def filtrar_st(df_disp):
+    """Despesas de ST válidas para o PIT."""
+    return df_disp[df_disp['DESPESA VÁLIDA PARA O PIT?'] == 'Sim']
+
+def filtrar_rh(df_rh):
+    """
+    Linhas do timesheet com valor de Lei do Bem (já numérico, vazios como 0)
+    que não são de estagiários, e o nome da coluna de Lei do Bem.
+    """
+    lei_do_bem_col = coluna_lei_do_bem(df_rh)
+    if df_rh.empty or not lei_do_bem_col: return df_rh.iloc[0:0], lei_do_bem_col
+    valores_lei = pd.to_numeric(df_rh[lei_do_bem_col], errors='coerce').fillna(0)
+    mascara = (valores_lei != 0) & (~df_rh['CARGO'].str.contains('Estagiario', case=False, na=False))
+    return df_rh[mascara].assign(**{lei_do_bem_col: valores_lei[mascara]}), lei_do_bem_col
+
+def agregar_st(df_disp):
+    """
+    {LP: [linhas do DISPÊNDIOS ST]} com as despesas válidas para o PIT,
+    uma linha por CNPJ. Faltam '#' e o nome do projeto, que dependem do TA.
+    """
+    if df_disp.empty: return {}
+    validas = filtrar_st(df_disp)
+    somas, primeiros = _agrupar(validas, 'CNPJ PRESTADOR', ['R$ FINAL'])
+    valores = _arredondar(somas['R$ FINAL'])
+    linhas = [
+        {'TIPO': str(porte).title(), 'Situação (Contratado, Em Execução, Terminado)': 'Terminado', 'Prestador de Serviço': razao, 'CNPJ/CPF': cnpj,
+         'Caracterizar o Serviço Realizado': 'Serviço de apoio técnico para desenvolvimento do projeto', 'Valor Total': valor}
+        for (_, cnpj), porte, razao, valor in zip(somas.index, primeiros['PORTE DA EMPRESA'], primeiros['RAZÃO SOCIAL PRESTADOR'], valores)
+    ]
+    return _por_lp(linhas, somas.index.get_level_values(0))
+
+def agregar_rh(df_rh, titulacoes=None):
+    """
+    {LP: [linhas do RH]} com os colaboradores que têm valor de Lei do Bem e
+    não são estagiários, uma linha por CPF. Faltam '#' e o nome do projeto.
+    A titulação vem de `titulacoes` (ver `tabela_escolaridade`); sem a
+    coluna ESCOLARIDADE no timesheet, fica em branco.
+    """
+    filtrado, lei_do_bem_col = filtrar_rh(df_rh)
+    if not lei_do_bem_col: return {}
+    somas, primeiros = _agrupar(filtrado, 'C.P.F.', ['HORAS APROPRIADAS A HORAS ÚTEIS', lei_do_bem_col])
+    horas, valores = _arredondar(somas['HORAS APROPRIADAS A HORAS ÚTEIS']), _arredondar(somas[lei_do_bem_col])
+    if 'ESCOLARIDADE' not in df_rh.columns:
+        titulacao = [''] * len(somas)
+    else:
+        if titulacoes is None: titulacoes = tabela_escolaridade(df_rh['ESCOLARIDADE'])
+        titulacao = aplicar_titulacao(primeiros['ESCOLARIDADE'], titulacoes)
+    linhas = [
+        {'CPF': cpf, 'NOME': nome, 'TITULAÇÃO': titulo, 'Total Horas (Anual)': total_horas, 'Valor (R$)': valor}
+        for (_, cpf), nome, titulo, total_horas, valor in zip(somas.index, primeiros['NOME DO COLABORADOR'], titulacao, horas, valores)
+    ]
+    return _por_lp(linhas, somas.index.get_level_values(0))
+
+
+def relatorio_lp(linhas_lp):
+    """Aba LP do relatório: uma linha por TA extraído, nas colunas de COLUNAS_RELATORIO_LP."""
+    df_lp = pd.DataFrame(linhas_lp)
+    if df_lp.empty: return df_lp
+    return df_lp.reindex(columns=COLUNAS_RELATORIO_LP).fillna('')
+
+def relatorio_rh(df_rh):
+    """Aba RH do relatório: horas e valor de Lei do Bem somados por (LP, CPF)."""
+    lei_do_bem_col = coluna_lei_do_bem(df_rh)
+    if df_rh.empty or not lei_do_bem_col: return pd.DataFrame()
+    df_rh = df_rh.assign(**{lei_do_bem_col: pd.to_numeric(df_rh[lei_do_bem_col], errors='coerce').fillna(0)})
+    df_rh_filtrado = df_rh[df_rh[lei_do_bem_col] > 0]
+    if df_rh_filtrado.empty: return pd.DataFrame()
+    aggregations_rh = {'PROJETO': 'first', 'NOME DO COLABORADOR': 'first', 'CARGO': 'first', 'HORAS APROPRIADAS A HORAS ÚTEIS': 'sum', lei_do_bem_col: 'sum'}
+    df_rh_grouped = df_rh_filtrado.groupby([COLUNA_LP, 'C.P.F.']).agg(aggregations_rh).reset_index()
+    df_rh_grouped['DESCRIÇÃO DA ATIVIDADE'] = ''
+    df_rh_grouped['HORAS APROPRIADAS A HORAS ÚTEIS'] = df_rh_grouped['HORAS APROPRIADAS A HORAS ÚTEIS'].round(2)
+    df_rh_grouped[lei_do_bem_col] = df_rh_grouped[lei_do_bem_col].round(2)
+    df_rh_final = df_rh_grouped.rename(columns={COLUNA_LP: 'LP', 'NOME DO COLABORADOR': 'COLABORADOR', 'C.P.F.': 'CPF', 'HORAS APROPRIADAS A HORAS ÚTEIS': 'HORAS', lei_do_bem_col: 'VALOR TOTAL'})
+    return df_rh_final[['LP', 'PROJETO', 'COLABORADOR', 'CPF', 'CARGO', 'HORAS', 'VALOR TOTAL', 'DESCRIÇÃO DA ATIVIDADE']]
+
+def relatorio_st(df_disp):
+    """Aba ST do relatório: despesas válidas para o PIT somadas por (LP, CNPJ)."""
+    if df_disp.empty: return pd.DataFrame()
+    df_st_filtrado = filtrar_st(df_disp)
+    if df_st_filtrado.empty: return pd.DataFrame()
+    aggregations_st = {'PROJETO': 'first', 'RAZÃO SOCIAL PRESTADOR': 'first', 'R$ FINAL': 'sum'}
+    df_st_grouped = df_st_filtrado.groupby([COLUNA_LP, 'CNPJ PRESTADOR']).agg(aggregations_st).reset_index()
+    df_st_grouped['R$ FINAL'] = df_st_grouped['R$ FINAL'].round(2)
+    df_st_grouped['DESCRIÇÃO DA ATIVIDADE'] = ''
+    df_st_final = df_st_grouped.rename(columns={COLUNA_LP: 'LP', 'R$ FINAL': 'VALOR TOTAL'})
+    return df_st_final[['LP', 'PROJETO', 'RAZÃO SOCIAL PRESTADOR', 'CNPJ PRESTADOR', 'VALOR TOTAL', 'DESCRIÇÃO DA ATIVIDADE']]
@@ -0,0 +1,145 @@
+# ==============================================================================
+# CACHE PERSISTENTE EM DISCO
+# ==============================================================================
+# Guarda resultados (JSON) num SQLite local, compartilhado entre páginas,
+# processos e reinícios do servidor. Cada cache tem limite de tamanho e
+# descarta primeiro as entradas usadas há mais tempo (LRU); opcionalmente, as
+# entradas também vencem um tempo depois de gravadas.
+#
+# Pasta: PIERA_CACHE_DIR (padrão ~/.cache/automacoes_piera).
+# ==============================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+PASTA_PADRAO = os.environ.get("PIERA_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "automacoes_piera")
+
+
+def hash_conteudo(conteudo):
+    """SHA-256 (hex) de bytes ou texto."""
+    if isinstance(conteudo, str): conteudo = conteudo.encode("utf-8")
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+class CacheDisco:
+    """
+    Cache chave -> valor JSON num arquivo SQLite `<pasta>/<nome>.sqlite`.
+
+    `versao` entra em todas as chaves: ao mudar, as entradas antigas deixam de
+    ser encontradas e acabam descartadas pelo LRU. Com `validade_segundos`,
+    uma entrada gravada há mais tempo que isso conta como falha e é apagada.
+    """
+
+    def __init__(self, nome, limite_bytes=64 * 1024 * 1024, versao="", pasta=None, validade_segundos=None):
+        self.nome = nome
+        self.limite_bytes = limite_bytes
+        self.versao = versao
+        self.validade_segundos = validade_segundos
+        pasta = pasta or PASTA_PADRAO
+        os.makedirs(pasta, exist_ok=True)
+        self.caminho = os.path.join(pasta, f"{nome}.sqlite")
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("CREATE TABLE IF NOT EXISTS entradas (chave TEXT PRIMARY KEY, valor BLOB, tamanho INTEGER, criado_em REAL, usado_em REAL, acessos INTEGER DEFAULT 0)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_usado_em ON entradas (usado_em)")
+            con.execute("CREATE TABLE IF NOT EXISTS contadores (nome TEXT PRIMARY KEY, valor INTEGER)")
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: o Streamlit chama de várias threads
+        con = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _chave(self, chave):
+        return f"{self.versao}:{chave}" if self.versao else chave
+
+    def _contar(self, con, nome, quantidade):
+        if quantidade:
+            con.execute("INSERT INTO contadores (nome, valor) VALUES (?, ?) ON CONFLICT(nome) DO UPDATE SET valor = valor + excluded.valor", (nome, quantidade))
+
+    def obter_varios(self, chaves):
+        """{chave: valor} das chaves encontradas; as demais contam como falha."""
+        chaves = list(dict.fromkeys(chaves))
+        encontrados = {}
+        agora = time.time()
+        vencimento = agora - self.validade_segundos if self.validade_segundos else None
+        vencidas = []
+        with self._conectar() as con:
+            for inicio in range(0, len(chaves), 500):
+                lote = {self._chave(c): c for c in chaves[inicio:inicio + 500]}
+                marcadores = ",".join("?" * len(lote))
+                for chave_interna, valor, criado_em in con.execute(f"SELECT chave, valor, criado_em FROM entradas WHERE chave IN ({marcadores})", list(lote)):
+                    if vencimento is not None and criado_em < vencimento: vencidas.append(chave_interna)
+                    else: encontrados[lote[chave_interna]] = json.loads(valor)
+                if lote:
+                    con.execute(f"UPDATE entradas SET usado_em = ?, acessos = acessos + 1 WHERE chave IN ({marcadores})", [agora, *lote])
+            con.executemany("DELETE FROM entradas WHERE chave = ?", [(c,) for c in vencidas])
+            self._contar(con, "acertos", len(encontrados))
+            self._contar(con, "falhas", len(chaves) - len(encontrados))
+            self._contar(con, "vencidas", len(vencidas))
+        return encontrados
+
+    def obter(self, chave, padrao=None):
+        return self.obter_varios([chave]).get(chave, padrao)
+
+    def gravar_varios(self, itens):
+        """Grava {chave: valor} e aplica o limite de tamanho."""
+        if not itens: return
+        agora = time.time()
+        linhas = []
+        for chave, valor in itens.items():
+            dados = json.dumps(valor, ensure_ascii=False).encode("utf-8")
+            linhas.append((self._chave(chave), dados, len(dados), agora, agora))
+        with self._conectar() as con:
+            con.executemany("INSERT OR REPLACE INTO entradas (chave, valor, tamanho, criado_em, usado_em, acessos) VALUES (?, ?, ?, ?, ?, 0)", linhas)
+            self._aplicar_limite(con)
+
+    def gravar(self, chave, valor):
+        self.gravar_varios({chave: valor})
+
+    def _aplicar_limite(self, con):
+        total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0]
+        if total <= self.limite_bytes: return
+        descartadas = 0
+        for chave, tamanho in con.execute("SELECT chave, tamanho FROM entradas ORDER BY usado_em").fetchall():
+            if total <= self.limite_bytes: break
+            con.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+            total -= tamanho
+            descartadas += 1
+        self._contar(con, "descartes", descartadas)
+
+    def mais_usadas(self, quantidade=20):
+        """As `quantidade` entradas com mais acertos: chave, acessos, bytes e datas (epoch) de gravação e último uso."""
+        prefixo = f"{self.versao}:" if self.versao else ""
+        with self._conectar() as con:
+            linhas = con.execute("SELECT chave, acessos, tamanho, criado_em, usado_em FROM entradas WHERE substr(chave, 1, ?) = ? ORDER BY acessos DESC, usado_em DESC LIMIT ?",
+                                 (len(prefixo), prefixo, quantidade)).fetchall()
+        return [{"chave": chave[len(prefixo):], "acessos": acessos, "bytes": tamanho, "criado_em": criado_em, "usado_em": usado_em}
+                for chave, acessos, tamanho, criado_em, usado_em in linhas]
+
+    def limpar(self):
+        with self._conectar() as con:
+            con.execute("DELETE FROM entradas")
+            con.execute("DELETE FROM contadores")
+
+    def estatisticas(self):
+        with self._conectar() as con:
+            entradas, tamanho = con.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()
+            contadores = dict(con.execute("SELECT nome, valor FROM contadores"))
+        return {
+            "entradas": entradas,
+            "bytes": tamanho,
+            "limite_bytes": self.limite_bytes,
+            "acertos": contadores.get("acertos", 0),
+            "falhas": contadores.get("falhas", 0),
+            "descartes": contadores.get("descartes", 0),
+            "vencidas": contadores.get("vencidas", 0),
+        }
@@ -0,0 +1,108 @@
+# ==============================================================================
+# CONVERSOR PANDOC (SOB DEMANDA)
+# ==============================================================================
+# O pandoc só é procurado (e, se preciso, baixado) na primeira conversão de
+# fato, nunca ao abrir uma página. O resultado fica guardado para o processo
+# inteiro; se o pandoc não puder ser obtido, o erro também fica guardado e as
+# conversões seguintes falham na hora com ConversorIndisponivel.
+#
+# As conversões não usam arquivos em caminhos fixos: um documento vai pelo
+# stdin do pandoc e um lote usa uma pasta temporária própria, apagada ao final,
+# então várias sessões podem converter ao mesmo tempo sem interferência.
+#
+# PIERA_BAIXAR_PANDOC=0 desliga o download automático.
+# ==============================================================================
+
+import io
+import os
+import subprocess
+import tempfile
+import threading
+import uuid
+
+BAIXAR_PANDOC = os.environ.get("PIERA_BAIXAR_PANDOC", "1") != "0"
+
+_trava = threading.Lock()
+_caminho_pandoc = None
+_erro_pandoc = None
+
+
+class ConversorIndisponivel(RuntimeError):
+    """O pandoc não está instalado e não pôde ser baixado."""
+
+
+def obter_pandoc():
+    """Caminho do executável do pandoc, resolvido uma única vez por processo."""
+    global _caminho_pandoc, _erro_pandoc
+    if _caminho_pandoc: return _caminho_pandoc
+    if _erro_pandoc: raise ConversorIndisponivel(_erro_pandoc)
+    with _trava:
+        if not (_caminho_pandoc or _erro_pandoc):
+            import pypandoc
+            try:
+                _caminho_pandoc = pypandoc.get_pandoc_path()
+            except OSError:
+                if BAIXAR_PANDOC:
+                    try:
+                        from pypandoc.pandoc_download import download_pandoc
+                        download_pandoc()
+                        _caminho_pandoc = pypandoc.get_pandoc_path()
+                    except Exception as e:
+                        _erro_pandoc = f"pandoc não encontrado e o download falhou ({e})"
+                else:
+                    _erro_pandoc = "pandoc não encontrado e o download automático está desligado"
+    if _erro_pandoc: raise ConversorIndisponivel(_erro_pandoc)
+    return _caminho_pandoc
+
+
+def estado_conversor():
+    """'não verificado', 'disponível' ou 'indisponível: <motivo>', sem disparar a verificação."""
+    if _caminho_pandoc: return "disponível"
+    if _erro_pandoc: return f"indisponível: {_erro_pandoc}"
+    return "não verificado"
+
+
+def _executar_pandoc(argumentos, entrada=None):
+    processo = subprocess.run([obter_pandoc(), *argumentos], input=entrada, capture_output=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f"pandoc falhou: {processo.stderr.decode('utf-8', 'replace').strip()}")
+    return processo.stdout.decode("utf-8").replace("\r\n", "\n")
+
+
+def converter_bytes(conteudo, formato_saida='plain', formato_entrada='docx', extra_args=('--wrap=none',)):
+    """Converte um documento passando os bytes pelo stdin do pandoc (nada é gravado em disco)."""
+    return _executar_pandoc(['-f', formato_entrada, '-t', formato_saida, *extra_args], entrada=conteudo)
+
+
+def _docx_separador(marcador):
+    import docx
+    documento = docx.Document()
+    documento.add_paragraph(marcador)
+    saida = io.BytesIO()
+    documento.save(saida)
+    return saida.getvalue()
+
+
+def converter_lote(conteudos, formato_saida='plain', extra_args=('--wrap=none',)):
+    """
+    Converte vários .docx numa única execução do pandoc e devolve um texto por
+    documento, na mesma ordem. Os arquivos ficam numa pasta temporária
+    exclusiva desta chamada, intercalados com um documento separador.
+    """
+    if len(conteudos) <= 1:
+        return [converter_bytes(c, formato_saida, extra_args=extra_args) for c in conteudos]
+    marcador = f"PIERA-SEPARADOR-{uuid.uuid4().hex}"
+    with tempfile.TemporaryDirectory(prefix="piera_pandoc_") as pasta:
+        separador = os.path.join(pasta, "separador.docx")
+        with open(separador, "wb") as f: f.write(_docx_separador(marcador))
+        entradas = []
+        for indice, conteudo in enumerate(conteudos):
+            caminho = os.path.join(pasta, f"ta_{indice}.docx")
+            with open(caminho, "wb") as f: f.write(conteudo)
+            if entradas: entradas.append(separador)
+            entradas.append(caminho)
+        saida = _executar_pandoc(['-f', 'docx', '-t', formato_saida, *extra_args, *entradas])
+    textos = saida.split(marcador)
+    if len(textos) != len(conteudos):
+        raise RuntimeError(f"pandoc devolveu {len(textos)} documentos para {len(conteudos)} entradas")
+    return textos
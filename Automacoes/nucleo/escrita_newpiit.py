@@ -0,0 +1,288 @@
+# ==============================================================================
+# ESCRITA DO NEWPIIT PREENCHIDO
+# ==============================================================================
+# Em vez de carregar a pasta de trabalho inteira no openpyxl e salvá-la de
+# novo, o .xlsx é tratado como o zip que ele é: só o XML das abas preenchidas
+# (GERAL, DISPÊNDIOS ST, RH) é reescrito; estilos, validações, formatação
+# condicional, imagens e as demais abas são copiados byte a byte.
+#
+# Mesmas regras do preenchimento anterior: o cabeçalho da linha 10 define a
+# ordem das colunas; da linha 11 em diante os valores antigos são apagados
+# (a formatação das células fica); cada linha nova recebe os estilos das
+# células da linha 11 (ou do cabeçalho, se a aba não tiver linha 11).
+# ==============================================================================
+
+import io
+import numbers
+import posixpath
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import pandas as pd
+from xml.sax.saxutils import escape
+from lxml import etree
+from nucleo.planilha import CARACTERES_ILEGAIS, data_excel, indice_coluna, letra_coluna
+
+
+NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PACOTE = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_TIPOS = "http://schemas.openxmlformats.org/package/2006/content-types"
+TIPO_CALC_CHAIN = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain"
+
+_REFERENCIA = re.compile(r"^\$?([A-Z]+)\$?(\d+)$")
+
+
+def _q(tag, ns=NS):
+    return f"{{{ns}}}{tag}"
+
+def _coordenada(ref):
+    coluna, linha = _REFERENCIA.match(ref.upper()).groups()
+    return int(linha), indice_coluna(coluna)
+
+def _caminho_parte(base, alvo):
+    """Caminho dentro do zip de um Target de relacionamento (relativo a `base` ou absoluto)."""
+    if alvo.startswith("/"): return alvo[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), alvo))
+
+def _texto_rico(elemento):
+    """Texto de um <si> ou <is> (com ou sem trechos formatados)."""
+    return "".join(t.text or "" for t in elemento.iter(_q("t")) if t.getparent().tag != _q("rPh"))
+
+
+class _Aba:
+    """Índice das linhas e células do XML de uma aba."""
+
+    def __init__(self, xml):
+        self.raiz = etree.fromstring(xml)
+        self.dados = self.raiz.find(_q("sheetData"))
+        self.linhas = {}
+        self.max_linha = self.max_coluna = self.ultima_linha = 0
+        for linha in self.dados.iterfind(_q("row")):
+            numero = int(linha.get("r") or self.ultima_linha + 1)
+            linha.set("r", str(numero))
+            celulas, ultima_coluna = {}, 0
+            for celula in linha.iterfind(_q("c")):
+                coluna = _coordenada(celula.get("r"))[1] if celula.get("r") else ultima_coluna + 1
+                celula.set("r", f"{letra_coluna(coluna)}{numero}")
+                ultima_coluna = coluna
+                celulas[coluna] = celula
+            self.linhas[numero] = (linha, celulas)
+            self.ultima_linha = numero
+            if celulas:
+                self.max_linha = max(self.max_linha, numero)
+                self.max_coluna = max(self.max_coluna, max(celulas))
+        # O openpyxl também conta as células cobertas por mesclagens
+        for mesclagem in self.raiz.iterfind(f"{_q('mergeCells')}/{_q('mergeCell')}"):
+            fim = mesclagem.get("ref", "").split(":")[-1]
+            if _REFERENCIA.match(fim.upper()):
+                linha, coluna = _coordenada(fim)
+                self.max_linha, self.max_coluna = max(self.max_linha, linha), max(self.max_coluna, coluna)
+
+    def celulas(self, numero):
+        return self.linhas.get(numero, (None, {}))[1]
+
+    def limpar_linha(self, numero):
+        """
+        Apaga os valores da linha mantendo a formatação. Células (e linhas)
+        que ficam vazias e sem estilo são retiradas. Devolve True se alguma
+        fórmula foi apagada.
+        """
+        if numero not in self.linhas: return False
+        linha, celulas = self.linhas[numero]
+        apagou_formula = False
+        for coluna, celula in list(celulas.items()):
+            apagou_formula |= _limpar_valor(celula)
+            if celula.get("s") in (None, "0") and set(celula.attrib) <= {"r", "s"}:
+                linha.remove(celula)
+                del celulas[coluna]
+        if not celulas and len(linha) == 0 and set(linha.attrib) <= {"r", "spans"}:
+            self.dados.remove(linha)
+            del self.linhas[numero]
+        return apagou_formula
+
+    def linha(self, numero):
+        """Elemento <row> da linha, criado (na posição certa) se não existir."""
+        if numero not in self.linhas:
+            nova = etree.Element(_q("row"), r=str(numero))
+            seguinte = min((n for n in self.linhas if n > numero), default=None) if numero < self.ultima_linha else None
+            if seguinte is None:
+                self.dados.append(nova)
+                self.ultima_linha = numero
+            else:
+                self.linhas[seguinte][0].addprevious(nova)
+            self.linhas[numero] = (nova, {})
+        return self.linhas[numero]
+
+
+def _limpar_valor(celula):
+    """Apaga valor/fórmula mantendo o estilo; devolve True se havia fórmula."""
+    tinha_formula = False
+    for filho in list(celula):
+        if filho.tag == _q("f"): tinha_formula = True
+        celula.remove(filho)
+    for atributo in ("t", "cm", "vm"):
+        celula.attrib.pop(atributo, None)
+    return tinha_formula
+
+def _conteudo(valor):
+    """(tipo da célula, texto) de um valor; None para célula sem valor."""
+    if valor is None or (isinstance(valor, str) and valor == ""): return None
+    if isinstance(valor, float):
+        return None if valor != valor else (None, repr(valor))
+    if isinstance(valor, (bool, np.bool_)): return ("b", "1" if valor else "0")
+    if isinstance(valor, numbers.Integral): return (None, str(int(valor)))
+    if isinstance(valor, numbers.Real): return (None, repr(float(valor)))
+    if isinstance(valor, (datetime, date, time, timedelta)): return (None, repr(float(data_excel(valor))))
+    return ("inlineStr", CARACTERES_ILEGAIS.sub("", str(valor)))
+
+def _escrever_valor(celula, valor):
+    conteudo = _conteudo(valor)
+    if conteudo is None: return
+    tipo, texto = conteudo
+    if tipo == "inlineStr":
+        celula.set("t", tipo)
+        t = etree.SubElement(etree.SubElement(celula, _q("is")), _q("t"))
+        t.text = texto
+        if texto != texto.strip(): t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+    else:
+        if tipo: celula.set("t", tipo)
+        etree.SubElement(celula, _q("v")).text = texto
+
+def _celula_xml(referencia, estilo, valor):
+    conteudo = _conteudo(valor)
+    atributos = f'r="{referencia}"{estilo}'
+    if conteudo is None: return f"<c {atributos}/>"
+    tipo, texto = conteudo
+    if tipo == "inlineStr":
+        espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+        return f'<c {atributos} t="inlineStr"><is><t{espaco}>{escape(texto)}</t></is></c>'
+    return f'<c {atributos}{f" t={chr(34)}{tipo}{chr(34)}" if tipo else ""}><v>{texto}</v></c>'
+
+def _texto_celula(celula, compartilhadas):
+    """Valor de uma célula como o openpyxl o mostraria, em texto."""
+    if celula is None: return "None"
+    tipo = celula.get("t", "n")
+    formula = celula.find(_q("f"))
+    if formula is not None and formula.text: return f"={formula.text}"
+    if tipo == "inlineStr":
+        inline = celula.find(_q("is"))
+        return _texto_rico(inline) if inline is not None else "None"
+    v = celula.find(_q("v"))
+    if v is None or v.text is None: return "None"
+    if tipo == "s": return compartilhadas()[int(v.text)]
+    if tipo == "b": return str(v.text == "1")
+    if tipo == "n":
+        numero = float(v.text)
+        return str(int(numero)) if numero.is_integer() and "." not in v.text and "E" not in v.text.upper() else str(numero)
+    return v.text
+
+def _preencher_aba(aba, dados, compartilhadas, linha_cabecalho, linha_inicial):
+    """Preenche a aba e devolve True se alguma fórmula antiga foi apagada."""
+    largura = aba.max_coluna
+    cabecalho = [_texto_celula(aba.celulas(linha_cabecalho).get(c), compartilhadas).strip() for c in range(1, largura + 1)]
+    linha_modelo = linha_inicial if aba.max_linha >= linha_inicial else linha_cabecalho
+    celulas_modelo = aba.celulas(linha_modelo)
+    estilos = [celulas_modelo[c].get("s") if c in celulas_modelo else None for c in range(1, largura + 1)]
+    estilos = [None if s in (None, "0") else s for s in estilos]
+
+    apagou_formula = False
+    for numero in range(linha_inicial, aba.max_linha + 1):
+        apagou_formula |= aba.limpar_linha(numero)
+
+    df = pd.DataFrame(dados)
+    df.columns = [str(col).strip() for col in df.columns]
+    valores = df.reindex(columns=cabecalho).fillna('')
+    letras = [letra_coluna(c) for c in range(1, largura + 1)]
+    atributos_estilo = [f' s="{s}"' if s else "" for s in estilos]
+    linhas_novas = []
+    for numero, linha_valores in enumerate(valores.itertuples(index=False, name=None), linha_inicial):
+        if numero > aba.ultima_linha:
+            # Depois da última linha do modelo: o XML das linhas é montado
+            # direto em texto e convertido de uma vez só no final
+            celulas_xml = "".join(_celula_xml(f"{letra}{numero}", estilo, valor) for letra, estilo, valor in zip(letras, atributos_estilo, linha_valores))
+            linhas_novas.append(f'<row r="{numero}">{celulas_xml}</row>')
+            continue
+        linha, celulas = aba.linha(numero)
+        for coluna, (letra, estilo, valor) in enumerate(zip(letras, estilos, linha_valores), 1):
+            celula = celulas.get(coluna)
+            if celula is None:
+                celula = celulas[coluna] = etree.Element(_q("c"), r=f"{letra}{numero}")
+            if estilo is None: celula.attrib.pop("s", None)
+            else: celula.set("s", estilo)
+            _escrever_valor(celula, valor)
+        linha[:] = [celulas[c] for c in sorted(celulas)] + [filho for filho in linha if filho.tag != _q("c")]
+        linha.attrib.pop("spans", None)
+    if linhas_novas:
+        aba.dados.extend(etree.fromstring(f'<sheetData xmlns="{NS}">{"".join(linhas_novas)}</sheetData>'))
+
+    ultima_linha = max(aba.max_linha, linha_inicial + len(valores) - 1)
+    dimensao = aba.raiz.find(_q("dimension"))
+    if dimensao is not None and largura and ultima_linha:
+        inicio = dimensao.get("ref", "A1").split(":")[0]
+        dimensao.set("ref", f"{inicio}:{letra_coluna(largura)}{ultima_linha}")
+    return apagou_formula
+
+
+def preencher_newpiit(conteudo, dados_por_aba, linha_cabecalho=10, linha_inicial=11):
+    """
+    Preenche as abas de um NewPiit (.xlsx em bytes). `dados_por_aba`:
+    {nome da aba: [dicionários coluna -> valor]}; abas sem dados ou que não
+    existem no arquivo ficam como estão. Devolve os bytes do novo .xlsx.
+    """
+    entrada = zipfile.ZipFile(io.BytesIO(conteudo))
+    partes = {info.filename: info for info in entrada.infolist()}
+    livro = etree.fromstring(entrada.read("xl/workbook.xml"))
+    rels_livro = etree.fromstring(entrada.read("xl/_rels/workbook.xml.rels"))
+    alvos = {rel.get("Id"): rel for rel in rels_livro.iter(_q("Relationship", NS_PACOTE))}
+    caminho_aba = {aba.get("name"): _caminho_parte("xl/workbook.xml", alvos[aba.get(_q("id", NS_REL))].get("Target"))
+                   for aba in livro.iter(_q("sheet"))}
+
+    _cache = {}
+    def compartilhadas():
+        if "lista" not in _cache:
+            rel = next((r for r in alvos.values() if r.get("Type", "").endswith("/sharedStrings")), None)
+            caminho = _caminho_parte("xl/workbook.xml", rel.get("Target")) if rel is not None else None
+            _cache["lista"] = [_texto_rico(si) for si in etree.fromstring(entrada.read(caminho)).iter(_q("si"))] if caminho in partes else []
+        return _cache["lista"]
+
+    novas_partes, apagou_formula = {}, False
+    for nome_aba, dados in dados_por_aba.items():
+        if not dados or nome_aba not in caminho_aba: continue
+        caminho = caminho_aba[nome_aba]
+        aba = _Aba(entrada.read(caminho))
+        apagou_formula |= _preencher_aba(aba, dados, compartilhadas, linha_cabecalho, linha_inicial)
+        novas_partes[caminho] = etree.tostring(aba.raiz, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    removidas = set()
+    if novas_partes:
+        # Fórmulas que deixaram de existir não podem continuar na cadeia de
+        # cálculo; sem ela o Excel monta uma nova. O recálculo ao abrir
+        # atualiza as fórmulas das outras abas que dependem das preenchidas.
+        if apagou_formula:
+            for rel in [r for r in alvos.values() if r.get("Type") == TIPO_CALC_CHAIN]:
+                removidas.add(_caminho_parte("xl/workbook.xml", rel.get("Target")))
+                rels_livro.remove(rel)
+            if removidas:
+                novas_partes["xl/_rels/workbook.xml.rels"] = etree.tostring(rels_livro, xml_declaration=True, encoding="UTF-8", standalone=True)
+                tipos = etree.fromstring(entrada.read("[Content_Types].xml"))
+                for override in list(tipos.iter(_q("Override", NS_TIPOS))):
+                    if override.get("PartName", "").lstrip("/") in removidas: tipos.remove(override)
+                novas_partes["[Content_Types].xml"] = etree.tostring(tipos, xml_declaration=True, encoding="UTF-8", standalone=True)
+        calculo = livro.find(_q("calcPr"))
+        if calculo is None:
+            calculo = etree.Element(_q("calcPr"))
+            posteriores = [livro.find(_q(tag)) for tag in ("oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes", "webPublishing", "fileRecoveryPr", "webPublishObjects", "extLst")]
+            posteriores = [p for p in posteriores if p is not None]
+            if posteriores: posteriores[0].addprevious(calculo)
+            else: livro.append(calculo)
+        calculo.set("fullCalcOnLoad", "1")
+        novas_partes["xl/workbook.xml"] = etree.tostring(livro, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as destino:
+        for nome, info in partes.items():
+            if nome in removidas: continue
+            destino.writestr(info, novas_partes.get(nome) or entrada.read(nome), compress_type=info.compress_type)
+    return saida.getvalue()
@@ -0,0 +1,157 @@
+# ==============================================================================
+# ESCRITA DO RELATÓRIO LP&RH&ST (EXTRATOR)
+# ==============================================================================
+# O relatório é gravado em streaming: o XML de cada aba é gerado em blocos de
+# linhas e vai direto para o zip do .xlsx, sem montar a planilha inteira na
+# memória e sem passar célula a célula pelo openpyxl. O estilo do cabeçalho e
+# o formato "0.00" das colunas de valor ficam declarados uma vez no
+# styles.xml; cada célula só aponta para o estilo da sua coluna.
+#
+# Os valores seguem as mesmas conversões do DataFrame.to_excel (vazios como
+# célula vazia, infinitos como "inf", datas com o formato do pandas).
+# ==============================================================================
+
+import datetime
+import io
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_integer_dtype
+from nucleo.planilha import CARACTERES_ILEGAIS, data_excel, letra_coluna
+
+COLUNAS_DUAS_CASAS = ("VALOR TOTAL", "HORAS")
+LINHAS_POR_BLOCO = 10_000
+
+NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PACOTE = "http://schemas.openxmlformats.org/package/2006/relationships"
+DECLARACAO = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Índices em cellXfs do ESTILOS abaixo
+ESTILO_CABECALHO, ESTILO_DUAS_CASAS = 1, 2
+# Formatos que o DataFrame.to_excel dá a datas com hora, datas e durações
+ESTILOS_PANDAS = {datetime.datetime: 3, datetime.date: 4, datetime.timedelta: 5}
+
+ESTILOS = (
+    f'<styleSheet xmlns="{NS}">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="YYYY-MM-DD HH:MM:SS"/><numFmt numFmtId="165" formatCode="YYYY-MM-DD"/></numFmts>'
+    '<fonts count="2"><font><name val="Calibri"/><family val="2"/><color theme="1"/><sz val="11"/><scheme val="minor"/></font>'
+    '<font><b val="1"/><color rgb="00000000"/></font></fonts>'
+    '<fills count="3"><fill><patternFill/></fill><fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="00D9E1F2"/><bgColor rgb="00D9E1F2"/></patternFill></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="6"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" applyAlignment="1" xfId="0"><alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="2" fontId="0" fillId="0" borderId="0" applyNumberFormat="1" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" applyNumberFormat="1" xfId="0"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" applyNumberFormat="1" xfId="0"/>'
+    '<xf numFmtId="1" fontId="0" fillId="0" borderId="0" applyNumberFormat="1" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _texto(valor):
+    """Célula de texto (sem o <c>): tipo e conteúdo."""
+    texto = CARACTERES_ILEGAIS.sub("", valor)
+    espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+    return f' t="inlineStr"><is><t{espaco}>{escape(texto)}</t></is></c>'
+
+def _conteudo(valor):
+    """
+    Mesma conversão do DataFrame.to_excel para um valor qualquer: devolve o
+    final do XML da célula (depois do r="..."/s="...") e o estilo próprio do
+    valor (datas e durações) ou None.
+    """
+    if isinstance(valor, str): return (_texto(valor) if valor else "/>"), None
+    if pd.api.types.is_scalar(valor) and pd.isna(valor): return "/>", None
+    if isinstance(valor, (bool, np.bool_)): return f' t="b"><v>{int(bool(valor))}</v></c>', None
+    if isinstance(valor, (int, np.integer)): return f"><v>{int(valor)}</v></c>", None
+    if isinstance(valor, (float, np.floating)):
+        if np.isinf(valor): return _texto("inf" if valor > 0 else "-inf"), None
+        return f"><v>{float(valor)!r}</v></c>", None
+    if isinstance(valor, Decimal): return f"><v>{valor}</v></c>", None
+    if isinstance(valor, datetime.datetime): return f"><v>{data_excel(valor)!r}</v></c>", ESTILOS_PANDAS[datetime.datetime]
+    if isinstance(valor, datetime.date): return f"><v>{data_excel(valor)!r}</v></c>", ESTILOS_PANDAS[datetime.date]
+    if isinstance(valor, datetime.timedelta): return f"><v>{valor.total_seconds() / 86400!r}</v></c>", ESTILOS_PANDAS[datetime.timedelta]
+    return _texto(str(valor)), None
+
+def _celulas_coluna(serie, letra, primeira_linha, estilo):
+    """XML das células de uma coluna; colunas numéricas são convertidas de uma vez."""
+    s = f' s="{estilo}"' if estilo else ""
+    linhas = range(primeira_linha, primeira_linha + len(serie))
+    if is_bool_dtype(serie.dtype) and not serie.hasnans:
+        return [f'<c r="{letra}{n}"{s} t="b"><v>{int(v)}</v></c>' for n, v in zip(linhas, serie.to_numpy(dtype=bool).tolist())]
+    if is_integer_dtype(serie.dtype) and not serie.hasnans:
+        return [f'<c r="{letra}{n}"{s}><v>{v}</v></c>' for n, v in zip(linhas, serie.to_numpy(dtype=np.int64).tolist())]
+    if is_float_dtype(serie.dtype):
+        numeros = serie.to_numpy(dtype=float, na_value=np.nan)
+        if not np.isinf(numeros).any():
+            return [f'<c r="{letra}{n}"{s}/>' if v != v else f'<c r="{letra}{n}"{s}><v>{v!r}</v></c>' for n, v in zip(linhas, numeros.tolist())]
+    celulas = []
+    for n, valor in zip(linhas, serie.tolist()):
+        conteudo, estilo_valor = _conteudo(valor)
+        # O formato da coluna ("0.00") prevalece sobre o do valor
+        estilo_celula = s or (f' s="{estilo_valor}"' if estilo_valor else "")
+        celulas.append(f'<c r="{letra}{n}"{estilo_celula}{conteudo}')
+    return celulas
+
+def _escrever_aba(arquivo, df, colunas_duas_casas):
+    largura, altura = len(df.columns), len(df) + 1
+    dimensao = f"A1:{letra_coluna(largura)}{altura}" if largura else "A1"
+    arquivo.write(f'{DECLARACAO}<worksheet xmlns="{NS}"><dimension ref="{dimensao}"/><sheetData>'.encode())
+    if largura:
+        letras = [letra_coluna(c) for c in range(1, largura + 1)]
+        cabecalho = "".join(f'<c r="{letra}1" s="{ESTILO_CABECALHO}"{_conteudo(coluna)[0]}' for letra, coluna in zip(letras, df.columns))
+        arquivo.write(f'<row r="1">{cabecalho}</row>'.encode())
+        estilos = [ESTILO_DUAS_CASAS if coluna in colunas_duas_casas else None for coluna in df.columns]
+        for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+            bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO]
+            primeira = inicio + 2
+            colunas = [_celulas_coluna(bloco.iloc[:, i], letra, primeira, estilo) for i, (letra, estilo) in enumerate(zip(letras, estilos))]
+            arquivo.write("".join(f'<row r="{n}">{"".join(celulas)}</row>' for n, celulas in enumerate(zip(*colunas), primeira)).encode())
+    arquivo.write(b"</sheetData></worksheet>")
+
+
+def relatorio_xlsx(abas, colunas_duas_casas=COLUNAS_DUAS_CASAS):
+    """
+    .xlsx (bytes) com uma aba por item de `abas` ({nome: DataFrame}), na ordem
+    dada. Cabeçalho em negrito com fundo azul claro; as colunas de
+    `colunas_duas_casas` recebem o formato "0.00".
+    """
+    from openpyxl.writer.theme import theme_xml
+    nomes = list(abas)
+    tipo_planilha = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as pacote:
+        pacote.writestr("[Content_Types].xml", DECLARACAO + (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" ContentType="{tipo_planilha}.sheet.main+xml"/>'
+            f'<Override PartName="/xl/styles.xml" ContentType="{tipo_planilha}.styles+xml"/>'
+            '<Override PartName="/xl/theme/theme1.xml" ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{tipo_planilha}.worksheet+xml"/>' for i in range(1, len(nomes) + 1))
+            + '</Types>'))
+        pacote.writestr("_rels/.rels", DECLARACAO + (
+            f'<Relationships xmlns="{NS_PACOTE}"><Relationship Id="rId1" Type="{NS_REL}/officeDocument" Target="xl/workbook.xml"/></Relationships>'))
+        pacote.writestr("xl/workbook.xml", DECLARACAO + (
+            f'<workbook xmlns="{NS}" xmlns:r="{NS_REL}"><bookViews><workbookView activeTab="0"/></bookViews><sheets>'
+            + "".join(f'<sheet name={quoteattr(nome)} sheetId="{i}" r:id="rId{i}"/>' for i, nome in enumerate(nomes, 1))
+            + '</sheets><calcPr calcId="124519" fullCalcOnLoad="1"/></workbook>'))
+        n = len(nomes)
+        pacote.writestr("xl/_rels/workbook.xml.rels", DECLARACAO + (
+            f'<Relationships xmlns="{NS_PACOTE}">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in range(1, n + 1))
+            + f'<Relationship Id="rId{n + 1}" Type="{NS_REL}/styles" Target="styles.xml"/>'
+            + f'<Relationship Id="rId{n + 2}" Type="{NS_REL}/theme" Target="theme/theme1.xml"/>'
+            + '</Relationships>'))
+        pacote.writestr("xl/styles.xml", DECLARACAO + ESTILOS)
+        pacote.writestr("xl/theme/theme1.xml", theme_xml)
+        for i, nome in enumerate(nomes, 1):
+            with pacote.open(f"xl/worksheets/sheet{i}.xml", "w", force_zip64=True) as arquivo:
+                _escrever_aba(arquivo, abas[nome], colunas_duas_casas)
+    return saida.getvalue()
@@ -0,0 +1,420 @@
+# ==============================================================================
+# EXTRAÇÃO DOS DADOS DOS TAs (.docx)
+# ==============================================================================
+# Motor único usado pelo Extrator de LP&RH&ST e pelo Preenchimento do NewPiit.
+# Cada TA é aberto uma única vez e todas as células de todas as tabelas são
+# indexadas numa só passada; depois disso cada campo é um acesso a dicionário.
+# Os checkboxes são lidos direto do XML do documento; o pandoc continua
+# disponível como alternativa (PIERA_USAR_PANDOC=1).
+# ==============================================================================
+
+import io
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from lxml import etree
+from nucleo.cache_disco import CacheDisco, hash_conteudo
+from nucleo.conversor import converter_bytes, converter_lote
+
+# Campos de texto livre: (tabela, linha, coluna) da célula no TA.
+CAMPOS_CELULA = {
+    "Nome do Projeto": (0, 1, 0),
+    "Descrição do Projeto": (2, 0, 0),
+    "Justificativa TRL": (5, 0, 0),
+    "Elemento Inovador": (9, 0, 0),
+    "Barreiras/Desafios": (10, 0, 0),
+    "Metodologias": (11, 0, 0),
+    "Atividades Ano-Base": (14, 0, 0),
+    "Informações complementares": (15, 0, 0),
+    "Resultado Econômico": (16, 0, 0),
+    "Resultado de inovação": (17, 0, 0),
+    "Justificativa ODS": (19, 0, 0),
+    "Alinhamento Políticas (Justificativa)": (20, 0, 0),
+}
+
+# Campos do tipo "rótulo | valor" (rótulo na 1ª coluna, valor na 2ª).
+CAMPOS_ROTULO = {
+    "Data de início": "Data de início (dia/mês/ano):",
+    "Data de término": "Data de término (dia/mês/ano):",
+}
+
+TABELA_PALAVRAS_CHAVE = 8
+TOTAL_TABELAS_MINIMO = 21
+
+# Namespaces do XML do Word (os mesmos de docx.oxml.ns, sem importar o python-docx)
+NAMESPACES_WORD = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main", "w14": "http://schemas.microsoft.com/office/word/2010/wordml"}
+
+CLASSIFICACOES = {"Pesquisa básica dirigida": "PB", "Pesquisa aplicada": "PA", "Desenvolvimento experimental": "DE"}
+NATUREZAS = {"Processos Empresariais": "Processo", "Produto - Bens": "Produto", "Produto - Serviços": "Serviço"}
+
+USAR_PANDOC = os.environ.get("PIERA_USAR_PANDOC") == "1"
+# Processos usados para ler vários TAs ao mesmo tempo (PIERA_PROCESSOS sobrescreve).
+PROCESSOS_PADRAO = int(os.environ.get("PIERA_PROCESSOS") or 0) or min(4, os.cpu_count() or 1)
+# O pool nunca usa fork: o servidor do Streamlit tem várias threads, e um
+# processo criado com fork no meio de uma trava em uso (logging, SQLite, a
+# trava do conversor) pode travar para sempre. O forkserver cria os processos
+# a partir de um processo limpo e de uma thread só, que já importou este
+# módulo e o python-docx (assim cada processo não paga as importações); no
+# Windows, spawn.
+METODO_PROCESSOS = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def _contexto_processos():
+    contexto = multiprocessing.get_context(METODO_PROCESSOS)
+    if METODO_PROCESSOS == "forkserver": contexto.set_forkserver_preload([__name__, "docx"])
+    return contexto
+
+@contextmanager
+def _sem_script_principal():
+    """
+    Processos criados com forkserver ou spawn importam de novo o __main__ do
+    processo pai, e no Streamlit o __main__ é a página em execução: cada
+    processo do pool rodaria a página inteira. Enquanto os processos são
+    criados, o __main__ é um módulo vazio.
+    """
+    principal, vazio = sys.modules.get("__main__"), types.ModuleType("__main__")
+    sys.modules["__main__"] = vazio
+    try:
+        yield
+    finally:
+        if sys.modules.get("__main__") is vazio: sys.modules["__main__"] = principal
+
+# Versão do formato devolvido por `extrair_dados_ta`; aumente ao mudar os campos.
+# O hash deste arquivo também entra na versão do cache, então qualquer mudança
+# nas regras de extração invalida os resultados guardados.
+VERSAO_ESQUEMA = 1
+with open(__file__, "rb") as _fonte:
+    VERSAO_EXTRATOR = f"{VERSAO_ESQUEMA}-{hash_conteudo(_fonte.read())[:12]}"
+LIMITE_CACHE_BYTES = int(os.environ.get("PIERA_CACHE_TAS_MB") or 64) * 1024 * 1024
+
+MARCADO, DESMARCADO = "☒", "☐"
+# Caracteres de checkbox em fontes de símbolo (w:sym), por fonte.
+SIMBOLOS_CHECKBOX = {
+    "wingdings": {"F0FE": MARCADO, "F0FD": MARCADO, "F078": MARCADO, "F0A8": DESMARCADO, "F06F": DESMARCADO, "F071": DESMARCADO},
+    "wingdings 2": {"F053": MARCADO, "F054": MARCADO, "F052": MARCADO, "F0A3": DESMARCADO, "F02A": DESMARCADO},
+    "segoe ui symbol": {"2612": MARCADO, "2611": MARCADO, "2610": DESMARCADO},
+    "ms gothic": {"2612": MARCADO, "2611": MARCADO, "2610": DESMARCADO},
+}
+
+# Nomes dos campos na aba GERAL do NewPiit (Preenchimento).
+COLUNAS_GERAL = {
+    "Nome do Projeto": "Nome da atividade de PD&I (Nome do projeto igual no GERAL)",
+    "Descrição do Projeto": "Descrição do Projeto:",
+    "Justificativa TRL": "Justificativa TRL",
+    "Elemento Inovador": "Destaque o elemento tecnologicamente novo ou inovador da atividade: \xa0",
+    "Barreiras/Desafios": "Qual a barreira ou desafio tecnológico superável: \xa0",
+    "Metodologias": "Qual a metodologia / métodos utilizados: \xa0",
+    "Atividades Ano-Base": "Caso a atividade/projeto seja continuada, informar Atividade de PD&I desenvolvida no ano-base",
+    "Informações complementares": "Descrição Complementar: ",
+    "Resultado Econômico": "Resultado Econômico:",
+    "Resultado de inovação": "Resultado de Inovação:",
+    "Justificativa ODS": "Justificativa ODS",
+    "Alinhamento Políticas (Justificativa)": "Alinhamento do Projeto com Políticas, Programas e Estratégias Governamentais",
+    "TRL Inicial": "TRL Inicial",
+    "TRL Final": "TRL Final",
+    "Data de início": "Data de início: (formato dd/mm/aaaa)",
+    "Data de término": "Previsão de término: (formato dd/mm/aaaa)",
+    "Palavras-chave": "Palavras-Chave (Separadas por vírgula):",
+    "Classificação (PB, PA, DE)": "PB, PA ou DE:",
+    "Natureza": "Natureza (Produto, Processo ou Serviço):",
+    "Atividade Contínua": "A atividade é contínua (ciclo de vida maior que 1 ano)?\xa0 (Sim ou Não)",
+    "Alinhamento Políticas (Sim/Não)": "Os projetos de PD&I da empresa se alinham com as políticas públicas nacionais? (Sim ou Não)",
+    "Área do projeto": "Área do Projeto:",
+    "ODS": "ODS",
+}
+
+
+# ------------------------------------------------------------------------------
+# ÍNDICE DAS TABELAS
+# ------------------------------------------------------------------------------
+def qn(tag):
+    """'w:p' -> '{namespace do w}p'."""
+    prefixo, nome = tag.split(":")
+    return f"{{{NAMESPACES_WORD[prefixo]}}}{nome}"
+
+def _texto_celula(tc):
+    return "\n".join(p.text for p in tc.p_lst)
+
+def indexar_tabelas(doc):
+    """
+    Percorre todas as tabelas do documento uma única vez e devolve:
+      - grade: {(tabela, linha, coluna): texto} com as mesmas coordenadas de
+        `doc.tables[t].cell(l, c)` (células mescladas repetem o texto);
+      - rotulos: {texto da 1ª coluna: texto da 2ª coluna}, na ordem do documento.
+    """
+    grade, rotulos = {}, {}
+    for t, tabela in enumerate(doc.tables):
+        texto_acima = {}
+        for l, tr in enumerate(tabela._tbl.tr_lst):
+            c = 0
+            for tc in tr.tc_lst:
+                # Continuação de mescla vertical: o conteúdo é o da célula de cima
+                texto = texto_acima.get(c, "") if tc.vMerge == "continue" else _texto_celula(tc)
+                for _ in range(tc.grid_span):
+                    grade[(t, l, c)] = texto
+                    texto_acima[c] = texto
+                    c += 1
+            if c > 1:
+                rotulos.setdefault(grade[(t, l, 0)].strip(), grade[(t, l, 1)].strip())
+    return grade, rotulos
+
+def buscar_rotulo(rotulos, rotulo):
+    """Valor ao lado de `rotulo`; cai para busca por 'contém' se não houver chave exata."""
+    if rotulo in rotulos:
+        return rotulos[rotulo]
+    return next((valor for chave, valor in rotulos.items() if rotulo in chave), "")
+
+
+# ------------------------------------------------------------------------------
+# CHECKBOXES E SEÇÕES
+# ------------------------------------------------------------------------------
+def _valor_verdadeiro(elemento, atributo=qn("w:val")):
+    if elemento is None: return False
+    return elemento.get(atributo, "1").lower() in ("1", "true", "on")
+
+def _checkbox_sdt(sdt):
+    """☒/☐ de um controle de conteúdo do tipo checkbox (w14:checkbox), ou None."""
+    checkbox = sdt.find(f"{qn('w:sdtPr')}/{qn('w14:checkbox')}")
+    if checkbox is None: return None
+    return MARCADO if _valor_verdadeiro(checkbox.find(qn("w14:checked")), qn("w14:val")) else DESMARCADO
+
+def _checkbox_simbolo(sym):
+    fonte = (sym.get(qn("w:font")) or "").lower()
+    caractere = (sym.get(qn("w:char")) or "").upper()
+    return SIMBOLOS_CHECKBOX.get(fonte, {}).get(caractere, "")
+
+def _checkbox_campo(ffdata):
+    """☒/☐ de um campo de formulário legado (w:ffData/w:checkBox), ou None."""
+    checkbox = ffdata.find(qn("w:checkBox"))
+    if checkbox is None: return None
+    estado = checkbox.find(qn("w:checked"))
+    if estado is None: estado = checkbox.find(qn("w:default"))
+    return MARCADO if _valor_verdadeiro(estado) else DESMARCADO
+
+def texto_plano_xml(doc):
+    """
+    Texto do corpo do documento, lido numa única passada pelo XML, com os
+    checkboxes (w14:checkbox, w:sym e campos de formulário) trocados por ☒/☐.
+    Equivale à saída do pandoc usada por `get_section_text`: um parágrafo por
+    linha e as células de tabela separadas por tabulação.
+    """
+    partes = []
+    caminhada = etree.iterwalk(doc.element.body, events=("start", "end"))
+    for evento, el in caminhada:
+        tag = el.tag
+        if evento == "end":
+            if tag == qn("w:p"): partes.append("\n")
+            elif tag == qn("w:tc"): partes.append("\t")
+        elif tag == qn("w:t"):
+            partes.append(el.text or "")
+        elif tag == qn("w:tab"):
+            partes.append("\t")
+        elif tag in (qn("w:br"), qn("w:cr")):
+            partes.append("\n")
+        elif tag == qn("w:sym"):
+            partes.append(_checkbox_simbolo(el))
+        elif tag == qn("w:ffData"):
+            partes.append(_checkbox_campo(el) or "")
+        elif tag == qn("w:sdt"):
+            marca = _checkbox_sdt(el)
+            if marca is not None:
+                # O conteúdo do controle é só o glifo do checkbox, já emitido
+                partes.append(marca)
+                caminhada.skip_subtree()
+    return "".join(partes)
+
+def texto_plano_pandoc(doc_content_bytes):
+    return converter_bytes(doc_content_bytes)
+
+def get_section_text(full_text, start_keyword, end_keyword):
+    start_index = full_text.lower().find(start_keyword.lower())
+    end_index = full_text.lower().find(end_keyword.lower(), start_index)
+    if start_index == -1 or end_index == -1: return ""
+    return full_text[start_index:end_index]
+
+def find_checked_in_section(section_text, is_list=False):
+    found = re.findall(r'☒\s*([^☐☒\n\t]+)', section_text)
+    cleaned_found = [item.replace('*', '').strip() for item in found]
+    if is_list: return cleaned_found
+    return cleaned_found[0] if cleaned_found else ""
+
+def _primeiro_numero(texto):
+    encontrado = re.search(r'\d+', texto)
+    return encontrado.group(0) if encontrado else ""
+
+def _traduzir(texto, opcoes):
+    return next((sigla for opcao, sigla in opcoes.items() if opcao in texto), "")
+
+
+# ------------------------------------------------------------------------------
+# EXTRAÇÃO
+# ------------------------------------------------------------------------------
+def extrair_dados_ta(doc_content_bytes, usar_pandoc=None, texto_pandoc=None):
+    """
+    Extrai todos os campos de um TA. Devolve um dicionário com os nomes de
+    campo do Extrator (os mesmos da aba LP); use `linha_geral` para os nomes
+    da aba GERAL do NewPiit. Com `usar_pandoc=True` os checkboxes são lidos
+    pela conversão do pandoc em vez do XML (`texto_pandoc` aproveita uma
+    conversão já feita, p.ex. por `converter_lote`).
+    """
+    import docx
+    if usar_pandoc is None: usar_pandoc = USAR_PANDOC
+    doc = docx.Document(io.BytesIO(doc_content_bytes))
+    if len(doc.tables) < TOTAL_TABELAS_MINIMO:
+        raise ValueError(f"O documento tem {len(doc.tables)} tabelas; o modelo de TA tem pelo menos {TOTAL_TABELAS_MINIMO}.")
+    grade, rotulos = indexar_tabelas(doc)
+    resultados = {campo: grade.get(coordenada, "").strip() for campo, coordenada in CAMPOS_CELULA.items()}
+
+    resultados["TRL Inicial"] = _primeiro_numero(buscar_rotulo(rotulos, "TRL Inicial:"))
+    resultados["TRL Final"] = _primeiro_numero(buscar_rotulo(rotulos, "TRL Final:"))
+    for campo, rotulo in CAMPOS_ROTULO.items():
+        resultados[campo] = buscar_rotulo(rotulos, rotulo)
+
+    palavras, l = [], 0
+    while (TABELA_PALAVRAS_CHAVE, l, 0) in grade:
+        segunda = grade.get((TABELA_PALAVRAS_CHAVE, l, 1), "").strip()
+        if "Palavra-chave" in grade[(TABELA_PALAVRAS_CHAVE, l, 0)] and segunda: palavras.append(segunda)
+        l += 1
+    resultados["Palavras-chave"] = ", ".join(palavras)
+
+    if usar_pandoc:
+        plain_text = texto_pandoc if texto_pandoc is not None else texto_plano_pandoc(doc_content_bytes)
+    else:
+        plain_text = texto_plano_xml(doc)
+    resultados["Classificação (PB, PA, DE)"] = _traduzir(find_checked_in_section(get_section_text(plain_text, "Classificação da pesquisa", "TRL Inicial")), CLASSIFICACOES)
+    resultados["Natureza"] = _traduzir(find_checked_in_section(get_section_text(plain_text, "Natureza Predominante", "Elemento Tecnologicamente Novo")), NATUREZAS)
+    resultados["Atividade Contínua"] = find_checked_in_section(get_section_text(plain_text, "A atividade é contínua", "ATIVIDADES DE P,D&I"))
+    resultados["Alinhamento Políticas (Sim/Não)"] = find_checked_in_section(get_section_text(plain_text, "políticas públicas nacionais", "Alinhamento do Projeto com Políticas"))
+    resultados["Área do projeto"] = ", ".join(find_checked_in_section(get_section_text(plain_text, "Área do projeto", "Palavras-Chave"), is_list=True))
+    ods_encontrados = find_checked_in_section(get_section_text(plain_text, "Objetivos de Desenvolvimento Sustentável", "Justificativa (ODS)"), is_list=True)
+    resultados["ODS"] = ", ".join(n for n in map(_primeiro_numero, ods_encontrados) if n)
+    return resultados
+
+def linha_geral(dados):
+    """Converte o resultado de `extrair_dados_ta` para os campos da aba GERAL do NewPiit."""
+    linha = {COLUNAS_GERAL[campo]: valor for campo, valor in dados.items() if campo in COLUNAS_GERAL}
+    if dados.get("Atividade Contínua") == "Não":
+        for campo in ["Data de início", "Data de término", "Atividades Ano-Base"]:
+            linha[COLUNAS_GERAL[campo]] = ""
+    if dados.get("Alinhamento Políticas (Sim/Não)") == "Não":
+        linha[COLUNAS_GERAL["Alinhamento Políticas (Justificativa)"]] = ""
+    return linha
+
+def _extrair_com_erro(doc_content_bytes, usar_pandoc, texto_pandoc=None):
+    """((dados, erro), segundos) da extração de um TA."""
+    inicio = time.perf_counter()
+    try:
+        resultado = extrair_dados_ta(doc_content_bytes, usar_pandoc, texto_pandoc), None
+    except Exception as e:
+        resultado = None, str(e)
+    return resultado, time.perf_counter() - inicio
+
+_cache_extracao = None
+
+def cache_extracao():
+    """Cache em disco dos resultados de `extrair_dados_ta`, pelo SHA-256 do .docx."""
+    global _cache_extracao
+    if _cache_extracao is None:
+        _cache_extracao = CacheDisco("extracao_ta", LIMITE_CACHE_BYTES, VERSAO_EXTRATOR)
+    return _cache_extracao
+
+def resumo_cache_extracao():
+    """Texto curto com os contadores do cache de TAs (vazio se o cache não estiver disponível)."""
+    try:
+        e = cache_extracao().estatisticas()
+    except (OSError, sqlite3.Error):
+        return ""
+    return f"Cache de TAs: {e['acertos']} reaproveitados, {e['falhas']} extraídos ({e['entradas']} guardados, {e['bytes'] / 1024:.0f} KB)."
+
+def extrair_lote(conteudos, processos=None, ao_concluir=None, usar_pandoc=None, usar_cache=True, instrumentacao=None, nomes=None):
+    """
+    Extrai vários TAs num pool de até `processos` processos.
+
+    Devolve uma lista de (dados, erro) na mesma ordem de `conteudos`; um TA com
+    problema tem dados=None e a mensagem em `erro`, sem interromper os demais.
+    `ao_concluir(concluidos, total, indice)` é chamado a cada TA terminado,
+    na ordem em que terminam (útil para barras de progresso).
+
+    Com `usar_cache`, TAs já extraídos antes (mesmo conteúdo, qualquer nome de
+    arquivo) vêm do cache em disco, e arquivos idênticos no mesmo lote são
+    extraídos uma vez só.
+
+    Com `instrumentacao` (ver nucleo.instrumentacao), o tempo de cada TA é
+    registrado com o nome de `nomes` (ou o índice) e a origem do resultado
+    ('extraido', 'erro', 'cache' ou 'repetido'), e a conversão em lote do
+    pandoc vira uma etapa própria.
+    """
+    if usar_pandoc is None: usar_pandoc = USAR_PANDOC
+    def documentar(indice, segundos, origem):
+        if instrumentacao: instrumentacao.registrar_documento(nomes[indice] if nomes else indice, segundos, origem=origem)
+    total = len(conteudos)
+    resultados = [None] * total
+    concluidos = 0
+    def concluir(indice, resultado):
+        nonlocal concluidos
+        dados, erro = resultado
+        resultados[indice] = (dict(dados) if dados is not None else None, erro)
+        concluidos += 1
+        if ao_concluir: ao_concluir(concluidos, total, indice)
+
+    metodo = "pandoc" if usar_pandoc else "xml"
+    chaves = [f"{hash_conteudo(conteudo)}:{metodo}" for conteudo in conteudos]
+    em_cache = {}
+    if usar_cache:
+        try:
+            em_cache = cache_extracao().obter_varios(chaves)
+        except (OSError, sqlite3.Error):
+            usar_cache = False
+    pendentes = {}  # chave -> índices com esse conteúdo
+    for indice, chave in enumerate(chaves):
+        if chave in em_cache:
+            concluir(indice, (em_cache[chave], None))
+            documentar(indice, None, 'cache')
+        else: pendentes.setdefault(chave, []).append(indice)
+
+    novos = {}
+    def registrar(chave, resultado_medido):
+        resultado, segundos = resultado_medido
+        for n, indice in enumerate(pendentes[chave]):
+            concluir(indice, resultado)
+            documentar(indice, segundos if n == 0 else None, 'repetido' if n else ('erro' if resultado[1] else 'extraido'))
+        if resultado[1] is None: novos[chave] = resultado[0]
+
+    # No modo pandoc, todos os TAs pendentes são convertidos numa única execução;
+    # se o lote falhar (p.ex. um arquivo corrompido), cada TA converte o seu.
+    textos_pandoc = {}
+    if usar_pandoc and len(pendentes) > 1:
+        try:
+            with instrumentacao.etapa('conversao_pandoc', documentos=len(pendentes)) if instrumentacao else nullcontext():
+                textos_pandoc = dict(zip(pendentes, converter_lote([conteudos[indices[0]] for indices in pendentes.values()])))
+        except Exception:
+            textos_pandoc = {}
+
+    processos = max(1, min(processos or PROCESSOS_PADRAO, len(pendentes) or 1))
+    if processos == 1:
+        for chave, indices in pendentes.items():
+            registrar(chave, _extrair_com_erro(conteudos[indices[0]], usar_pandoc, textos_pandoc.get(chave)))
+    else:
+        with ProcessPoolExecutor(max_workers=processos, mp_context=_contexto_processos()) as pool:
+            # Os processos do pool são criados dentro do submit
+            with _sem_script_principal():
+                futuros = {pool.submit(_extrair_com_erro, conteudos[indices[0]], usar_pandoc, textos_pandoc.get(chave)): chave for chave, indices in pendentes.items()}
+            for futuro in as_completed(futuros):
+                try:
+                    resultado = futuro.result()
+                except Exception as e:  # processo do pool morreu
+                    resultado = (None, str(e)), None
+                registrar(futuros[futuro], resultado)
+
+    if usar_cache and novos:
+        try:
+            cache_extracao().gravar_varios(novos)
+        except (OSError, sqlite3.Error):
+            pass
+    return resultados
+
@@ -0,0 +1,747 @@
+# ==============================================================================
+# FORMATADOR PARA TEXTO DO NEWPIIT
+# ==============================================================================
+# Leitura do NewPiit, mapeamento das colunas de cada aba e geração do texto
+# formatado (usados pela página Formatador_para_texto_NewPiit). O thefuzz e o
+# rapidfuzz só são importados quando o mapeamento por similaridade é
+# necessário, e o resultado do mapeamento de cada cabeçalho fica em cache.
+# ==============================================================================
+
+import io
+import json
+import re
+import sqlite3
+import threading
+import zipfile
+from datetime import date
+import numpy as np
+import pandas as pd
+from nucleo.cache_disco import CacheDisco, hash_conteudo
+
+
+# ==============================================================================
+#                    MAPEAMENTO INTELIGENTE DE COLUNAS
+# ==============================================================================
+
+def normalizar_nome_coluna(nome):
+    """Função de limpeza para padronizar os nomes de colunas."""
+    if not isinstance(nome, str):
+        return ''
+    return nome.lower().strip()
+
+def mapear_colunas_similares(colunas_da_planilha, colunas_esperadas, limiar=80):
+    """
+    (FERRAMENTA INTERNA) Encontra colunas por similaridade (fuzzy match) para typos.
+    Todas as pontuações (esperadas x reais) saem de uma única matriz do
+    rapidfuzz, com o mesmo pré-processamento e a mesma pontuação (WRatio) do
+    thefuzz.process.extractOne.
+    """
+    from rapidfuzz import fuzz, process
+    from thefuzz.utils import full_process
+    mapeamento = {}
+    colunas_nao_encontradas = []
+    mapa_reais_normalizadas = {normalizar_nome_coluna(c): c for c in colunas_da_planilha}
+    colunas_reais_normalizadas = list(mapa_reais_normalizadas.keys())
+    if not colunas_reais_normalizadas:
+        return mapeamento, list(colunas_esperadas)
+
+    consultas = [full_process(full_process(normalizar_nome_coluna(nome)), force_ascii=True) for nome in colunas_esperadas]
+    opcoes = [full_process(real, force_ascii=True) for real in colunas_reais_normalizadas]
+    pontuacoes = process.cdist(consultas, opcoes, scorer=fuzz.WRatio, dtype=np.float64)
+
+    for nome_esperado, linha in zip(colunas_esperadas, pontuacoes):
+        melhor = int(linha.argmax())
+        melhor_match_normalizado, pontuacao = colunas_reais_normalizadas[melhor], int(round(linha[melhor]))
+
+        if pontuacao >= limiar:
+            nome_real_encontrado = mapa_reais_normalizadas[melhor_match_normalizado]
+            mapeamento[nome_esperado] = nome_real_encontrado
+        else:
+            colunas_nao_encontradas.append(nome_esperado)
+    return mapeamento, colunas_nao_encontradas
+
+def mapear_colunas_nativas(colunas_da_planilha, colunas_esperadas):
+    """(FERRAMENTA INTERNA) Encontra colunas por correspondência exata ou por 'contém'."""
+    mapeamento = {}
+    colunas_nao_encontradas = []
+    mapa_reais_normalizadas = {normalizar_nome_coluna(c): c for c in colunas_da_planilha}
+    colunas_reais_normalizadas = list(mapa_reais_normalizadas.keys())
+    colunas_ja_mapeadas = set()
+
+    for nome_esperado in colunas_esperadas:
+        nome_esperado_normalizado = normalizar_nome_coluna(nome_esperado)
+        melhor_match_encontrado = None
+
+        if nome_esperado_normalizado in colunas_reais_normalizadas and nome_esperado_normalizado not in colunas_ja_mapeadas:
+            melhor_match_encontrado = nome_esperado_normalizado
+        else:
+            candidatos = [r for r in colunas_reais_normalizadas if r not in colunas_ja_mapeadas and (nome_esperado_normalizado in r or r in nome_esperado_normalizado)]
+            if candidatos:
+                melhor_match_encontrado = min(candidatos, key=lambda real: abs(len(real) - len(nome_esperado_normalizado)))
+
+        if melhor_match_encontrado:
+            nome_real_original = mapa_reais_normalizadas[melhor_match_encontrado]
+            mapeamento[nome_esperado] = nome_real_original
+            colunas_ja_mapeadas.add(melhor_match_encontrado)
+        else:
+            colunas_nao_encontradas.append(nome_esperado)
+    return mapeamento, colunas_nao_encontradas
+
+def mapear_colunas_inteligentemente(colunas_da_planilha, colunas_esperadas, limiar_fuzzy=80):
+    """
+    FUNÇÃO PRINCIPAL DE MAPEAMENTO. Combina os métodos para máxima precisão.
+    É a única função que você precisa chamar.
+    """
+
+    mapeamento_inicial, nao_encontradas_inicial = mapear_colunas_nativas(colunas_da_planilha, colunas_esperadas)
+
+    if not nao_encontradas_inicial:
+        return mapeamento_inicial, []
+
+    colunas_reais_restantes = [c for c in colunas_da_planilha if c not in mapeamento_inicial.values()]
+    colunas_esperadas_restantes = nao_encontradas_inicial
+
+    mapeamento_fuzzy, nao_encontradas_final = mapear_colunas_similares(
+        colunas_reais_restantes,
+        colunas_esperadas_restantes,
+        limiar=limiar_fuzzy
+    )
+
+    mapeamento_final = {**mapeamento_inicial, **mapeamento_fuzzy}
+
+    return mapeamento_final, nao_encontradas_final
+
+# Aumente ao mudar as regras de mapeamento acima: os resultados guardados deixam de valer
+VERSAO_MAPEAMENTO = "1"
+_mapeamentos = {}
+_cache_mapeamentos = None
+
+def cache_mapeamentos():
+    """Cache em disco dos mapeamentos de colunas, pela impressão digital do cabeçalho."""
+    global _cache_mapeamentos
+    if _cache_mapeamentos is None:
+        _cache_mapeamentos = CacheDisco("mapeamento_colunas", 4 * 1024 * 1024, VERSAO_MAPEAMENTO)
+    return _cache_mapeamentos
+
+def resolver_mapeamento(colunas_da_planilha, colunas_esperadas, limiar_fuzzy=80):
+    """
+    O mesmo que mapear_colunas_inteligentemente, com cache pela impressão
+    digital do cabeçalho (colunas da planilha, colunas esperadas e limiar).
+    O resultado fica na memória do processo e em disco (CacheDisco), então é
+    compartilhado pelas páginas e sobrevive a reinícios; como os modelos de
+    NewPiit quase não mudam, quase toda consulta é um acerto.
+    """
+    colunas = list(colunas_da_planilha)
+    chave = hash_conteudo(json.dumps([[repr(c) for c in colunas], list(colunas_esperadas), limiar_fuzzy], ensure_ascii=False))
+    guardado = _mapeamentos.get(chave)
+    if guardado is None:
+        try:
+            guardado = cache_mapeamentos().obter(chave)
+        except (OSError, sqlite3.Error):
+            guardado = None
+        if guardado is None:
+            mapeamento, nao_encontradas = mapear_colunas_inteligentemente(colunas, colunas_esperadas, limiar_fuzzy)
+            # Posições, e não nomes: os nomes das colunas nem sempre são texto (e não iriam para o JSON)
+            posicoes = {id(c): i for i, c in reversed(list(enumerate(colunas)))}
+            guardado = {"mapeamento": [[esperada, posicoes[id(real)]] for esperada, real in mapeamento.items()], "nao_encontradas": nao_encontradas}
+            try:
+                cache_mapeamentos().gravar(chave, guardado)
+            except (OSError, sqlite3.Error):
+                pass
+        if len(_mapeamentos) >= 256: _mapeamentos.clear()
+        _mapeamentos[chave] = guardado
+    return {esperada: colunas[posicao] for esperada, posicao in guardado["mapeamento"]}, list(guardado["nao_encontradas"])
+
+def formatar_cpf(cpf):
+    """
+    Recebe um CPF como string, formata para XXX.XXX.XXX-XX.
+    Adiciona um '0' à esquerda se tiver 10 dígitos.
+    Se inválido, retorna o valor original.
+    """
+    # Passo 1: Limpa o CPF, removendo qualquer caractere que não seja um dígito.
+    cpf_limpo = ''.join(filter(str.isdigit, str(cpf)))
+
+    # Passo 2: NOVO - Verifica se o CPF tem 10 dígitos e, se tiver, adiciona um zero à esquerda.
+    if len(cpf_limpo) == 10:
+        cpf_limpo = '0' + cpf_limpo
+
+    # Passo 3: Agora, verifica se o CPF (potencialmente corrigido) tem 11 dígitos para formatar.
+    if len(cpf_limpo) == 11:
+        # Aplica a máscara de formatação.
+        return f'{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}'
+    else:
+        # Se o CPF original não tinha 10 ou 11 dígitos, retorna o valor original sem formatação.
+        return cpf
+
+# ==============================================================================
+#           MONTAGEM DO TEXTO POR COLUNAS
+# ==============================================================================
+# As abas podem ter milhares de linhas, então o texto é montado coluna a
+# coluna (limpeza, formatação de números e CPF, concatenação das linhas de
+# cada bloco), e não linha a linha com iterrows. O resultado é o mesmo de
+# str(valor).strip(), f"{valor:,.2f}" e formatar_cpf aplicados célula a célula.
+#
+# As colunas de texto são arrays numpy de objetos: somar arrays concatena os
+# textos elemento a elemento sem o custo fixo das operações .str do pandas,
+# que pesaria nas abas pequenas. O pandas só entra nas expressões regulares.
+
+_texto = np.frompyfunc(str, 1, 1)
+_texto_limpo = np.frompyfunc(lambda valor: str(valor).strip(), 1, 1)
+_minusculas = np.frompyfunc(str.lower, 1, 1)
+_tamanho = np.frompyfunc(len, 1, 1)
+
+def texto_coluna(valores):
+    """str(valor).strip() de cada célula, como array; células vazias viram ''."""
+    dados = valores.to_numpy(dtype=object)
+    return _texto_limpo(np.where(pd.isna(dados), '', dados)).astype(object)
+
+def formatar_numero_br(valores, prefixo=""):
+    """
+    Números no formato brasileiro (1.234,56), com `prefixo` (p.ex. "R$ "), como
+    array. Zero e células vazias viram ''.
+    """
+    numeros = pd.to_numeric(valores, errors='coerce').fillna(0).to_numpy(dtype=float)
+    # '%.2f' arredonda exatamente como f"{valor:,.2f}"; os separadores de milhar entram depois
+    texto = pd.Series(np.char.mod('%.2f', numeros), dtype=str).str.replace('.', ',', regex=False)
+    maior = np.abs(numeros[np.isfinite(numeros)]).max(initial=0)
+    for _ in range(len(f"{maior:.0f}") // 3):
+        texto = texto.str.replace(r'^(-?\d+)(\d{3})', r'\1.\2', regex=True)
+    return np.where(numeros != 0, prefixo + texto.to_numpy(dtype=object), '').astype(object)
+
+# Datas completas em texto: dd/mm/aaaa (como pede o modelo) ou aaaa-mm-dd, com ou sem hora
+_DATA_BR = r'\d{1,2}/\d{1,2}/\d{4}(?: \d{1,2}:\d{2}(?::\d{2})?)?'
+_DATA_ISO = r'\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?'
+
+def formatar_datas(valores):
+    """
+    Datas no formato dd/mm/aaaa, como Series de objetos. Só são convertidas as
+    células com data do Excel ou com uma data completa em texto; o resto
+    ("Em andamento", "02/2019", "5/3/21", datas inválidas) fica como está na
+    planilha, em vez de virar vazio ou ganhar um dia que não foi informado.
+    """
+    celulas = pd.Series(valores.to_numpy(dtype=object), index=valores.index, dtype=object)
+    textos = celulas.astype(str).str.strip()
+    e_data = celulas.map(lambda valor: isinstance(valor, date)).astype(bool)
+    e_br = ~e_data & textos.str.fullmatch(_DATA_BR).fillna(False).astype(bool)
+    e_iso = ~e_data & textos.str.fullmatch(_DATA_ISO).fillna(False).astype(bool)
+    # dayfirst só nos textos dd/mm: nos aaaa-mm-dd ele trocaria o dia com o mês
+    datas = pd.concat([pd.to_datetime(celulas[e_data], errors='coerce'),
+                       pd.to_datetime(textos[e_br], format='mixed', dayfirst=True, errors='coerce'),
+                       pd.to_datetime(textos[e_iso], format='ISO8601', errors='coerce')])
+    formatadas = datas.dt.strftime('%d/%m/%Y').dropna()
+    celulas[formatadas.index] = formatadas.to_numpy(dtype=object)
+    return celulas
+
+def formatar_cpf_coluna(cpfs):
+    """formatar_cpf da coluna inteira, como array."""
+    dados = cpfs.to_numpy(dtype=object)
+    originais = _texto(np.where(pd.isna(dados), '', dados)).astype(object)
+    digitos = pd.Series(originais, dtype=str).str.replace(r'\D', '', regex=True).to_numpy(dtype=object)
+    quantidade = _tamanho(digitos)
+    digitos = np.where(quantidade == 10, '0' + digitos, digitos)
+    mascarados = pd.Series(digitos, dtype=str).str.replace(r'^(\d{3})(\d{3})(\d{3})(\d{2})$', r'\1.\2.\3-\4', regex=True).to_numpy(dtype=object)
+    return np.where((quantidade == 10) | (quantidade == 11), mascarados, originais).astype(object)
+
+def numerar(rotulo, quantidade):
+    """'<rotulo>1', '<rotulo>2', ..., '<rotulo><quantidade>'."""
+    return rotulo + np.arange(1, quantidade + 1).astype(str).astype(object)
+
+class TextoFormatado(str):
+    """
+    O texto de uma aba (um str comum, para copiar, baixar ou exportar) que
+    sabe onde começa cada bloco (colaborador, projeto, dispêndio) e de que
+    projeto é cada bloco. A página usa isso para mostrar alguns blocos por
+    vez, buscar e pular para um projeto sem dividir o texto de novo.
+
+    `inicios` tem uma posição a mais que o número de blocos: o bloco i é
+    texto[inicios[i]:inicios[i + 1] - 1] (o -1 tira a quebra de linha entre
+    os blocos). `projetos` é o valor da coluna de projeto de cada bloco, ou
+    None se não se sabe.
+    """
+
+    def __new__(cls, texto, inicios=None, projetos=None):
+        objeto = super().__new__(cls, texto)
+        objeto.inicios = np.array([0, len(texto) + 1], dtype=np.int64) if inicios is None else inicios
+        objeto.projetos = projetos
+        return objeto
+
+    @classmethod
+    def de_blocos(cls, blocos, projetos=None):
+        tamanhos = np.fromiter(map(len, blocos), dtype=np.int64, count=len(blocos)) + 1
+        return cls("\n".join(blocos), np.concatenate(([0], np.cumsum(tamanhos))), projetos)
+
+    @property
+    def quantidade_blocos(self):
+        return len(self.inicios) - 1
+
+    def trecho(self, blocos):
+        """Texto dos `blocos` (índices em ordem crescente), juntos como no texto inteiro."""
+        blocos = np.asarray(blocos, dtype=np.int64)
+        if len(blocos) == 0: return ""
+        if blocos[-1] - blocos[0] == len(blocos) - 1:  # blocos seguidos: uma fatia só
+            return str.__getitem__(self, slice(int(self.inicios[blocos[0]]), int(self.inicios[blocos[-1] + 1]) - 1))
+        return "\n".join(str.__getitem__(self, slice(int(self.inicios[i]), int(self.inicios[i + 1]) - 1)) for i in blocos)
+
+    def buscar(self, termo):
+        """Índices dos blocos que contêm `termo` (sem diferenciar maiúsculas)."""
+        if not termo: return np.arange(self.quantidade_blocos)
+        posicoes = np.fromiter((achado.start() for achado in re.finditer(re.escape(termo), self, re.IGNORECASE)), dtype=np.int64)
+        return np.unique(np.searchsorted(self.inicios, posicoes, side="right") - 1)
+
+    def primeiros_blocos(self):
+        """{projeto: índice do primeiro bloco do projeto}, na ordem do menu de filtro."""
+        if self.projetos is None: return {}
+        primeiros = {}
+        for i, projeto in enumerate(self.projetos):
+            if not pd.isna(projeto): primeiros.setdefault(projeto, i)
+        try: ordem = sorted(primeiros)
+        except TypeError: ordem = sorted(primeiros, key=str)
+        return {projeto: primeiros[projeto] for projeto in ordem}
+
+def juntar_blocos(partes, projetos=None):
+    """
+    Concatena as partes (arrays alinhados ou textos fixos) de cada bloco e
+    junta os blocos com quebra de linha, num TextoFormatado. `projetos` é a
+    coluna de projeto das mesmas linhas.
+    """
+    blocos = partes[0]
+    for parte in partes[1:]:
+        blocos = blocos + parte
+    return TextoFormatado.de_blocos(blocos.tolist(), None if projetos is None else projetos.to_numpy(dtype=object))
+
+def _condicional(condicao, linhas):
+    """As `linhas` onde `condicao` é verdadeira, '' nas demais."""
+    return np.where(condicao, linhas, '').astype(object)
+
+
+# ==============================================================================
+#           FUNÇÃO PARA PROCESSAR A ABA "RH"
+# ==============================================================================
+def processar_aba_rh(df, mapeamento, projeto_selecionado):
+    """
+    Recebe um DataFrame da aba RH, o mapeamento de colunas e o projeto selecionado,
+    e RETORNA uma única string com os dados formatados para exibição.
+    """
+    # --- 1. LÓGICA DE FILTRO ---
+    # Define o nome "ideal" da coluna de projeto para buscar no dicionário de mapeamento
+    coluna_projeto_ideal = 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)'
+    # Pega o nome "real" da coluna que foi encontrado na planilha
+    coluna_projeto_real = mapeamento[coluna_projeto_ideal]
+
+    # Filtra o DataFrame se um projeto específico foi escolhido no menu do Streamlit
+    if projeto_selecionado != "Listar TODOS os colaboradores":
+        df = df[df[coluna_projeto_real] == projeto_selecionado]
+
+    # Se o DataFrame ficar vazio após o filtro, retorna uma mensagem amigável
+    if df.empty:
+        return "Nenhum colaborador encontrado para a seleção feita."
+
+    # --- 2. PREPARAÇÃO DOS DADOS ---
+    # Pula as linhas com o nome do colaborador em branco
+    nomes = texto_coluna(df[mapeamento["NOME"]])
+    df, nomes = df[nomes != ''], nomes[nomes != '']
+    if df.empty:
+        return ""
+    coluna = lambda nome: texto_coluna(df[mapeamento[nome]])
+
+    # --- 3. GERAÇÃO DO TEXTO DE SAÍDA ---
+    return juntar_blocos([
+        numerar("Colaborador ", len(df)),
+        "\nProjeto: ", coluna(coluna_projeto_ideal),
+        "\nCPF: ", formatar_cpf_coluna(df[mapeamento["CPF"]]),
+        "\nNome: ", nomes,
+        "\nTitulação: ", coluna("TITULAÇÃO"),
+        "\nFunção: ", coluna("FUNÇÃO"),
+        "\nSexo: ", coluna("SEXO"),
+        "\nTotal Horas (Anual): ", formatar_numero_br(df[mapeamento["Total Horas (Anual)"]]),
+        "\nDedicação: ", coluna("DEDICAÇÃO"),
+        "\nValor: ", formatar_numero_br(df[mapeamento["Valor (R$)"]], "R$ "),
+        "\nAtividade: ", coluna('Descreva as atividades realizadas pelo profissional (cargo, atividades exercidas e contribuições no projeto)'),
+        "\n" + "-" * 30,
+    ], projetos=df[coluna_projeto_real])
+
+# ==============================================================================
+#           FUNÇÃO PARA PROCESSAR A ABA "GERAL"
+# ==============================================================================
+def processar_aba_geral(df, mapeamento, projeto_selecionado):
+    """
+    Recebe um DataFrame da aba GERAL, o mapeamento e o projeto selecionado,
+    e RETORNA uma string com os dados formatados para exibição.
+    """
+    # --- 1. LÓGICA DE FILTRO ---
+    coluna_projeto_ideal = "Nome da atividade de PD&I: "
+    coluna_projeto_real = mapeamento[coluna_projeto_ideal]
+
+    # Filtra o DataFrame se um projeto específico foi escolhido
+    if projeto_selecionado != "Listar TODOS os projetos":
+        df = df[df[coluna_projeto_real] == projeto_selecionado]
+
+    if df.empty:
+        return "Nenhum projeto encontrado para a seleção feita."
+
+    # --- 2. PREPARAÇÃO DOS DADOS ---
+    projetos = texto_coluna(df[coluna_projeto_real])
+    validos = (projetos != '') & (_minusculas(projetos) != 'nan')
+    df, projetos = df[validos], projetos[validos]
+    if df.empty:
+        return ""
+    coluna = lambda nome: texto_coluna(df[mapeamento[nome]])
+    atividade_continua = coluna("A atividade é contínua (ciclo de vida maior que 1 ano)?  (Sim ou Não)")
+    alinha_politicas = coluna("Os projetos de PD&I da empresa se alinham com as políticas públicas nacionais? (Sim ou Não)")
+
+    # --- 3. GERAÇÃO DO TEXTO DE SAÍDA ---
+    # Datas e atividade do ano-base só para atividades contínuas; descrição do alinhamento só se houver alinhamento
+    return juntar_blocos([
+        numerar("--- Projeto ", len(df)), " ---",
+        "\nProjeto: ", projetos,
+        "\nDescrição do Projeto: ", coluna("Descrição do Projeto:"),
+        "\nPB, PA ou DE: ", coluna("PB, PA ou DE:"),
+        "\nÁrea do Projeto: ", coluna("Área do Projeto:"),
+        "\nPalavras-Chave: ", coluna("Palavras-Chave (Separadas por vírgula):"),
+        "\nNatureza: ", coluna("Natureza (Produto, Processo ou Serviço):"),
+        "\nElemento Novo: ", coluna("Destaque o elemento tecnologicamente novo ou inovador da atividade: "),
+        "\nBarreiras: ", coluna("Qual a barreira ou desafio tecnológico superável: "),
+        "\nMetodologia: ", coluna("Qual a metodologia / métodos utilizados: "),
+        "\nAtividade contínua?: ", atividade_continua,
+        _condicional(_minusculas(atividade_continua) != 'não',
+                     "\nData de início: " + coluna("Data de início: (formato dd/mm/aaaa)")
+                     + "\nPrevisão de término: " + coluna("Previsão de término: (formato dd/mm/aaaa)")
+                     + "\nAtividade de PD&I desenvolvida no ano-base: " + coluna("Caso a atividade/projeto seja continuada, informar Atividade de PD&I desenvolvida no ano-base")),
+        "\nInformações Complementares: ", coluna("Descrição Complementar: "),
+        "\nResultado Econômico: ", coluna("Resultado Econômico:"),
+        "\nResultado de Inovação: ", coluna("Resultado de Inovação:"),
+        "\nTRL Inicial: ", coluna("TRL Inicial"),
+        "\nTRL Final: ", coluna("TRL Final"),
+        "\nJustificativa TRL: ", coluna("Justificativa TRL"),
+        "\nODS: ", coluna("ODS"),
+        "\nJustificativa ODS: ", coluna("Justificativa ODS"),
+        "\nAlinha-se às políticas públicas?: ", alinha_politicas,
+        _condicional(_minusculas(alinha_politicas) != 'não',
+                     "\nDescrição alinhamento às Políticas Públicas: " + coluna("Alinhamento do Projeto com Políticas, Programas e Estratégias Governamentais")),
+        "\n" + "-" * 30,
+    ], projetos=df[coluna_projeto_real])
+
+# ==============================================================================
+#           FUNÇÃO PARA PROCESSAR A ABA "DISPÊNDIOS ST"
+# ==============================================================================
+def processar_aba_dispêndios_st(df, mapeamento, projeto_selecionado):
+    """
+    Recebe um DataFrame da aba DISPÊNDIOS ST, o mapeamento e o projeto selecionado,
+    e RETORNA uma string com os dados formatados para exibição.
+    """
+    # --- 1. LÓGICA DE FILTRO ---
+    coluna_projeto_ideal = 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)'
+    coluna_projeto_real = mapeamento[coluna_projeto_ideal]
+
+    # Filtra o DataFrame se um projeto específico foi escolhido
+    if projeto_selecionado != "Listar TODOS os dispêndios":
+        df = df[df[coluna_projeto_real] == projeto_selecionado]
+
+    if df.empty:
+        return "Nenhum dispêndio de Serviço de Terceiro e Viagens encontrado para a seleção feita."
+
+    # --- 2. PREPARAÇÃO DOS DADOS ---
+    prestadores = texto_coluna(df[mapeamento["Prestador de Serviço"]])
+    validos = (prestadores != '') & (_minusculas(prestadores) != 'nan')
+    df, prestadores = df[validos], prestadores[validos]
+    if df.empty:
+        return ""
+    coluna = lambda nome: texto_coluna(df[mapeamento[nome]])
+
+    # --- 3. GERAÇÃO DO TEXTO DE SAÍDA ---
+    return juntar_blocos([
+        numerar("Dispêndio ", len(df)),
+        "\nProjeto: ", coluna(coluna_projeto_ideal),
+        "\nPorte/Tipo de serviço: ", coluna("TIPO"),
+        "\nSituação: ", coluna("Situação (Contratado, Em Execução, Terminado)"),
+        "\nRazão Social: ", prestadores,
+        "\nCNPJ/CPF: ", coluna("CNPJ/CPF"),
+        "\nCaracterização do Serviço Realizado: ", coluna("Caracterizar o Serviço Realizado"),
+        "\nValor Total: ", formatar_numero_br(df[mapeamento["Valor Total"]], "R$ "),
+        "\nCentro, departamento ou grupo de pesquisa da universidade/instituição de pesquisa contratada: ",
+        coluna("Centro, departamento ou grupo de pesquisa da universidade/instituição de pesquisa contratada "),
+        "\nCentro, Departamento ou Grupo de Pesquisa (caso seja credenciada Embrapii): ",
+        coluna("Centro, Departamento ou Grupo de Pesquisa (caso seja credenciada Embrapii)"),
+        "\nCódigo do projeto Embrapii (caso seja credenciada Embrapii): ",
+        coluna("Código do projeto Embrapii (caso seja credenciada Embrapii)"),
+        "\n" + "-" * 30,
+    ], projetos=df[coluna_projeto_real])
+
+# ==============================================================================
+#           FUNÇÃO PARA PROCESSAR A ABA "DISPÊNDIOS MC"
+# ==============================================================================
+def processar_aba_dispêndios_mc(df, mapeamento, projeto_selecionado):
+    """
+    Recebe um DataFrame da aba DISPÊNDIOS MC, o mapeamento e o projeto selecionado,
+    e RETORNA uma string com os dados formatados para exibição.
+    """
+    # --- 1. LÓGICA DE FILTRO ---
+    coluna_projeto_ideal = 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)'
+    coluna_projeto_real = mapeamento[coluna_projeto_ideal]
+
+    # Filtra o DataFrame se um projeto específico foi escolhido
+    if projeto_selecionado != "Listar TODOS os dispêndios de materiais":
+        df = df[df[coluna_projeto_real] == projeto_selecionado]
+
+    if df.empty:
+        return "Nenhum dispêndio de Material de Cosumo encontrado para a seleção feita."
+
+    # --- 2. PREPARAÇÃO DOS DADOS ---
+    materiais = texto_coluna(df[mapeamento["Identificação do Material"]])
+    validos = (materiais != '') & (_minusculas(materiais) != 'nan')
+    df, materiais = df[validos], materiais[validos]
+    if df.empty:
+        return ""
+
+    # --- 3. GERAÇÃO DO TEXTO DE SAÍDA ---
+    return juntar_blocos([
+        numerar("Dispêndio MC ", len(df)),
+        "\nProjeto: ", texto_coluna(df[mapeamento[coluna_projeto_ideal]]),
+        "\nMaterial: ", materiais,
+        "\nDescrição: ", texto_coluna(df[mapeamento["Descrição"]]),
+        "\nValor Total: ", formatar_numero_br(df[mapeamento["Valor Total"]], "R$ "),
+        "\n" + "-" * 30,
+    ], projetos=df[coluna_projeto_real])
+
+
+def preparar_tipos(aba_selecionada_nome, df, mapeamento):
+    """Pré-processamento de tipos de dados (centralizado aqui)."""
+    if aba_selecionada_nome == "Informações dos projetos (Aba GERAL)":
+        colunas_data = ["Data de início: (formato dd/mm/aaaa)", "Previsão de término: (formato dd/mm/aaaa)"]
+        for col in colunas_data:
+            df[mapeamento[col]] = formatar_datas(df[mapeamento[col]])
+    elif aba_selecionada_nome == "Informações dos colaboradores (Aba RH)":
+        df[mapeamento['Valor (R$)']] = pd.to_numeric(df[mapeamento['Valor (R$)']], errors='coerce')
+        df[mapeamento['Total Horas (Anual)']] = pd.to_numeric(df[mapeamento['Total Horas (Anual)']], errors='coerce')
+    elif "DISPÊNDIOS" in aba_selecionada_nome:
+        df[mapeamento['Valor Total']] = pd.to_numeric(df[mapeamento['Valor Total']], errors='coerce')
+
+
+# --- PAINEL DE CONTROLE CENTRAL ---
+# Este dicionário é o cérebro do app. Ele diz à página tudo o que ela precisa
+# saber sobre cada aba: qual o nome da planilha, quais colunas esperar, qual
+# função de processamento chamar, etc.
+CONFIG_ABAS = {
+    "Informações dos projetos (Aba GERAL)": {
+        "sheet_name": "GERAL",
+        "skiprows": 9,
+        "funcao_processamento": processar_aba_geral,
+        "filtro_projeto": True,
+        "coluna_filtro_ideal": "Nome da atividade de PD&I: ",
+        "label_filtro_todos": "Listar TODOS os projetos",
+        "colunas_esperadas": [
+            "Nome da atividade de PD&I: ", "Descrição do Projeto:", "PB, PA ou DE:", "Área do Projeto:",
+            "Palavras-Chave (Separadas por vírgula):", "Natureza (Produto, Processo ou Serviço):",
+            "Destaque o elemento tecnologicamente novo ou inovador da atividade: ",
+            "Qual a barreira ou desafio tecnológico superável: ", "Qual a metodologia / métodos utilizados: ",
+            "A atividade é contínua (ciclo de vida maior que 1 ano)?  (Sim ou Não)",
+            "Data de início: (formato dd/mm/aaaa)", "Previsão de término: (formato dd/mm/aaaa)",
+            "Caso a atividade/projeto seja continuada, informar Atividade de PD&I desenvolvida no ano-base",
+            "Descrição Complementar: ", "Resultado Econômico:", "Resultado de Inovação:", "TRL Inicial", "TRL Final",
+            "Justificativa TRL", "ODS", "Justificativa ODS",
+            "Os projetos de PD&I da empresa se alinham com as políticas públicas nacionais? (Sim ou Não)",
+            "Alinhamento do Projeto com Políticas, Programas e Estratégias Governamentais"
+        ]
+    },
+    "Serviços de Terceiros e Viagens (Aba DISPÊNDIOS ST)": {
+        "sheet_name": "DISPÊNDIOS ST",
+        "skiprows": 9,
+        "funcao_processamento": processar_aba_dispêndios_st,
+        "filtro_projeto": True,
+        "coluna_filtro_ideal": "Nome da atividade de PD&I (Nome do projeto igual no GERAL)",
+        "label_filtro_todos": "Listar TODOS os dispêndios",
+        "colunas_esperadas": [
+            'Nome da atividade de PD&I (Nome do projeto igual no GERAL)', 'TIPO', 'Situação (Contratado, Em Execução, Terminado)',
+            'Prestador de Serviço', 'CNPJ/CPF', 'Caracterizar o Serviço Realizado', 'Valor Total',
+            'Centro, departamento ou grupo de pesquisa da universidade/instituição de pesquisa contratada ',
+            'Centro, Departamento ou Grupo de Pesquisa (caso seja credenciada Embrapii)',
+            'Código do projeto Embrapii (caso seja credenciada Embrapii)'
+        ]
+    },
+    "Dispêndios com Material de Consumo (Aba DISPÊNDIOS MC)": {
+        "sheet_name": "DISPÊNDIOS MC",
+        "skiprows": 9,
+        "funcao_processamento": processar_aba_dispêndios_mc,
+        "filtro_projeto": True,
+        "coluna_filtro_ideal": 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)',
+        "label_filtro_todos": "Listar TODOS os dispêndios de materiais",
+        "colunas_esperadas": [
+            'Nome da atividade de PD&I (Nome do projeto igual no GERAL)', 'Identificação do Material', 'Descrição', 'Valor Total'
+        ]
+    },
+    "Informações dos colaboradores (Aba RH)": {
+        "sheet_name": "RH",
+        "skiprows": 9,
+        "funcao_processamento": processar_aba_rh,
+        "filtro_projeto": True,
+        "coluna_filtro_ideal": 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)',
+        "label_filtro_todos": "Listar TODOS os colaboradores",
+        "colunas_esperadas": [
+            'Nome da atividade de PD&I (Nome do projeto igual no GERAL)', 'CPF', 'NOME', 'TITULAÇÃO', 'FUNÇÃO',
+            'SEXO', 'Total Horas (Anual)', 'DEDICAÇÃO', 'Valor (R$)',
+            'Descreva as atividades realizadas pelo profissional (cargo, atividades exercidas e contribuições no projeto)'
+        ]
+    }
+}
+
+
+# ==============================================================================
+#           LEITURA DO NEWPIIT (UMA VEZ POR ARQUIVO)
+# ==============================================================================
+def preparar_aba(aba_selecionada_nome, df):
+    """
+    Mapeia as colunas e converte os tipos de uma aba lida do NewPiit.
+    Devolve (df preparado, mapeamento, colunas não encontradas); o `df`
+    recebido não é alterado.
+    """
+    config = CONFIG_ABAS[aba_selecionada_nome]
+    mapeamento, nao_encontradas = resolver_mapeamento(df.columns, config["colunas_esperadas"])
+    if nao_encontradas:
+        return df, mapeamento, nao_encontradas
+    df = df.copy()
+    preparar_tipos(aba_selecionada_nome, df, mapeamento)
+    return df, mapeamento, []
+
+
+class IndiceProjetos:
+    """
+    Linhas de cada projeto de uma aba, agrupadas uma única vez: `projetos` é a
+    lista ordenada para o menu de filtro e `linhas(projeto)` devolve o bloco
+    do projeto (na ordem da planilha) sem percorrer a aba inteira.
+    """
+
+    def __init__(self, df, coluna_projeto):
+        self.df = df
+        self._posicoes = df.groupby(coluna_projeto, sort=False, dropna=True).indices
+        try:
+            self.projetos = sorted(self._posicoes)
+        except TypeError:  # nomes de projeto com tipos misturados (texto e número)
+            self.projetos = sorted(self._posicoes, key=str)
+
+    def __contains__(self, projeto):
+        return projeto in self._posicoes
+
+    def linhas(self, projeto):
+        posicoes = self._posicoes.get(projeto)
+        return self.df.iloc[posicoes] if posicoes is not None else self.df.iloc[:0]
+
+
+class NewPiitLido:
+    """
+    As abas do CONFIG_ABAS de um NewPiit, lidas de uma vez (o openpyxl abre o
+    arquivo uma única vez). O mapeamento de colunas e a conversão de tipos de
+    cada aba são feitos na primeira vez que a aba é pedida e guardados, então
+    trocar de aba ou de filtro não lê nem prepara nada de novo. O mesmo vale
+    para o índice de projetos de cada aba e para o texto de cada projeto: voltar
+    a um projeto já visto devolve o texto pronto.
+
+    Os DataFrames devolvidos são compartilhados entre as chamadas (e, na
+    página, entre as sessões): não devem ser alterados.
+    """
+
+    def __init__(self, conteudo):
+        self.hash = hash_conteudo(conteudo)
+        self.tamanho = len(conteudo)
+        with pd.ExcelFile(io.BytesIO(conteudo), engine="openpyxl") as arquivo:
+            existentes = set(arquivo.sheet_names)
+            self.planilhas = {}
+            for config in CONFIG_ABAS.values():
+                nome = config["sheet_name"]
+                if nome in existentes and nome not in self.planilhas:
+                    self.planilhas[nome] = arquivo.parse(nome, skiprows=config["skiprows"])
+        self._preparadas = {}
+        self._indices = {}
+        self._textos = {}
+        self._trava = threading.RLock()
+
+    def aba(self, aba_selecionada_nome):
+        """(df preparado, mapeamento, colunas não encontradas) de uma aba do CONFIG_ABAS."""
+        with self._trava:
+            if aba_selecionada_nome not in self._preparadas:
+                nome = CONFIG_ABAS[aba_selecionada_nome]["sheet_name"]
+                if nome not in self.planilhas:
+                    raise ValueError(f"O arquivo não tem a aba '{nome}'.")
+                self._preparadas[aba_selecionada_nome] = preparar_aba(aba_selecionada_nome, self.planilhas[nome])
+            return self._preparadas[aba_selecionada_nome]
+
+    def indice(self, aba_selecionada_nome):
+        """IndiceProjetos da aba, pela coluna de projeto do CONFIG_ABAS (a aba precisa ter todas as colunas)."""
+        with self._trava:
+            if aba_selecionada_nome not in self._indices:
+                df, mapeamento, nao_encontradas = self.aba(aba_selecionada_nome)
+                if nao_encontradas:
+                    raise ValueError(f"Colunas não encontradas na aba '{CONFIG_ABAS[aba_selecionada_nome]['sheet_name']}': {', '.join(nao_encontradas)}")
+                self._indices[aba_selecionada_nome] = IndiceProjetos(df, mapeamento[CONFIG_ABAS[aba_selecionada_nome]["coluna_filtro_ideal"]])
+            return self._indices[aba_selecionada_nome]
+
+    def texto(self, aba_selecionada_nome, projeto_selecionado):
+        """
+        Texto formatado da aba para um projeto do índice ou, com o rótulo
+        "Listar TODOS..." da aba, para a aba inteira. Gerado uma vez por
+        projeto. Sempre um TextoFormatado (as mensagens de "nenhum encontrado"
+        viram um bloco só).
+        """
+        chave = (aba_selecionada_nome, projeto_selecionado)
+        with self._trava:
+            if chave in self._textos: return self._textos[chave]
+            config = CONFIG_ABAS[aba_selecionada_nome]
+            indice = self.indice(aba_selecionada_nome)
+        _, mapeamento, _ = self.aba(aba_selecionada_nome)
+        # O bloco já vem filtrado, então a função recebe o rótulo de "todos" e não filtra de novo
+        todos = not config.get("filtro_projeto") or projeto_selecionado == config["label_filtro_todos"]
+        linhas = indice.df if todos else indice.linhas(projeto_selecionado)
+        texto = config["funcao_processamento"](linhas, mapeamento, config["label_filtro_todos"])
+        if not isinstance(texto, TextoFormatado): texto = TextoFormatado(texto)
+        with self._trava:
+            return self._textos.setdefault(chave, texto)
+
+
+# ==============================================================================
+#           EXPORTAÇÃO DE TODAS AS ABAS DE UMA VEZ
+# ==============================================================================
+def _nome_txt(nome, usados):
+    """Nome de arquivo .txt válido no Windows e único dentro do zip."""
+    base = re.sub(r'[\\/:*?"<>|\s]+', ' ', str(nome)).strip(' .')[:100].strip(' .') or 'sem nome'
+    if re.fullmatch(r'(?i)(con|prn|aux|nul|com\d|lpt\d)', base): base = f"_{base}"
+    final, numero = base, 2
+    while final.lower() in usados:
+        final, numero = f"{base} ({numero})", numero + 1
+    usados.add(final.lower())
+    return f"{final}.txt"
+
+def _secao(titulo, texto):
+    return f"{'=' * 30}\n{titulo}\n{'=' * 30}\n{texto}\n"
+
+def exportar_zip(newpiit, por="projeto"):
+    """
+    Texto de todas as abas do CONFIG_ABAS num zip, de uma vez: com
+    por="projeto", um .txt por projeto com uma seção por aba (na ordem do
+    CONFIG_ABAS); com por="aba", um .txt por aba com todos os projetos.
+    Abas que faltam no arquivo ou sem todas as colunas ficam de fora e são
+    listadas num LEIA-ME.txt. Devolve (bytes do zip, [abas ignoradas]).
+    """
+    abas, ignoradas = [], []
+    for nome in CONFIG_ABAS:
+        try:
+            abas.append((nome, newpiit.indice(nome)))
+        except ValueError as e:
+            ignoradas.append(f"{nome}: {e}")
+
+    saida = io.BytesIO()
+    usados = set()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as pacote:
+        if por == "aba":
+            for nome, _ in abas:
+                pacote.writestr(_nome_txt(CONFIG_ABAS[nome]["sheet_name"], usados),
+                                newpiit.texto(nome, CONFIG_ABAS[nome]["label_filtro_todos"]) + "\n")
+        else:
+            projetos = {projeto for _, indice in abas for projeto in indice.projetos}
+            try: projetos = sorted(projetos)
+            except TypeError: projetos = sorted(projetos, key=str)
+            for projeto in projetos:
+                secoes = [_secao(nome, newpiit.texto(nome, projeto)) for nome, indice in abas if projeto in indice]
+                pacote.writestr(_nome_txt(projeto, usados), "\n".join(secoes))
+        if ignoradas:
+            pacote.writestr("LEIA-ME.txt", "Abas que ficaram de fora:\n" + "\n".join(f"- {motivo}" for motivo in ignoradas) + "\n")
+    return saida.getvalue(), ignoradas
+
@@ -0,0 +1,362 @@
+# ==============================================================================
+# CHAMADAS AO GEMINI
+# ==============================================================================
+# Listas grandes (atividades de RH, itens de projeto) são divididas em lotes
+# cujo prompt cabe num orçamento de tokens. Cada lote vira um prompt com as
+# instruções e os itens em JSON, e a resposta tem de ser uma lista JSON com um
+# resultado por item, na mesma ordem. Os lotes são enviados em paralelo
+# (threads), respeitando um limite de requisições por minuto; falhas
+# temporárias (limite de taxa, erro 5xx, rede, resposta que não é a lista
+# esperada) são repetidas com espera exponencial. Um lote que falha em todas
+# as tentativas deixa None nos seus itens e gera um aviso; os outros lotes
+# seguem normalmente.
+#
+# O transporte é qualquer função prompt -> texto da resposta. TransporteSDK
+# usa o google.generativeai (pesado para importar, por isso só é carregado na
+# primeira chamada); TransporteHTTP fala direto com a API REST só com a
+# biblioteca padrão, e a URL pode apontar para um servidor local de testes.
+#
+# As respostas ficam num cache em disco (CacheDisco), por item: a chave é o
+# modelo mais o hash das instruções e do item normalizados (espaços
+# colapsados, JSON com chaves ordenadas). Assim, gerar de novo as descrições
+# dos mesmos colaboradores não chama a API, mesmo que a lista venha em outra
+# ordem ou misturada com itens novos; e, com tudo em cache, nada é enviado
+# (funciona sem rede). Só respostas válidas são guardadas. As entradas vencem
+# em PIERA_GEMINI_CACHE_DIAS dias (padrão 30) e o cache tem no máximo
+# PIERA_CACHE_GEMINI_MB (padrão 32); PIERA_GEMINI_SEM_CACHE=1, ou
+# usar_cache=False, ignora o cache.
+#
+# PIERA_GEMINI_CONCORRENCIA, PIERA_GEMINI_RPM e PIERA_GEMINI_TOKENS_LOTE
+# mudam os padrões.
+# ==============================================================================
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from nucleo.cache_disco import CacheDisco, hash_conteudo
+
+MODELO_PADRAO = 'gemini-pro'
+URL_API = "https://generativelanguage.googleapis.com/v1beta"
+CONCORRENCIA_PADRAO = int(os.environ.get("PIERA_GEMINI_CONCORRENCIA") or 4)
+REQUISICOES_POR_MINUTO = int(os.environ.get("PIERA_GEMINI_RPM") or 60)
+TOKENS_POR_LOTE = int(os.environ.get("PIERA_GEMINI_TOKENS_LOTE") or 6000)
+# A resposta também tem limite de tamanho: lotes com muitos itens curtos estouram a saída, não a entrada
+ITENS_POR_LOTE = 40
+TENTATIVAS = 4
+ESPERA_INICIAL = 1.0
+ESPERA_MAXIMA = 30.0
+USAR_CACHE = os.environ.get("PIERA_GEMINI_SEM_CACHE") != "1"
+VALIDADE_CACHE_SEGUNDOS = float(os.environ.get("PIERA_GEMINI_CACHE_DIAS") or 30) * 24 * 3600
+LIMITE_CACHE_BYTES = int(os.environ.get("PIERA_CACHE_GEMINI_MB") or 32) * 1024 * 1024
+# Aumente ao mudar montar_prompt ou o formato das respostas guardadas
+VERSAO_CACHE = "1"
+
+# Exceções do google.api_core que valem nova tentativa (comparadas pelo nome, para não importar o SDK aqui)
+_ERROS_TEMPORARIOS_SDK = {'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+                          'BadGateway', 'GatewayTimeout', 'DeadlineExceeded'}
+
+
+class ErroTemporario(RuntimeError):
+    """Falha que pode dar certo numa nova tentativa. `espera` vem do Retry-After, quando houver."""
+
+    def __init__(self, mensagem, espera=None):
+        super().__init__(mensagem)
+        self.espera = espera
+
+
+class RespostaInvalida(ValueError):
+    """A resposta não é uma lista JSON com um resultado por item."""
+
+
+def _sem_aviso(nivel, texto):
+    pass
+
+
+# ------------------------------------------------------------------------------
+# TRANSPORTES
+# ------------------------------------------------------------------------------
+class TransporteSDK:
+    """Envia o prompt pelo google.generativeai."""
+
+    def __init__(self, api_key, modelo=MODELO_PADRAO):
+        self.api_key, self.modelo = api_key, modelo
+        self._modelo = None
+        self._trava = threading.Lock()
+
+    def __call__(self, prompt):
+        with self._trava:
+            if self._modelo is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._modelo = genai.GenerativeModel(self.modelo)
+        try:
+            return self._modelo.generate_content(prompt).text
+        except Exception as e:
+            if type(e).__name__ in _ERROS_TEMPORARIOS_SDK: raise ErroTemporario(f"{type(e).__name__}: {e}") from e
+            raise
+
+
+def _segundos_retry_after(valor):
+    try: return max(0.0, float(valor))
+    except (TypeError, ValueError): return None
+
+class TransporteHTTP:
+    """Envia o prompt para o endpoint generateContent da API REST (ou de um servidor compatível em `url_base`)."""
+
+    def __init__(self, api_key, modelo=MODELO_PADRAO, url_base=URL_API, tempo_limite=120):
+        self.api_key, self.modelo, self.tempo_limite = api_key, modelo, tempo_limite
+        self.url = f"{url_base.rstrip('/')}/models/{modelo}:generateContent"
+
+    def __call__(self, prompt):
+        corpo = json.dumps({'contents': [{'parts': [{'text': prompt}]}]}).encode('utf-8')
+        requisicao = urllib.request.Request(self.url, data=corpo, method='POST',
+                                            headers={'Content-Type': 'application/json', 'x-goog-api-key': self.api_key})
+        try:
+            with urllib.request.urlopen(requisicao, timeout=self.tempo_limite) as resposta:
+                dados = json.load(resposta)
+        except urllib.error.HTTPError as e:
+            detalhe = e.read().decode('utf-8', 'replace').strip()[:300]
+            if e.code == 429 or e.code >= 500:
+                raise ErroTemporario(f"HTTP {e.code}: {detalhe}", _segundos_retry_after(e.headers.get('Retry-After'))) from e
+            raise RuntimeError(f"HTTP {e.code}: {detalhe}") from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise ErroTemporario(f"{type(e).__name__}: {e}") from e
+        except json.JSONDecodeError as e:
+            raise RespostaInvalida(f"a API devolveu algo que não é JSON ({e})") from e
+        try:
+            return ''.join(parte.get('text', '') for parte in dados['candidates'][0]['content']['parts'])
+        except (KeyError, IndexError, TypeError):
+            raise RespostaInvalida(f"resposta sem texto: {json.dumps(dados, ensure_ascii=False)[:300]}")
+
+
+def transporte_padrao(api_key, modelo=MODELO_PADRAO):
+    """O SDK quando está instalado; senão a API REST, que não precisa de dependências."""
+    from importlib.util import find_spec
+    try: tem_sdk = find_spec('google.generativeai') is not None
+    except ModuleNotFoundError: tem_sdk = False
+    return TransporteSDK(api_key, modelo) if tem_sdk else TransporteHTTP(api_key, modelo)
+
+
+# ------------------------------------------------------------------------------
+# CACHE DAS RESPOSTAS
+# ------------------------------------------------------------------------------
+_cache_respostas = None
+
+def cache_respostas():
+    """Cache em disco das respostas do Gemini, por modelo e hash do prompt normalizado."""
+    global _cache_respostas
+    if _cache_respostas is None:
+        _cache_respostas = CacheDisco("gemini", LIMITE_CACHE_BYTES, VERSAO_CACHE, validade_segundos=VALIDADE_CACHE_SEGUNDOS)
+    return _cache_respostas
+
+def resumo_cache_gemini():
+    """Texto curto com os contadores do cache do Gemini (vazio se o cache não estiver disponível)."""
+    try:
+        e = cache_respostas().estatisticas()
+    except (OSError, sqlite3.Error):
+        return ""
+    return (f"Cache do Gemini: {e['acertos']} respostas reaproveitadas, {e['falhas']} pedidas à API, {e['vencidas']} vencidas "
+            f"({e['entradas']} guardadas, {e['bytes'] / 1024:.0f} KB).")
+
+def _normalizar(texto):
+    return " ".join(texto.split())
+
+def chave_prompt(modelo, prompt):
+    return f"prompt:{modelo}:{hash_conteudo(_normalizar(prompt))}"
+
+def chave_item(modelo, instrucoes, item):
+    item_json = json.dumps(item, ensure_ascii=False, sort_keys=True, default=str)
+    return f"item:{modelo}:{hash_conteudo(_normalizar(instrucoes) + chr(0) + _normalizar(item_json))}"
+
+
+# ------------------------------------------------------------------------------
+# LOTES
+# ------------------------------------------------------------------------------
+class LimiteTaxa:
+    """
+    No máximo `por_minuto` requisições por minuto entre todas as threads, com
+    rajadas de até `rajada` requisições seguidas (balde de fichas).
+    """
+
+    def __init__(self, por_minuto, rajada=1):
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self.rajada = max(1, rajada)
+        self._fichas = float(self.rajada)
+        self._ultimo = time.monotonic()
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        if not self.intervalo: return
+        with self._trava:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._ultimo) / self.intervalo) - 1
+            self._ultimo = agora
+            espera = -self._fichas * self.intervalo
+        if espera > 0: time.sleep(espera)
+
+
+def estimar_tokens(texto):
+    """Estimativa grosseira (4 caracteres por token), suficiente para dimensionar os lotes."""
+    return len(texto) // 4 + 1
+
+def montar_prompt(instrucoes, itens):
+    return (f"{instrucoes.strip()}\n\n"
+            f"Itens ({len(itens)}, em JSON):\n{json.dumps(itens, ensure_ascii=False)}\n\n"
+            f"Responda somente com uma lista JSON com exatamente {len(itens)} elementos, um para cada item e na mesma ordem.")
+
+def dividir_em_lotes(instrucoes, itens, tokens_por_lote=TOKENS_POR_LOTE, itens_por_lote=ITENS_POR_LOTE):
+    """
+    Listas de índices de `itens`, em ordem, cujo prompt cabe em
+    `tokens_por_lote`. Um item que sozinho passa do orçamento vai num lote só
+    dele.
+    """
+    base = estimar_tokens(montar_prompt(instrucoes, []))
+    lotes, atual, tokens = [], [], base
+    for i, item in enumerate(itens):
+        custo = estimar_tokens(json.dumps(item, ensure_ascii=False)) + 1
+        if atual and (tokens + custo > tokens_por_lote or len(atual) >= itens_por_lote):
+            lotes.append(atual)
+            atual, tokens = [], base
+        atual.append(i)
+        tokens += custo
+    if atual: lotes.append(atual)
+    return lotes
+
+def ler_lista_json(texto, quantidade=None):
+    """Lista JSON da resposta (sem as cercas ```json), conferindo a quantidade de elementos."""
+    limpo = texto.strip().replace('```json', '').replace('```', '').strip()
+    try: resultado = json.loads(limpo)
+    except json.JSONDecodeError as e: raise RespostaInvalida(f"a resposta não é um JSON válido ({e})") from e
+    if not isinstance(resultado, list): raise RespostaInvalida("a resposta não é uma lista JSON")
+    if quantidade is not None and len(resultado) != quantidade:
+        raise RespostaInvalida(f"a resposta tem {len(resultado)} elementos para {quantidade} itens")
+    return resultado
+
+
+class ClienteLote:
+    """
+    Envia listas de itens ao modelo em lotes paralelos.
+
+        cliente = ClienteLote(transporte_padrao(api_key))
+        descricoes = cliente.processar("Descreva a atividade de cada colaborador...", itens)
+
+    `transporte` é qualquer função prompt -> texto da resposta; o nome do
+    modelo para as chaves do cache vem de `transporte.modelo`. `cache` é um
+    CacheDisco (padrão: cache_respostas()).
+    """
+
+    def __init__(self, transporte, concorrencia=CONCORRENCIA_PADRAO, requisicoes_por_minuto=REQUISICOES_POR_MINUTO,
+                 tokens_por_lote=TOKENS_POR_LOTE, itens_por_lote=ITENS_POR_LOTE,
+                 tentativas=TENTATIVAS, espera_inicial=ESPERA_INICIAL, espera_maxima=ESPERA_MAXIMA,
+                 usar_cache=USAR_CACHE, cache=None):
+        self.transporte = transporte
+        self.modelo = getattr(transporte, 'modelo', '')
+        self.usar_cache = usar_cache
+        self._cache = cache
+        self.concorrencia = max(1, concorrencia)
+        self.tokens_por_lote, self.itens_por_lote = tokens_por_lote, itens_por_lote
+        self.tentativas = max(1, tentativas)
+        self.espera_inicial, self.espera_maxima = espera_inicial, espera_maxima
+        self.limite = LimiteTaxa(requisicoes_por_minuto, rajada=self.concorrencia)
+
+    def _ler_cache(self, chaves):
+        if not self.usar_cache: return {}
+        try:
+            return (self._cache or cache_respostas()).obter_varios(chaves)
+        except (OSError, sqlite3.Error):
+            self.usar_cache = False
+            return {}
+
+    def _gravar_cache(self, itens):
+        if not (self.usar_cache and itens): return
+        try:
+            (self._cache or cache_respostas()).gravar_varios(itens)
+        except (OSError, sqlite3.Error):
+            self.usar_cache = False
+
+    def _espera(self, tentativa, erro):
+        if getattr(erro, 'espera', None) is not None: return min(self.espera_maxima, erro.espera)
+        return min(self.espera_maxima, self.espera_inicial * 2 ** (tentativa - 1)) * random.uniform(0.5, 1.0)
+
+    def chamar(self, prompt, quantidade=None):
+        """Lista JSON da resposta a um prompt (do cache, se já foi feito), repetindo as falhas temporárias."""
+        chave = chave_prompt(self.modelo, prompt)
+        em_cache = self._ler_cache([chave])
+        if chave in em_cache: return em_cache[chave]
+        resultado = self._enviar(prompt, quantidade)
+        self._gravar_cache({chave: resultado})
+        return resultado
+
+    def _enviar(self, prompt, quantidade):
+        for tentativa in range(1, self.tentativas + 1):
+            self.limite.aguardar()
+            try:
+                return ler_lista_json(self.transporte(prompt), quantidade)
+            except (ErroTemporario, RespostaInvalida) as e:
+                if tentativa == self.tentativas: raise
+                time.sleep(self._espera(tentativa, e))
+
+    def processar(self, instrucoes, itens, avisar=_sem_aviso):
+        """
+        Um resultado por item de `itens`, na ordem original. Itens já
+        respondidos antes vêm do cache; só os outros são enviados, e itens
+        repetidos vão uma vez só. Os itens de um lote que falhou ficam com
+        None e `avisar(nivel, texto)` recebe o motivo. Um erro que não é
+        temporário (chave inválida, requisição recusada) cancela os lotes que
+        ainda não foram enviados.
+        """
+        itens = list(itens)
+        resultados = [None] * len(itens)
+        chaves = [chave_item(self.modelo, instrucoes, item) for item in itens]
+        em_cache = self._ler_cache(chaves)
+        pendentes = {}  # chave -> índices com esse item
+        for indice, chave in enumerate(chaves):
+            if chave in em_cache: resultados[indice] = em_cache[chave]
+            else: pendentes.setdefault(chave, []).append(indice)
+        if em_cache: avisar('caption', f"Gemini: {len(itens) - sum(map(len, pendentes.values()))} de {len(itens)} itens reaproveitados do cache.")
+        unicos = [indices[0] for indices in pendentes.values()]
+        lotes = [[unicos[i] for i in lote] for lote in dividir_em_lotes(instrucoes, [itens[i] for i in unicos], self.tokens_por_lote, self.itens_por_lote)]
+        if not lotes: return resultados
+
+        def enviar(indices):
+            return self._enviar(montar_prompt(instrucoes, [itens[i] for i in indices]), len(indices))
+
+        cancelados = 0
+        with ThreadPoolExecutor(max_workers=min(self.concorrencia, len(lotes))) as executor:
+            futuros = [(indices, executor.submit(enviar, indices)) for indices in lotes]
+            for numero, (indices, futuro) in enumerate(futuros, 1):
+                try:
+                    respostas = futuro.result()
+                except CancelledError:
+                    cancelados += 1
+                except Exception as e:
+                    avisar('warning', f"Lote {numero} de {len(lotes)} (itens {indices[0] + 1} a {indices[-1] + 1}) falhou: {e}")
+                    if not isinstance(e, (ErroTemporario, RespostaInvalida)):
+                        for _, pendente in futuros[numero:]: pendente.cancel()
+                else:
+                    novos = {chaves[i]: resposta for i, resposta in zip(indices, respostas)}
+                    for i, resposta in zip(indices, respostas):
+                        for repetido in pendentes[chaves[i]]: resultados[repetido] = resposta
+                    self._gravar_cache(novos)
+        if cancelados: avisar('warning', f"{cancelados} lote(s) não foram enviados por causa do erro acima.")
+        return resultados
+
+
+def chamar_em_lote(prompt, api_key, modelo=MODELO_PADRAO, usar_cache=USAR_CACHE):
+    """
+    Envia um prompt já montado e devolve a lista de resultados da resposta em
+    JSON, repetindo as falhas temporárias. Os demais erros da API ou uma
+    resposta que não é uma lista JSON são propagados.
+    """
+    return ClienteLote(transporte_padrao(api_key, modelo), usar_cache=usar_cache).chamar(prompt)
+
+def processar_em_lote(instrucoes, itens, api_key, modelo=MODELO_PADRAO, avisar=_sem_aviso, transporte=None, **opcoes):
+    """Atalho para ClienteLote(...).processar: um resultado (ou None) por item, na ordem original."""
+    cliente = ClienteLote(transporte or transporte_padrao(api_key, modelo), **opcoes)
+    return cliente.processar(instrucoes, itens, avisar=avisar)
@@ -0,0 +1,164 @@
+# ==============================================================================
+# MEDIÇÃO DE TEMPO E MEMÓRIA POR ETAPA
+# ==============================================================================
+# Cada execução das páginas (e do processar_empresa) registra, por etapa, o
+# tempo decorrido, o pico de memória do processo e contagens (linhas,
+# documentos). O resultado vira uma tabela para o painel da página e um JSON
+# para anexar aos chamados de suporte.
+#
+# A memória é a residente (RSS) do processo, amostrada por uma thread a cada
+# 50 ms enquanto a etapa roda: custa quase nada, mas não enxerga os processos
+# do pool de extração dos TAs e pode perder picos muito curtos. Onde não há
+# como ler a RSS (nem /proc nem Windows), só o tempo é registrado.
+# ==============================================================================
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+INTERVALO_AMOSTRAGEM = 0.05
+MB = 1024 * 1024
+
+
+def _memoria_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class ContadoresMemoria(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (nome, ctypes.c_size_t) for nome in ('PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                                                 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+    contadores = ContadoresMemoria()
+    contadores.cb = ctypes.sizeof(contadores)
+    kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(ContadoresMemoria), wintypes.DWORD]
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(contadores), contadores.cb): return None
+    return contadores.WorkingSetSize
+
+def memoria_atual():
+    """Memória residente do processo em bytes, ou None se não for possível medir."""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if sys.platform == 'win32':
+        try: return _memoria_windows()
+        except (OSError, AttributeError): return None
+    return None
+
+def ambiente():
+    """Versões do Python, do sistema e das bibliotecas usadas, para os relatórios de medição."""
+    from importlib.metadata import PackageNotFoundError, version
+    bibliotecas = {}
+    for nome in ('pandas', 'numpy', 'openpyxl', 'python-docx', 'lxml', 'pyarrow', 'thefuzz', 'streamlit'):
+        try: bibliotecas[nome] = version(nome)
+        except PackageNotFoundError: bibliotecas[nome] = None
+    return {'python': platform.python_version(), 'plataforma': platform.platform(), 'cpus': os.cpu_count(), 'bibliotecas': bibliotecas}
+
+
+class _Amostrador(threading.Thread):
+    """Guarda a maior memória vista entre `start()` e `parar()`."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.inicial = self.pico = memoria_atual()
+        self._parar = threading.Event()
+
+    def _amostrar(self):
+        atual = memoria_atual()
+        if atual is not None and (self.pico is None or atual > self.pico): self.pico = atual
+        return atual
+
+    def run(self):
+        while not self._parar.wait(INTERVALO_AMOSTRAGEM):
+            self._amostrar()
+
+    def parar(self):
+        """Encerra a amostragem e devolve a memória final."""
+        self._parar.set()
+        self.join()
+        return self._amostrar()
+
+
+class Instrumentacao:
+    """
+    Medições de uma execução de `ferramenta` ('Extrator', 'Preenchimento',
+    'Formatador'...).
+
+        instrumentacao = Instrumentacao('Extrator')
+        with instrumentacao.etapa('carga_valoracao') as medida:
+            valoracao = carregar_valoracao(conteudo)
+            medida['linhas'] = len(valoracao['timesheet'])
+
+    Cada etapa guarda 'segundos', 'pico_mb' (maior RSS do processo durante a
+    etapa), 'variacao_mb' (RSS no fim menos no início) e o que for colocado
+    em `medida`. Etapas podem ser aninhadas. Tempos medidos em outro lugar
+    (p.ex. de cada TA, nos processos do pool) entram com `registrar_documento`.
+    """
+
+    def __init__(self, ferramenta):
+        self.ferramenta = ferramenta
+        self.data = datetime.now().isoformat(timespec='seconds')
+        self.inicio = time.perf_counter()
+        self.etapas = []
+        self.documentos = []
+
+    @contextmanager
+    def etapa(self, nome, **contagens):
+        medida = {'etapa': nome, 'inicio_s': round(time.perf_counter() - self.inicio, 3), **contagens}
+        amostrador = _Amostrador()
+        amostrador.start()
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        except BaseException as e:
+            medida['erro'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            medida['segundos'] = round(time.perf_counter() - inicio, 3)
+            final = amostrador.parar()
+            if amostrador.pico is not None: medida['pico_mb'] = round(amostrador.pico / MB, 1)
+            if final is not None and amostrador.inicial is not None: medida['variacao_mb'] = round((final - amostrador.inicial) / MB, 1)
+            self.etapas.append(medida)
+
+    def registrar_documento(self, documento, segundos, **extras):
+        """Tempo de um documento (TA) processado dentro de uma etapa."""
+        self.documentos.append({'documento': documento, 'segundos': None if segundos is None else round(segundos, 3), **extras})
+
+    @property
+    def total_segundos(self):
+        return round(time.perf_counter() - self.inicio, 3)
+
+    def tabela(self):
+        """DataFrame das etapas na ordem em que começaram."""
+        import pandas as pd
+        colunas = ['etapa', 'segundos', 'pico_mb', 'variacao_mb']
+        tabela = pd.DataFrame(sorted(self.etapas, key=lambda m: m['inicio_s']))
+        if tabela.empty: return pd.DataFrame(columns=colunas)
+        extras = [c for c in tabela.columns if c not in colunas + ['inicio_s']]
+        return tabela.reindex(columns=colunas + extras)
+
+    def tabela_documentos(self):
+        """DataFrame dos documentos, do mais lento para o mais rápido."""
+        import pandas as pd
+        tabela = pd.DataFrame(self.documentos)
+        if tabela.empty: return tabela
+        return tabela.sort_values('segundos', ascending=False, na_position='last', ignore_index=True)
+
+    def como_dict(self):
+        return {'ferramenta': self.ferramenta, 'data': self.data, 'total_segundos': self.total_segundos, 'ambiente': ambiente(),
+                'etapas': sorted(self.etapas, key=lambda m: m['inicio_s']), 'documentos': self.documentos}
+
+    def json_bytes(self):
+        return json.dumps(self.como_dict(), ensure_ascii=False, indent=2, default=str).encode('utf-8')
+
+    def nome_arquivo(self):
+        return f"medicoes_{self.ferramenta.lower()}_{self.data.replace(':', '').replace('-', '')}.json"
@@ -0,0 +1,40 @@
+# ==============================================================================
+# UTILITÁRIOS DE .XLSX SEM CARREGAR O OPENPYXL
+# ==============================================================================
+# O openpyxl leva cerca de 0,3 s só para ser importado. Os módulos que montam
+# o XML das planilhas diretamente (escrita do NewPiit e do relatório) só
+# precisam de algumas constantes e conversões dele, reproduzidas aqui; o
+# openpyxl em si só é importado quando uma data precisa ser convertida.
+# ==============================================================================
+
+import re
+from functools import lru_cache
+
+# Os mesmos de openpyxl.cell.cell
+CARACTERES_ILEGAIS = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+CODIGOS_ERRO = ("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A")
+
+
+@lru_cache(maxsize=None)
+def letra_coluna(indice):
+    """1 -> 'A', 27 -> 'AA' (como openpyxl.utils.get_column_letter)."""
+    if not 1 <= indice <= 18278: raise ValueError(f"Coluna fora do limite do Excel: {indice}")
+    letras = ""
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+@lru_cache(maxsize=None)
+def indice_coluna(letras):
+    """'A' -> 1, 'AA' -> 27 (como openpyxl.utils.column_index_from_string)."""
+    indice = 0
+    for letra in letras.upper():
+        if not "A" <= letra <= "Z": raise ValueError(f"Coluna inválida: {letras}")
+        indice = indice * 26 + ord(letra) - 64
+    return indice
+
+def data_excel(valor):
+    """Número de série do Excel de uma data, hora ou duração."""
+    from openpyxl.utils.datetime import to_excel
+    return to_excel(valor)
@@ -0,0 +1,121 @@
+# ==============================================================================
+# PREENCHIMENTO DO NEWPIIT (SEM INTERFACE)
+# ==============================================================================
+# O fluxo completo de uma empresa: TAs -> linhas do GERAL, Valoração ->
+# linhas de DISPÊNDIOS ST e RH por Linha de Pesquisa, validação dos totais
+# contra a aba Resumo e escrita do NewPiit. É usado pela página
+# Preenchimento_NewPiit e pelo preencher_lote.py (várias empresas pela linha
+# de comando), por isso não depende do Streamlit: as mensagens de andamento
+# saem pelo callback `avisar(nivel, texto)` (nivel: 'info', 'caption',
+# 'warning' ou 'error', como as funções do st).
+# ==============================================================================
+
+import os
+import re
+import pandas as pd
+from nucleo.agregacao import agregar_rh, agregar_st, ler_ajustes_titulacao, tabela_escolaridade
+from nucleo.escrita_newpiit import preencher_newpiit
+from nucleo.extracao_ta import extrair_lote, linha_geral, resumo_cache_extracao
+from nucleo.instrumentacao import Instrumentacao
+from nucleo.validacao import validar_totais
+
+COLUNA_PROJETO_GERAL = 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)'
+# Cabeçalhos da aba GERAL que diferem dos nomes usados na extração
+MAPA_GERAL = {COLUNA_PROJETO_GERAL: 'Nome da atividade de PD&I: \xa0'}
+
+
+def nome_sem_copia(nome_arquivo):
+    """Nome do arquivo sem extensão e sem o sufixo de cópia " (1)"."""
+    return re.sub(r'\s*\(\d+\)$', '', os.path.splitext(nome_arquivo)[0]).strip()
+
+def nome_arquivo_saida(nome_empresa, nome_base):
+    """Nome do NewPiit preenchido: EMPRESA_NOMEDOMODELO.xlsx."""
+    return f"{nome_empresa.replace(' ', '_')}_{nome_sem_copia(nome_base)}.xlsx"
+
+def _sem_aviso(nivel, texto):
+    pass
+
+def montar_linhas(tas, extracoes, linhas_st_por_lp, linhas_rh_por_lp, avisar=_sem_aviso):
+    """
+    Linhas do GERAL, DISPÊNDIOS ST e RH a partir dos TAs extraídos
+    (`extracoes`, na ordem de `tas`) e das linhas agregadas por Linha de
+    Pesquisa. Devolve (linhas_geral, linhas_st, linhas_rh, tas_validacao),
+    este último com os pares (Linha de Pesquisa, projeto) de `validar_totais`.
+    """
+    novas_linhas_geral, novas_linhas_disp_st, novas_linhas_rh, tas_validacao = [], [], [], []
+    id_disp, id_rh = 1, 1
+    for idx, ((nome_arquivo, _), (dados_ta, erro_ta)) in enumerate(zip(tas, extracoes)):
+        nome_busca_projeto = nome_sem_copia(nome_arquivo)
+        avisar('info', f"Processando Linha de Pesquisa: '{nome_busca_projeto}'")
+        if erro_ta: avisar('error', f"Erro ao extrair dados do Word '{nome_arquivo}': {erro_ta}")
+        geral_data_extraida = linha_geral(dados_ta) if dados_ta else {}
+        nome_final_projeto = nome_busca_projeto
+        if geral_data_extraida:
+            nome_final_projeto = geral_data_extraida.get(COLUNA_PROJETO_GERAL, nome_busca_projeto)
+            geral_data_extraida['#'] = idx + 1
+            geral_data_extraida[COLUNA_PROJETO_GERAL] = nome_final_projeto
+            novas_linhas_geral.append(geral_data_extraida)
+
+            # Processamento ST e RH (linhas já agregadas por Linha de Pesquisa)
+            for linha in linhas_st_por_lp.get(nome_busca_projeto, []):
+                novas_linhas_disp_st.append({'#': id_disp, COLUNA_PROJETO_GERAL: nome_final_projeto, **linha}); id_disp += 1
+            for linha in linhas_rh_por_lp.get(nome_busca_projeto, []):
+                novas_linhas_rh.append({'#': id_rh, COLUNA_PROJETO_GERAL: nome_final_projeto, **linha}); id_rh += 1
+        tas_validacao.append((nome_busca_projeto, nome_final_projeto))
+    return novas_linhas_geral, novas_linhas_disp_st, novas_linhas_rh, tas_validacao
+
+def processar_empresa(conteudo_base, valoracao, tas, conteudo_titulacoes=None, processos=None, ao_concluir=None, avisar=None, instrumentacao=None):
+    """
+    Preenche o NewPiit de uma empresa.
+
+    `conteudo_base`: bytes do NewPiit modelo; `valoracao`: resultado de
+    `carregar_valoracao`; `tas`: [(nome do arquivo, bytes do .docx)], cada
+    um com o nome da sua Linha de Pesquisa; `conteudo_titulacoes`: bytes do
+    CSV de ajustes de titulação (opcional). `processos` e `ao_concluir` vão
+    para `extrair_lote`. O tempo e a memória de cada etapa ficam em
+    `instrumentacao` (ver nucleo.instrumentacao), se informada.
+
+    Devolve {'newpiit': bytes do .xlsx, 'validacao_lp', 'validacao_projetos'
+    (ver `validar_totais`), 'tabela_titulacoes' (ou None)}.
+    """
+    avisar = avisar or _sem_aviso
+    instrumentacao = instrumentacao or Instrumentacao('Preenchimento')
+    for aba in ('st', 'timesheet'):
+        if aba in valoracao['erros']: avisar('error', valoracao['erros'][aba])
+    if valoracao['snapshot']: avisar('caption', "Valoração lida do snapshot salvo (planilha já processada antes).")
+    df_disp = valoracao['st'].assign(**{'LINHA DE PESQUISA': lambda df: df['LINHA DE PESQUISA'].astype(str).str.strip()})
+    df_rh = valoracao['timesheet'].assign(**{'LINHA DE PESQUISA': lambda df: df['LINHA DE PESQUISA'].astype(str).str.strip()})
+
+    df_resumo = pd.DataFrame()
+    if 'resumo' in valoracao['erros']: avisar('warning', f"Não foi possível ler totais da aba Resumo. Erro: {valoracao['erros']['resumo']}")
+    else: df_resumo = valoracao['resumo']
+
+    ajustes_titulacao = {}
+    if conteudo_titulacoes:
+        try: ajustes_titulacao = ler_ajustes_titulacao(conteudo_titulacoes)
+        except ValueError as e: avisar('warning', f"Ajustes de titulação ignorados: {e}")
+    if 'ESCOLARIDADE' not in df_rh.columns:
+        avisar('warning', "Coluna 'ESCOLARIDADE' não encontrada no Timesheet da Valoração: a titulação do RH ficará em branco.")
+    with instrumentacao.etapa('agregacao', linhas_timesheet=len(df_rh), linhas_st=len(df_disp)) as medida:
+        tabela_titulacoes = tabela_escolaridade(df_rh['ESCOLARIDADE'], ajustes_titulacao) if 'ESCOLARIDADE' in df_rh.columns else None
+        linhas_st_por_lp, linhas_rh_por_lp = agregar_st(df_disp), agregar_rh(df_rh, tabela_titulacoes)
+        medida['linhas_geradas'] = sum(map(len, linhas_st_por_lp.values())) + sum(map(len, linhas_rh_por_lp.values()))
+
+    with instrumentacao.etapa('extracao_ta', documentos=len(tas)):
+        extracoes = extrair_lote([conteudo for _, conteudo in tas], processos=processos, ao_concluir=ao_concluir, instrumentacao=instrumentacao, nomes=[nome for nome, _ in tas])
+    resumo_cache = resumo_cache_extracao()
+    if resumo_cache: avisar('caption', resumo_cache)
+
+    with instrumentacao.etapa('montagem_linhas') as medida:
+        novas_linhas_geral, novas_linhas_disp_st, novas_linhas_rh, tas_validacao = montar_linhas(tas, extracoes, linhas_st_por_lp, linhas_rh_por_lp, avisar)
+        medida.update(linhas_geral=len(novas_linhas_geral), linhas_st=len(novas_linhas_disp_st), linhas_rh=len(novas_linhas_rh))
+
+    avisar('info', "Validando totais calculados...")
+    with instrumentacao.etapa('validacao', documentos=len(tas_validacao)):
+        validacao_lp, validacao_projetos = validar_totais(tas_validacao, df_rh, df_disp, df_resumo, novas_linhas_disp_st, novas_linhas_rh)
+
+    with instrumentacao.etapa('escrita_newpiit', linhas=len(novas_linhas_geral) + len(novas_linhas_disp_st) + len(novas_linhas_rh)) as medida:
+        df_geral_final = pd.DataFrame(novas_linhas_geral).rename(columns=MAPA_GERAL)
+        conteudo_newpiit = preencher_newpiit(conteudo_base, {'GERAL': df_geral_final.to_dict('records'), 'DISPÊNDIOS ST': novas_linhas_disp_st, 'RH': novas_linhas_rh})
+        medida['bytes'] = len(conteudo_newpiit)
+    return {'newpiit': conteudo_newpiit, 'validacao_lp': validacao_lp, 'validacao_projetos': validacao_projetos, 'tabela_titulacoes': tabela_titulacoes}
@@ -0,0 +1,114 @@
+# ==============================================================================
+# VALIDAÇÃO DOS TOTAIS DE RH E ST CONTRA A ABA RESUMO (PREENCHIMENTO NEWPIIT)
+# ==============================================================================
+# Para cada TA processado compara o total calculado (linhas geradas para o
+# DISPÊNDIOS ST e o RH) com o esperado (soma, na aba Resumo da Valoração, dos
+# projetos ligados à Linha de Pesquisa no timesheet). Tudo é feito com groupby
+# e merge, então o custo cresce linearmente com o número de LPs e linhas.
+#
+# Além do quadro por LP há um detalhamento por projeto, que mostra em qual
+# projeto de uma LP com alerta está a diferença.
+# ==============================================================================
+
+import numpy as np
+import pandas as pd
+from nucleo.agregacao import COLUNA_LP, filtrar_rh, filtrar_st
+
+COLUNA_PROJETO_GERAL = 'Nome da atividade de PD&I (Nome do projeto igual no GERAL)'
+TOLERANCIA_RELATIVA = 0.01
+OK, ALERTA, SEM_PROJETOS = "✅", "⚠️ ALERTA", "AVISO - Relação entre Linha de Pesquisa e Projetos não encontrada"
+COLUNAS_TOTAIS = ['ST Calculado', 'ST Esperado', 'RH Calculado', 'RH Esperado']
+
+
+def _float(valor):
+    try: return float(valor)
+    except (TypeError, ValueError): return None
+
+def _somar(df, chaves, colunas):
+    """Soma por grupo em que um valor vazio (NaN) torna o total do grupo vazio."""
+    agrupado = df.groupby(chaves, sort=False)[colunas]
+    somas = agrupado.sum()
+    return somas.mask(df[colunas].isna().groupby([df[c] for c in chaves], sort=False).any())
+
+def _confere(calculado, esperado):
+    # Mesmo critério de math.isclose(calculado, esperado, rel_tol=0.01)
+    return (calculado == esperado) | ((calculado - esperado).abs() <= TOLERANCIA_RELATIVA * np.maximum(calculado.abs(), esperado.abs()))
+
+def totais_resumo(df_resumo):
+    """
+    Totais esperados por projeto na aba Resumo (colunas C, E e F), somando
+    projetos repetidos. Linhas sem projeto, de título/total ou com valor não
+    numérico são ignoradas.
+    """
+    if df_resumo.empty or df_resumo.shape[1] < 6: return pd.DataFrame(columns=['PROJETO', 'RH', 'ST'])
+    rh, st = [_float(v) for v in df_resumo.iloc[:, 4]], [_float(v) for v in df_resumo.iloc[:, 5]]
+    resumo = pd.DataFrame({'PROJETO': [str(v).strip() for v in df_resumo.iloc[:, 2]], 'RH': rh, 'ST': st}).astype({'RH': float, 'ST': float})
+    numericos = np.array([a is not None and b is not None for a, b in zip(rh, st)], dtype=bool)
+    validos = numericos & (resumo['PROJETO'] != '') & ~resumo['PROJETO'].str.lower().isin(['total', 'projeto'])
+    resumo = resumo[validos]
+    return _somar(resumo, ['PROJETO'], ['RH', 'ST']).reset_index()
+
+def projetos_por_lp(df_rh):
+    """Pares (LINHA DE PESQUISA, PROJETO) distintos do timesheet, na ordem em que aparecem."""
+    if df_rh.empty or COLUNA_LP not in df_rh.columns or 'PROJETO' not in df_rh.columns:
+        return pd.DataFrame(columns=[COLUNA_LP, 'PROJETO'])
+    pares = df_rh.dropna(subset=[COLUNA_LP, 'PROJETO'])[[COLUNA_LP, 'PROJETO']]
+    pares = pd.DataFrame({COLUNA_LP: pares[COLUNA_LP].astype(str).str.strip(), 'PROJETO': pares['PROJETO'].astype(str).str.strip()})
+    return pares.drop_duplicates(ignore_index=True)
+
+def _calculado_por_projeto(df_rh, df_disp):
+    """Totais de RH e ST por (LP, projeto) com os mesmos filtros das linhas do NewPiit."""
+    partes = []
+    if not df_disp.empty and 'PROJETO' in df_disp.columns:
+        validas = filtrar_st(df_disp)
+        partes.append(pd.DataFrame({COLUNA_LP: validas[COLUNA_LP].astype(str).str.strip(), 'PROJETO': validas['PROJETO'].astype(str).str.strip(), 'ST Calculado': pd.to_numeric(validas['R$ FINAL'], errors='coerce'), 'RH Calculado': 0.0}))
+    filtrado, lei_do_bem_col = filtrar_rh(df_rh)
+    if lei_do_bem_col and 'PROJETO' in filtrado.columns:
+        partes.append(pd.DataFrame({COLUNA_LP: filtrado[COLUNA_LP].astype(str).str.strip(), 'PROJETO': filtrado['PROJETO'].astype(str).str.strip(), 'ST Calculado': 0.0, 'RH Calculado': filtrado[lei_do_bem_col]}))
+    if not partes: return pd.DataFrame(columns=[COLUNA_LP, 'PROJETO', 'ST Calculado', 'RH Calculado'])
+    return pd.concat(partes, ignore_index=True).groupby([COLUNA_LP, 'PROJETO'], sort=False)[['ST Calculado', 'RH Calculado']].sum().reset_index()
+
+def validar_totais(tas, df_rh, df_disp, df_resumo, linhas_st, linhas_rh):
+    """
+    `tas`: [(Linha de Pesquisa, nome do projeto no GERAL)] na ordem dos
+    arquivos. `linhas_st` / `linhas_rh`: linhas geradas para o NewPiit.
+
+    Devolve (por_lp, por_projeto):
+      * por_lp: uma linha por TA com totais calculados e esperados de ST e RH,
+        o status de cada um e a 'Situação' (OK, ALERTA ou o aviso de LP sem
+        projetos no timesheet);
+      * por_projeto: os mesmos totais para cada projeto das LPs, com o
+        esperado vindo da aba Resumo.
+    """
+    tas = pd.DataFrame(tas, columns=['Linha de Pesquisa', 'Projeto (GERAL)'])
+    pares = projetos_por_lp(df_rh).rename(columns={COLUNA_LP: 'Linha de Pesquisa'})
+
+    # Esperado: cada projeto da LP com o total do Resumo (0 se não estiver lá)
+    esperado = pares.merge(totais_resumo(df_resumo).rename(columns={'RH': 'RH Esperado', 'ST': 'ST Esperado'}), on='PROJETO', how='left', indicator=True)
+    ausentes = esperado.pop('_merge') == 'left_only'
+    esperado.loc[ausentes, ['RH Esperado', 'ST Esperado']] = 0.0
+    esperado_lp = _somar(esperado, ['Linha de Pesquisa'], ['ST Esperado', 'RH Esperado'])
+
+    # Calculado: todas as linhas geradas com o mesmo nome de projeto do TA
+    calculado = []
+    for linhas, coluna_valor, nome in ((linhas_st, 'Valor Total', 'ST Calculado'), (linhas_rh, 'Valor (R$)', 'RH Calculado')):
+        df = pd.DataFrame(linhas, columns=[COLUNA_PROJETO_GERAL, coluna_valor])
+        calculado.append(df.groupby(COLUNA_PROJETO_GERAL)[coluna_valor].sum().rename(nome))
+    calculado = pd.concat(calculado, axis=1)
+
+    por_lp = tas.join(calculado, on='Projeto (GERAL)').join(esperado_lp, on='Linha de Pesquisa')
+    por_lp[['ST Calculado', 'RH Calculado']] = por_lp[['ST Calculado', 'RH Calculado']].fillna(0.0)
+    com_projetos = tas['Linha de Pesquisa'].isin(set(pares['Linha de Pesquisa']))
+    for tipo in ('ST', 'RH'):
+        por_lp[tipo] = np.where(_confere(por_lp[f'{tipo} Calculado'], por_lp[f'{tipo} Esperado']), OK, ALERTA)
+    por_lp['Situação'] = np.where(~com_projetos, SEM_PROJETOS, np.where((por_lp['ST'] == OK) & (por_lp['RH'] == OK), 'OK', 'ALERTA'))
+    por_lp.loc[~com_projetos, COLUNAS_TOTAIS + ['ST', 'RH']] = np.nan
+    por_lp = por_lp[['Linha de Pesquisa', 'Projeto (GERAL)', 'Situação', 'ST', 'ST Calculado', 'ST Esperado', 'RH', 'RH Calculado', 'RH Esperado']]
+
+    por_projeto = esperado[esperado['Linha de Pesquisa'].isin(set(tas['Linha de Pesquisa']))]
+    por_projeto = por_projeto.merge(_calculado_por_projeto(df_rh, df_disp).rename(columns={COLUNA_LP: 'Linha de Pesquisa'}), on=['Linha de Pesquisa', 'PROJETO'], how='left')
+    por_projeto[['ST Calculado', 'RH Calculado']] = por_projeto[['ST Calculado', 'RH Calculado']].fillna(0.0)
+    for tipo in ('ST', 'RH'):
+        por_projeto[tipo] = np.where(_confere(por_projeto[f'{tipo} Calculado'], por_projeto[f'{tipo} Esperado']), OK, ALERTA)
+    por_projeto = por_projeto.rename(columns={'PROJETO': 'Projeto'})[['Linha de Pesquisa', 'Projeto', 'ST', 'ST Calculado', 'ST Esperado', 'RH', 'RH Calculado', 'RH Esperado']]
+    return por_lp, por_projeto.reset_index(drop=True)
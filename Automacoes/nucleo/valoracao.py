@@ -0,0 +1,312 @@
+# ==============================================================================
+# LEITURA DA PLANILHA DE VALORAÇÃO
+# ==============================================================================
+# A pasta de trabalho é aberta uma única vez (openpyxl em modo somente
+# leitura). Em cada aba o cabeçalho é procurado nas primeiras 20 linhas, na
+# mesma passada que lê os dados, e só as colunas usadas pelas ferramentas são
+# guardadas.
+#
+# Depois da primeira leitura, cada aba vira um arquivo Arrow IPC (snapshot) em
+# <PIERA_CACHE_DIR>/valoracao, identificado pelo SHA-256 da planilha. As duas
+# páginas, inclusive após reiniciar o servidor, mapeiam esse arquivo em memória
+# em vez de abrir o xlsx de novo. PIERA_SNAPSHOTS_VALORACAO_MB limita o espaço
+# (padrão 512 MB; os snapshots usados há mais tempo saem primeiro).
+# ==============================================================================
+
+import io
+import json
+import os
+import re
+import uuid
+from datetime import date, datetime, time
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+from nucleo.cache_disco import PASTA_PADRAO, hash_conteudo
+from nucleo.planilha import CODIGOS_ERRO
+
+ABA_ST = 'Serviços de Terceiros e Viagens'
+PREFIXO_TIMESHEET = 'Timesheet_'
+PREFIXO_RESUMO = 'Resumo'
+PALAVRA_CABECALHO = 'LINHA DE PESQUISA'
+LINHAS_BUSCA_CABECALHO = 20
+
+COLUNAS_TIMESHEET = ['LINHA DE PESQUISA', 'PROJETO', 'NOME DO COLABORADOR', 'C.P.F.', 'CARGO', 'ESCOLARIDADE', 'HORAS APROPRIADAS A HORAS ÚTEIS']
+# Além destas, todas as colunas cujo nome contém "LEI DO BEM" são mantidas.
+PARTE_COLUNA_LEI_DO_BEM = 'LEI DO BEM'
+COLUNAS_ST = ['LINHA DE PESQUISA', 'PROJETO', 'RAZÃO SOCIAL PRESTADOR', 'CNPJ PRESTADOR', 'PORTE DA EMPRESA', 'R$ FINAL', 'DESPESA VÁLIDA PARA O PIT?']
+# Na aba Resumo só as colunas C (projeto), E (total RH) e F (total ST) são usadas.
+COLUNAS_RESUMO = 6
+
+PASTA_SNAPSHOTS = os.path.join(PASTA_PADRAO, "valoracao")
+LIMITE_SNAPSHOTS_BYTES = int(os.environ.get("PIERA_SNAPSHOTS_VALORACAO_MB") or 512) * 1024 * 1024
+# O hash deste arquivo entra no nome dos snapshots: mudar a leitura invalida os antigos.
+with open(__file__, "rb") as _fonte:
+    VERSAO_LEITOR = hash_conteudo(_fonte.read())[:12]
+# Metadado (no esquema Arrow) com os nomes originais das colunas (o Arrow só
+# aceita texto; o Resumo usa números), as colunas object só de texto e as de
+# tipos misturados
+METADADO_SNAPSHOT = b"piera_valoracao"
+
+# Colunas de tipos misturados (CPF ora número ora texto, datas no meio de
+# textos) vão para o snapshot como texto com o tipo na frente ("i:123",
+# "s:123"), para voltar exatamente iguais. Ordem importa: bool antes de int.
+_CODIFICADORES = [
+    (bool, 'b', lambda v: '1' if v else '0'),
+    (int, 'i', str),
+    (float, 'f', repr),
+    (str, 's', lambda v: v),
+    (pd.Timestamp, 'T', lambda v: v.isoformat()),
+    (type(pd.NaT), 'T', str),
+    (datetime, 'd', lambda v: v.isoformat()),
+    (date, 'D', lambda v: v.isoformat()),
+    (time, 't', lambda v: v.isoformat()),
+]
+# Cada um recebe os textos (sem a marca) de um mesmo tipo, num array numpy, e devolve a lista de valores
+_DECODIFICADORES = {
+    'b': lambda textos: (textos == '1').tolist(),
+    'i': lambda textos: list(map(int, textos)),
+    'f': lambda textos: textos.astype(float).tolist(),
+    's': lambda textos: textos.tolist(),
+    'T': lambda textos: list(map(pd.Timestamp, textos)),
+    'd': lambda textos: list(pd.to_datetime(textos, format='ISO8601').to_pydatetime()),
+    'D': lambda textos: list(map(date.fromisoformat, textos)),
+    't': lambda textos: list(map(time.fromisoformat, textos)),
+}
+
+
+def normalizar_coluna(nome):
+    return re.sub(r'\s+', ' ', str(nome)).strip()
+
+def _valor(celula):
+    """Mesma conversão de célula do pandas.read_excel (openpyxl)."""
+    if celula is None: return ""
+    if isinstance(celula, str) and celula in CODIGOS_ERRO: return np.nan
+    if isinstance(celula, float) and celula.is_integer(): return int(celula)
+    return celula
+
+def _dataframe(nomes, dados):
+    # Mesma inferência de tipos (vazios, números em texto, etc.) do pandas.read_excel
+    while dados and all(v == "" for v in dados[-1]):
+        dados.pop()
+    if not dados:
+        return pd.DataFrame(columns=nomes)
+    return TextParser([list(nomes)] + dados, header=0).read()
+
+def ler_aba_com_cabecalho(ws, colunas, manter=lambda nome: False, keyword=PALAVRA_CABECALHO):
+    """
+    Lê uma aba cujo cabeçalho (a linha que contém `keyword`) está em algum
+    lugar das primeiras 20 linhas. Devolve um DataFrame só com as colunas
+    listadas em `colunas` ou aceitas por `manter(nome)`, na ordem da planilha.
+    """
+    ws.reset_dimensions()
+    linhas = ws.iter_rows(values_only=True)
+    cabecalho = None
+    for _, linha in zip(range(LINHAS_BUSCA_CABECALHO), linhas):
+        if any(str(c).strip().upper() == keyword.upper() for c in linha if c is not None):
+            cabecalho = [normalizar_coluna(c) if c is not None else None for c in linha]
+            break
+    if cabecalho is None:
+        raise ValueError(f"Cabeçalho com '{keyword}' não encontrado na aba '{ws.title}'.")
+
+    indices, nomes = [], []
+    for indice, nome in enumerate(cabecalho):
+        if nome is not None and nome not in nomes and (nome in colunas or manter(nome)):
+            indices.append(indice)
+            nomes.append(nome)
+    dados = [[_valor(linha[i]) if i < len(linha) else "" for i in indices] for linha in linhas]
+    return _dataframe(nomes, dados)
+
+def ler_aba_sem_cabecalho(ws, total_colunas):
+    ws.reset_dimensions()
+    dados = [[_valor(v) for v in linha] + [""] * (total_colunas - len(linha))
+             for linha in ws.iter_rows(max_col=total_colunas, values_only=True)]
+    return _dataframe(range(total_colunas), dados)
+
+def _ler_planilha(conteudo, abas_desejadas):
+    import openpyxl
+    wb = openpyxl.load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        abas = wb.sheetnames
+        aba_timesheet = next((s for s in abas if s.startswith(PREFIXO_TIMESHEET)), None)
+        aba_resumo = next((s for s in abas if s.startswith(PREFIXO_RESUMO)), None)
+        resultado = {'timesheet': pd.DataFrame(), 'st': pd.DataFrame(), 'resumo': pd.DataFrame(), 'aba_timesheet': aba_timesheet, 'erros': {}}
+        leituras = [
+            ('timesheet', aba_timesheet, lambda ws: ler_aba_com_cabecalho(ws, COLUNAS_TIMESHEET, lambda nome: PARTE_COLUNA_LEI_DO_BEM in nome.upper())),
+            ('st', ABA_ST if ABA_ST in abas else None, lambda ws: ler_aba_com_cabecalho(ws, COLUNAS_ST)),
+            ('resumo', aba_resumo, lambda ws: ler_aba_sem_cabecalho(ws, COLUNAS_RESUMO)),
+        ]
+        nomes_esperados = {'timesheet': f"{PREFIXO_TIMESHEET}*", 'st': ABA_ST, 'resumo': f"{PREFIXO_RESUMO}*"}
+        for chave, aba, ler in leituras:
+            if chave not in abas_desejadas: continue
+            if aba is None:
+                resultado['erros'][chave] = f"Aba '{nomes_esperados[chave]}' não encontrada na Valoração."
+                continue
+            try:
+                resultado[chave] = ler(wb[aba])
+            except Exception as e:
+                resultado['erros'][chave] = f"Erro ao carregar a aba '{aba}': {e}"
+        return resultado
+    finally:
+        wb.close()
+
+# ------------------------------------------------------------------------------
+# Snapshots Arrow
+# ------------------------------------------------------------------------------
+
+def _prefixo_snapshot(chave):
+    return os.path.join(PASTA_SNAPSHOTS, f"{chave}-{VERSAO_LEITOR}")
+
+def _gravar_atomico(caminho, escrever):
+    temporario = f"{caminho}.{uuid.uuid4().hex}.tmp"
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario): os.remove(temporario)
+
+def _codificar(valor):
+    if valor is None: return None
+    for tipo, marca, codificar in _CODIFICADORES:
+        if type(valor) is tipo: return f"{marca}:{codificar(valor)}"
+    raise TypeError(f"Tipo sem representação no snapshot: {type(valor).__name__}")
+
+def _decodificar(coluna):
+    """Desfaz _codificar numa coluna Arrow inteira, um tipo de cada vez."""
+    import pyarrow.compute as pc
+    marcas = pc.utf8_slice_codeunits(coluna, 0, 1).to_numpy(zero_copy_only=False)
+    textos = pc.utf8_slice_codeunits(coluna, 2, 2 ** 62)
+    saida = np.full(len(coluna), None, dtype=object)
+    for marca in set(marcas) - {None}:
+        posicoes = np.flatnonzero(marcas == marca)
+        saida[posicoes] = _DECODIFICADORES[marca](textos.take(posicoes).to_numpy(zero_copy_only=False))
+    return saida
+
+def _gravar_dataframe(caminho, df):
+    import pyarrow as pa
+    # Colunas object só de texto (todas, no pandas 2) vão como texto Arrow;
+    # as de tipos misturados, que não cabem num tipo Arrow, vão codificadas
+    # com o tipo de cada valor (_codificar).
+    df = df.copy()
+    objetos = [i for i, dtype in enumerate(df.dtypes) if dtype == object]
+    textos = [i for i in objetos if pd.api.types.infer_dtype(df.iloc[:, i], skipna=True) in ('string', 'empty')]
+    mistas = [i for i in objetos if i not in textos]
+    for i in textos:
+        df.isetitem(i, df.iloc[:, i].astype(pd.ArrowDtype(pa.large_string())))
+    for i in mistas:
+        df.isetitem(i, pd.Series([_codificar(v) for v in df.iloc[:, i]], index=df.index, dtype=pd.ArrowDtype(pa.large_string())))
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadado = {'colunas': list(df.columns), 'textos': textos, 'mistas': mistas}
+    tabela = tabela.replace_schema_metadata({**tabela.schema.metadata, METADADO_SNAPSHOT: json.dumps(metadado).encode()})
+    def escrever(destino):
+        with pa.OSFile(destino, "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    _gravar_atomico(caminho, escrever)
+
+def _ler_dataframe(caminho):
+    import pyarrow as pa
+    with pa.memory_map(caminho, "r") as origem:
+        tabela = pa.ipc.open_file(origem).read_all()
+        df = tabela.to_pandas()
+    metadado = json.loads(tabela.schema.metadata[METADADO_SNAPSHOT])
+    df.columns = pd.Index(metadado['colunas'])
+    for i in metadado['textos']:
+        coluna = df.iloc[:, i].astype(object)
+        df.isetitem(i, coluna.where(coluna.notna(), np.nan))
+    for i in metadado['mistas']:
+        df.isetitem(i, pd.Series(_decodificar(tabela.column(i)), index=df.index, dtype=object))
+    return df
+
+def _ler_snapshot(chave, abas_desejadas):
+    """Abas já guardadas para esta planilha: (resultado parcial, abas que faltam)."""
+    prefixo = _prefixo_snapshot(chave)
+    try:
+        with open(f"{prefixo}.json", encoding="utf-8") as f:
+            manifesto = json.load(f)
+        resultado = {'timesheet': pd.DataFrame(), 'st': pd.DataFrame(), 'resumo': pd.DataFrame(),
+                     'aba_timesheet': manifesto['aba_timesheet'], 'erros': {}}
+        faltando = []
+        for aba in abas_desejadas:
+            if aba in manifesto['erros']:
+                resultado['erros'][aba] = manifesto['erros'][aba]
+            elif aba in manifesto['abas']:
+                resultado[aba] = _ler_dataframe(f"{prefixo}-{aba}.arrow")
+            else:
+                faltando.append(aba)
+        os.utime(f"{prefixo}.json")
+        return resultado, faltando
+    except (OSError, ValueError, KeyError, ImportError):
+        return None, list(abas_desejadas)
+
+def _gravar_snapshot(chave, resultado, abas_lidas):
+    prefixo = _prefixo_snapshot(chave)
+    try:
+        import pyarrow  # noqa: F401  (sem pyarrow os snapshots ficam desligados)
+        os.makedirs(PASTA_SNAPSHOTS, exist_ok=True)
+        try:
+            with open(f"{prefixo}.json", encoding="utf-8") as f:
+                manifesto = json.load(f)
+        except (OSError, ValueError):
+            manifesto = {'aba_timesheet': resultado['aba_timesheet'], 'abas': [], 'erros': {}}
+        for aba in abas_lidas:
+            if aba in resultado['erros']:
+                manifesto['erros'][aba] = resultado['erros'][aba]
+            else:
+                _gravar_dataframe(f"{prefixo}-{aba}.arrow", resultado[aba])
+                if aba not in manifesto['abas']: manifesto['abas'].append(aba)
+        def escrever(destino):
+            with open(destino, "w", encoding="utf-8") as f: json.dump(manifesto, f, ensure_ascii=False)
+        _gravar_atomico(f"{prefixo}.json", escrever)
+        _aplicar_limite_snapshots(os.path.basename(prefixo))
+    except (OSError, ImportError, ValueError, TypeError):
+        pass  # sem snapshot a próxima carga só volta a ler o xlsx
+
+def _aplicar_limite_snapshots(prefixo_atual):
+    """Apaga os snapshots usados há mais tempo (data do manifesto) até caber no limite."""
+    grupos = {}
+    for nome in os.listdir(PASTA_SNAPSHOTS):
+        if nome.endswith(".tmp"): continue  # gravação em andamento
+        caminho = os.path.join(PASTA_SNAPSHOTS, nome)
+        prefixo = nome.split(".")[0].rsplit("-", 1)[0] if nome.endswith(".arrow") else nome.split(".")[0]
+        try:
+            grupo = grupos.setdefault(prefixo, {'arquivos': [], 'tamanho': 0, 'usado_em': 0})
+            grupo['arquivos'].append(caminho)
+            grupo['tamanho'] += os.path.getsize(caminho)
+            if nome.endswith(".json"): grupo['usado_em'] = os.path.getmtime(caminho)
+        except OSError:
+            continue
+    total = sum(g['tamanho'] for g in grupos.values())
+    for prefixo, grupo in sorted(grupos.items(), key=lambda item: item[1]['usado_em']):
+        if total <= LIMITE_SNAPSHOTS_BYTES: break
+        if prefixo == prefixo_atual: continue
+        for caminho in grupo['arquivos']:
+            try: os.remove(caminho)
+            except OSError: pass
+        total -= grupo['tamanho']
+
+def carregar_valoracao(conteudo, abas_desejadas=('timesheet', 'st', 'resumo'), usar_snapshot=True):
+    """
+    Lê as abas Timesheet_*, Serviços de Terceiros e Viagens e Resumo* de uma
+    planilha de Valoração (ou só as de `abas_desejadas`), abrindo o arquivo
+    uma única vez. Abas já lidas antes (mesmo conteúdo) vêm do snapshot Arrow.
+
+    Devolve um dicionário com 'timesheet', 'st' e 'resumo' (DataFrames; vazios
+    quando a aba não pôde ser lida), 'aba_timesheet', 'erros'
+    ({'timesheet' | 'st' | 'resumo': mensagem} das abas com problema) e
+    'snapshot' (True se nada precisou ser lido do xlsx).
+    """
+    chave = hash_conteudo(conteudo) if usar_snapshot else None
+    resultado, faltando = _ler_snapshot(chave, abas_desejadas) if chave else (None, list(abas_desejadas))
+    if not faltando:
+        resultado['snapshot'] = True
+        return resultado
+    lido = _ler_planilha(conteudo, faltando)
+    if chave: _gravar_snapshot(chave, lido, faltando)
+    if resultado is None:
+        resultado = lido
+    else:
+        for aba in faltando:
+            resultado[aba] = lido[aba]
+            if aba in lido['erros']: resultado['erros'][aba] = lido['erros'][aba]
+    resultado['snapshot'] = False
+    return resultado
@@ -0,0 +1,156 @@
+# ==============================================================================
+# PREENCHIMENTO DO NEWPIIT EM LOTE (LINHA DE COMANDO)
+# ==============================================================================
+# Preenche o NewPiit de várias empresas de uma vez, sem o Streamlit. Cada
+# subpasta da pasta de entrada é uma empresa (o nome da pasta é o nome da
+# empresa) e deve conter:
+#   * o NewPiit modelo (.xlsx);
+#   * a planilha de Valoração (.xlsx com "Valoração" no nome);
+#   * os TAs (.docx, em qualquer subpasta), com o nome da Linha de Pesquisa;
+#   * opcional: um .csv de ajustes de titulação (colunas ESCOLARIDADE e
+#     TITULAÇÃO).
+#
+# As empresas são processadas em paralelo, uma por processo. Na pasta de saída
+# ficam, por empresa, o NewPiit preenchido, a validação por Linha de Pesquisa,
+# a tabela de titulações e as medições de tempo e memória de cada etapa; e um
+# resumo_validacao.csv com todas as empresas.
+#
+# Código de saída: 0 se todas as Linhas de Pesquisa conferem com a aba Resumo,
+# 1 se alguma validação tem alerta, 2 se alguma empresa não pôde ser
+# processada.
+#
+# Uso: python preencher_lote.py PASTA_EMPRESAS [--saida PASTA] [--processos N]
+# ==============================================================================
+
+import argparse
+import os
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from nucleo.agregacao import tabela_escolaridade_csv
+from nucleo.extracao_ta import PROCESSOS_PADRAO
+from nucleo.instrumentacao import Instrumentacao
+from nucleo.preenchimento import nome_arquivo_saida, processar_empresa
+from nucleo.valoracao import carregar_valoracao
+
+OK, ALERTA, ERRO = 0, 1, 2
+
+
+def _normalizar(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode().lower()
+
+def arquivos_empresa(pasta):
+    """
+    {'base', 'valoracao', 'tas', 'titulacoes'} com os caminhos dos arquivos
+    da empresa. ValueError se faltar (ou sobrar) o NewPiit ou a Valoração.
+    """
+    planilhas, tas, csvs = [], [], []
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in sorted(nomes):
+            if nome.startswith('~$'): continue  # arquivo temporário do Office
+            extensao = os.path.splitext(nome)[1].lower()
+            caminho = os.path.join(raiz, nome)
+            if extensao == '.xlsx' and raiz == pasta: planilhas.append(caminho)
+            elif extensao == '.docx': tas.append(caminho)
+            elif extensao == '.csv' and raiz == pasta: csvs.append(caminho)
+    valoracoes = [p for p in planilhas if 'valoracao' in _normalizar(os.path.basename(p))]
+    bases = [p for p in planilhas if p not in valoracoes]
+    if len(valoracoes) != 1: raise ValueError(f"esperada uma planilha de Valoração (.xlsx com 'Valoração' no nome), encontradas {len(valoracoes)}")
+    if len(bases) != 1: raise ValueError(f"esperado um NewPiit (.xlsx), encontrados {len(bases)}")
+    if not tas: raise ValueError("nenhum TA (.docx) encontrado")
+    if len(csvs) > 1: raise ValueError(f"esperado no máximo um .csv de ajustes de titulação, encontrados {len(csvs)}")
+    return {'base': bases[0], 'valoracao': valoracoes[0], 'tas': sorted(tas, key=os.path.basename), 'titulacoes': csvs[0] if csvs else None}
+
+def _ler(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+def processar_pasta(pasta, pasta_saida, processos=1):
+    """
+    Processa a empresa de `pasta` e grava os resultados em `pasta_saida`.
+    Devolve {'empresa', 'arquivo', 'validacao_lp', 'mensagens', 'erro'}.
+    """
+    empresa = os.path.basename(os.path.normpath(pasta))
+    nome_empresa = empresa.replace(' ', '_')
+    mensagens = []
+    instrumentacao = Instrumentacao('Preenchimento')
+    try:
+        arquivos = arquivos_empresa(pasta)
+        with instrumentacao.etapa('carga_valoracao') as medida:
+            valoracao = carregar_valoracao(_ler(arquivos['valoracao']))
+            medida.update(linhas_timesheet=len(valoracao['timesheet']), linhas_st=len(valoracao['st']), snapshot=valoracao['snapshot'])
+        resultado = processar_empresa(
+            _ler(arquivos['base']), valoracao, [(os.path.basename(p), _ler(p)) for p in arquivos['tas']],
+            conteudo_titulacoes=_ler(arquivos['titulacoes']) if arquivos['titulacoes'] else None,
+            processos=processos, avisar=lambda nivel, texto: mensagens.append((nivel, texto)), instrumentacao=instrumentacao)
+        arquivo = os.path.join(pasta_saida, nome_arquivo_saida(empresa, os.path.basename(arquivos['base'])))
+        with open(arquivo, 'wb') as saida:
+            saida.write(resultado['newpiit'])
+        resultado['validacao_lp'].to_csv(os.path.join(pasta_saida, f"{nome_empresa}_validacao.csv"), index=False, sep=';', encoding='utf-8-sig')
+        if resultado['tabela_titulacoes'] is not None:
+            with open(os.path.join(pasta_saida, f"{nome_empresa}_titulacoes.csv"), 'wb') as saida:
+                saida.write(tabela_escolaridade_csv(resultado['tabela_titulacoes']))
+        return {'empresa': empresa, 'arquivo': arquivo, 'validacao_lp': resultado['validacao_lp'], 'mensagens': mensagens, 'erro': None}
+    except Exception as e:
+        return {'empresa': empresa, 'arquivo': None, 'validacao_lp': None, 'mensagens': mensagens, 'erro': f"{type(e).__name__}: {e}"}
+    finally:
+        with open(os.path.join(pasta_saida, f"{nome_empresa}_medicoes.json"), 'wb') as saida:
+            saida.write(instrumentacao.json_bytes())
+
+def situacao(resultado):
+    if resultado['erro']: return ERRO
+    return OK if (resultado['validacao_lp']['Situação'] == 'OK').all() else ALERTA
+
+def resumo_validacao(resultados):
+    """Uma linha por Linha de Pesquisa de cada empresa; empresas com erro aparecem com a mensagem."""
+    partes = []
+    for r in resultados:
+        if r['erro']: partes.append(pd.DataFrame([{'Empresa': r['empresa'], 'Situação': f"ERRO: {r['erro']}"}]))
+        else: partes.append(r['validacao_lp'].assign(Empresa=r['empresa']))
+    if not partes: return pd.DataFrame(columns=['Empresa', 'Situação'])
+    resumo = pd.concat(partes, ignore_index=True)
+    return resumo[['Empresa'] + [c for c in resumo.columns if c != 'Empresa']]
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Preenche o NewPiit de várias empresas (uma subpasta por empresa).")
+    parser.add_argument('pasta', help="pasta com uma subpasta por empresa")
+    parser.add_argument('--saida', default=None, help="pasta dos resultados (padrão: PASTA/saida)")
+    parser.add_argument('--processos', type=int, default=PROCESSOS_PADRAO, help=f"empresas processadas ao mesmo tempo (padrão: {PROCESSOS_PADRAO})")
+    args = parser.parse_args(argumentos)
+
+    pasta_saida = args.saida or os.path.join(args.pasta, 'saida')
+    os.makedirs(pasta_saida, exist_ok=True)
+    pastas = sorted(os.path.join(args.pasta, nome) for nome in os.listdir(args.pasta)
+                    if os.path.isdir(os.path.join(args.pasta, nome)) and os.path.abspath(os.path.join(args.pasta, nome)) != os.path.abspath(pasta_saida))
+    if not pastas:
+        print(f"Nenhuma pasta de empresa em {args.pasta}", file=sys.stderr)
+        return ERRO
+
+    processos = max(1, args.processos)
+    resultados = []
+    def relatar(r):
+        resultados.append(r)
+        rotulo = {OK: "OK", ALERTA: "ALERTA", ERRO: "ERRO"}[situacao(r)]
+        print(f"[{len(resultados)}/{len(pastas)}] {r['empresa']}: {rotulo}" + (f" - {r['erro']}" if r['erro'] else f" -> {r['arquivo']}"), flush=True)
+        for nivel, texto in r['mensagens']:
+            if nivel in ('warning', 'error'): print(f"    {nivel}: {texto}", flush=True)
+    # Com uma empresa só, os processos vão para a leitura dos TAs
+    if len(pastas) == 1 or processos == 1:
+        for pasta in pastas: relatar(processar_pasta(pasta, pasta_saida, processos))
+    else:
+        with ProcessPoolExecutor(max_workers=min(processos, len(pastas))) as pool:
+            futuros = [pool.submit(processar_pasta, pasta, pasta_saida) for pasta in pastas]
+            for futuro in as_completed(futuros): relatar(futuro.result())
+
+    resultados.sort(key=lambda r: r['empresa'])
+    caminho_resumo = os.path.join(pasta_saida, 'resumo_validacao.csv')
+    resumo_validacao(resultados).to_csv(caminho_resumo, index=False, sep=';', encoding='utf-8-sig')
+    codigos = [situacao(r) for r in resultados]
+    print(f"\n{codigos.count(OK)} OK, {codigos.count(ALERTA)} com alerta, {codigos.count(ERRO)} com erro. Resumo: {caminho_resumo}")
+    return max(codigos)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
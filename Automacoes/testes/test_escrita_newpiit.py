@@ -0,0 +1,151 @@
+# ==============================================================================
+# TESTE DA ESCRITA DO NEWPIIT
+# ==============================================================================
+# Compara preencher_newpiit (nucleo/escrita_newpiit.py) com o preenchimento
+# antigo pelo openpyxl (clear_and_write, copiado abaixo como referência) no
+# NewPiit modelo de benchmarks/geradores.py: valores e estilos de todas as
+# células, mesclagens, validações e formatação condicional de todas as abas.
+#
+# Uso (na pasta Automacoes): python -m unittest discover -s testes
+# ==============================================================================
+
+import io
+import os
+import sys
+import unittest
+from copy import copy
+
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.geradores import CABECALHO_GERAL, CABECALHO_RH, gerar_newpiit
+from nucleo.escrita_newpiit import preencher_newpiit
+from nucleo.planilha import CARACTERES_ILEGAIS
+
+PROJETO = CABECALHO_RH[1]
+
+
+def clear_and_write_antigo(base, dados_por_aba):
+    """O preenchimento da página antes de nucleo/escrita_newpiit.py, sem mudanças."""
+    wb = openpyxl.load_workbook(io.BytesIO(base))
+    def clear_and_write(sheet_name, data, header_row=10, start_row=11):
+        if data and sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+            template_styles = [cell._style for cell in (ws[start_row] if ws.max_row >= start_row else ws[header_row])]
+            if ws.max_row >= start_row:
+                for row in ws.iter_rows(min_row=start_row, max_row=ws.max_row):
+                    for cell in row: cell.value = None
+            df = pd.DataFrame(data)
+            header = [str(cell.value).strip() for cell in ws[header_row]]
+            df.columns = [str(col).strip() for col in df.columns]
+            df_ordered = df.reindex(columns=header).fillna('')
+            for r_idx, row_data in enumerate(df_ordered.itertuples(index=False), start_row):
+                for c_idx, value in enumerate(row_data, 1):
+                    cell = ws.cell(row=r_idx, column=c_idx)
+                    if c_idx - 1 < len(template_styles): cell._style = template_styles[c_idx - 1]
+                    cell.value = value
+    for nome_aba, dados in dados_por_aba.items(): clear_and_write(nome_aba, dados)
+    saida = io.BytesIO()
+    wb.save(saida)
+    return saida.getvalue()
+
+
+def modelo(linhas_antigas):
+    """NewPiit gerado, com estilos variados na linha 11 (quando existe) para conferir a cópia dos estilos."""
+    wb = openpyxl.load_workbook(io.BytesIO(gerar_newpiit(linhas_antigas)))
+    if linhas_antigas:
+        for nome in ("GERAL", "DISPÊNDIOS ST", "RH"):
+            ws = wb[nome]
+            ws.cell(11, 2).fill = PatternFill("solid", fgColor="DDEEFF")
+            ws.cell(11, 3).alignment = Alignment(wrap_text=True)
+            ws.cell(11, 4).font = Font(italic=True)
+            ws.cell(11, ws.max_column).number_format = "#,##0.00"
+    saida = io.BytesIO()
+    wb.save(saida)
+    return saida.getvalue()
+
+
+def dados(linhas):
+    geral = [{'#': i + 1, CABECALHO_GERAL[1]: f"Projeto {i}", CABECALHO_GERAL[2]: f"Descrição {i}", 'TRL Inicial': [3, '', 4.5][i % 3],
+              'Coluna que não existe': i} for i in range(linhas)]
+    st = [{'#': i + 1, PROJETO: f"Projeto {i % 3}", 'TIPO': 'ME', 'CNPJ/CPF': 12345678000100 + i, 'Valor Total': 1000.25 * i} for i in range(linhas)]
+    rh = [{'#': i + 1, PROJETO: f"Projeto {i % 3}", 'CPF': '123.456.789-00' if i % 2 else 12345678900 + i, 'NOME': f"Nome {i}",
+           'TITULAÇÃO': 'Mestre', 'Total Horas (Anual)': 1234.5 / (i + 1), 'Valor (R$)': True if i == 1 else 99.9 * i} for i in range(linhas)]
+    return {'GERAL': geral, 'DISPÊNDIOS ST': st, 'RH': rh, 'Aba que não existe': [{'a': 1}]}
+
+
+def estilo(celula):
+    # copy tira os objetos de estilo do StyleProxy, que não compara por valor
+    return tuple(copy(proxy) for proxy in (celula.font, celula.fill, celula.border, celula.alignment, celula.protection)) + (celula.number_format,)
+
+
+class TestePreencherNewPiit(unittest.TestCase):
+
+    def assertMesmaPlanilha(self, esperado, obtido):
+        esperado, obtido = openpyxl.load_workbook(io.BytesIO(esperado)), openpyxl.load_workbook(io.BytesIO(obtido))
+        self.assertEqual(esperado.sheetnames, obtido.sheetnames)
+        for nome in esperado.sheetnames:
+            a, b = esperado[nome], obtido[nome]
+            self.assertEqual((a.max_row, a.max_column), (b.max_row, b.max_column), nome)
+            for linha_a, linha_b in zip(a.iter_rows(), b.iter_rows()):
+                for celula_a, celula_b in zip(linha_a, linha_b):
+                    onde = f"{nome}!{celula_a.coordinate}"
+                    valor_a, valor_b = celula_a.value, celula_b.value
+                    if isinstance(valor_a, float) and isinstance(valor_b, float):
+                        # O openpyxl grava 16 algarismos; a escrita nova grava o float exato
+                        self.assertAlmostEqual(valor_a, valor_b, delta=1e-15 * abs(valor_a), msg=onde)
+                    else:
+                        # O openpyxl grava '' como célula vazia
+                        self.assertEqual(None if valor_a == '' else valor_a, valor_b, onde)
+                    self.assertEqual(estilo(celula_a), estilo(celula_b), onde)
+            self.assertEqual(str(a.merged_cells), str(b.merged_cells), nome)
+            self.assertEqual([str(v.sqref) for v in a.data_validations.dataValidation], [str(v.sqref) for v in b.data_validations.dataValidation], nome)
+            self.assertEqual([str(f.sqref) for f in a.conditional_formatting], [str(f.sqref) for f in b.conditional_formatting], nome)
+
+    def comparar(self, base, dados_por_aba):
+        self.assertMesmaPlanilha(clear_and_write_antigo(base, dados_por_aba), preencher_newpiit(base, dados_por_aba))
+
+    def test_menos_linhas_que_o_modelo(self):
+        # As linhas antigas que sobram (e a fórmula abaixo delas) são apagadas, mantendo a formatação
+        base = modelo(15)
+        self.comparar(base, dados(5))
+        ws = openpyxl.load_workbook(io.BytesIO(preencher_newpiit(base, dados(5))))["RH"]
+        self.assertIsNone(ws.cell(28, 1).value)
+
+    def test_mais_linhas_que_o_modelo(self):
+        self.comparar(modelo(15), dados(40))
+
+    def test_modelo_sem_linhas_antigas(self):
+        # Sem linha 11, os estilos vêm do cabeçalho; a fórmula da linha 13 é sobrescrita
+        self.comparar(modelo(0), dados(8))
+
+    def test_lista_vazia_nao_mexe_na_aba(self):
+        base = modelo(15)
+        por_aba = dados(5)
+        por_aba['RH'] = []
+        self.comparar(base, por_aba)
+        self.assertMesmaPlanilha(base, preencher_newpiit(base, {'GERAL': [], 'DISPÊNDIOS ST': [], 'RH': []}))
+
+    def test_textos_com_caracteres_ilegais_e_espacos(self):
+        base = modelo(15)
+        por_aba = dados(4)
+        por_aba['GERAL'][0][CABECALHO_GERAL[2]] = "antes\x01depois\x1f"
+        por_aba['GERAL'][1][CABECALHO_GERAL[2]] = "  espaços nas pontas  "
+        por_aba['GERAL'][2][CABECALHO_GERAL[2]] = "\tlinha 1\nlinha 2 "
+        por_aba['RH'][0]['NOME'] = " Nome com espaço"
+        # O openpyxl recusava os caracteres de controle; a escrita nova os retira
+        with self.assertRaises(IllegalCharacterError):
+            clear_and_write_antigo(base, por_aba)
+        sem_ilegais = {aba: [{k: CARACTERES_ILEGAIS.sub('', v) if isinstance(v, str) else v for k, v in linha.items()} for linha in linhas]
+                       for aba, linhas in por_aba.items()}
+        self.assertMesmaPlanilha(clear_and_write_antigo(base, sem_ilegais), preencher_newpiit(base, por_aba))
+        geral = openpyxl.load_workbook(io.BytesIO(preencher_newpiit(base, por_aba)))["GERAL"]
+        self.assertEqual([geral.cell(linha, 3).value for linha in (11, 12, 13)], ["antesdepois", "  espaços nas pontas  ", "\tlinha 1\nlinha 2 "])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+# ==============================================================================
+# TESTE DO CLIENTE EM LOTE DO GEMINI
+# ==============================================================================
+# Sobe um servidor HTTP local que imita o endpoint generateContent e confere o
+# ClienteLote (nucleo/gemini.py) contra ele: ordem dos resultados com lotes em
+# paralelo, nova tentativa com espera nos erros 429/5xx, lote que falha de vez
+# ficando com None e cancelamento dos lotes pendentes num erro que não é
+# temporário. Não usa a API de verdade nem o cache em disco.
+#
+# Uso (na pasta Automacoes): python -m unittest discover -s testes
+# ==============================================================================
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo import gemini
+
+INSTRUCOES = "Dobre o valor de x em cada item."
+
+
+class ServidorFalso:
+    """
+    Servidor local compatível com o generateContent. `responder(tentativa,
+    itens)` decide a resposta de cada requisição e devolve (status, cabeçalhos,
+    corpo) ou None para responder com o dobro de cada x. `tentativa` conta as
+    requisições já recebidas para o mesmo lote (identificado pelo primeiro x).
+    """
+
+    def __init__(self, responder=None, demora=lambda itens: 0.0):
+        self.responder = responder or (lambda tentativa, itens: None)
+        self.demora = demora
+        self.requisicoes = []  # (primeiro x, instante)
+        self.ativos = self.max_ativos = 0
+        self._trava = threading.Lock()
+        servidor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                servidor._responder(self, corpo['contents'][0]['parts'][0]['text'])
+
+        self._http = ThreadingHTTPServer(('127.0.0.1', 0), Tratador)
+        self.url = f"http://127.0.0.1:{self._http.server_port}/v1beta"
+
+    def __enter__(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *erro):
+        self._http.shutdown()
+        self._http.server_close()
+
+    def tentativas(self, primeiro):
+        return [instante for x, instante in self.requisicoes if x == primeiro]
+
+    def _responder(self, tratador, prompt):
+        itens = json.loads(re.search(r'em JSON\):\n(.*)\n\nResponda', prompt, re.S).group(1))
+        with self._trava:
+            tentativa = len(self.tentativas(itens[0]['x'])) + 1
+            self.requisicoes.append((itens[0]['x'], time.monotonic()))
+            self.ativos += 1
+            self.max_ativos = max(self.max_ativos, self.ativos)
+        try:
+            time.sleep(self.demora(itens))
+            resposta = self.responder(tentativa, itens)
+        finally:
+            with self._trava: self.ativos -= 1
+        if resposta is None:
+            texto = '```json\n' + json.dumps([item['x'] * 2 for item in itens]) + '\n```'
+            corpo = json.dumps({'candidates': [{'content': {'parts': [{'text': texto}]}}]})
+            resposta = (200, {'Content-Type': 'application/json'}, corpo)
+        status, cabecalhos, corpo = resposta
+        tratador.send_response(status)
+        for nome, valor in cabecalhos.items(): tratador.send_header(nome, valor)
+        tratador.end_headers()
+        tratador.wfile.write(corpo.encode('utf-8'))
+
+
+class TesteClienteLote(unittest.TestCase):
+
+    def setUp(self):
+        self.itens = [{'x': i, 'texto': 'a' * (i % 7)} for i in range(200)]
+        self.avisos = []
+
+    def avisar(self, nivel, texto):
+        self.avisos.append((nivel, texto))
+
+    def processar(self, servidor, **opcoes):
+        opcoes = {'concorrencia': 4, 'requisicoes_por_minuto': 0, 'itens_por_lote': 20, 'espera_inicial': 0.05,
+                  'usar_cache': False, **opcoes}
+        cliente = gemini.ClienteLote(gemini.TransporteHTTP('chave', url_base=servidor.url), **opcoes)
+        return cliente.processar(INSTRUCOES, self.itens, avisar=self.avisar)
+
+    def test_resultados_na_ordem_dos_itens(self):
+        # Os primeiros lotes demoram mais, então as respostas chegam fora de ordem
+        with ServidorFalso(demora=lambda itens: 0.2 - itens[0]['x'] / 1000) as servidor:
+            resultados = self.processar(servidor)
+        self.assertEqual(resultados, [item['x'] * 2 for item in self.itens])
+        self.assertEqual(len(servidor.requisicoes), 10)
+        self.assertGreater(servidor.max_ativos, 1)
+        self.assertEqual(self.avisos, [])
+
+    def test_repete_429_e_5xx_com_espera(self):
+        def responder(tentativa, itens):
+            if tentativa == 1: return (429, {'Retry-After': '0.2'}, 'quota')
+            if tentativa == 2: return (503, {}, 'indisponível')
+            return None
+
+        with ServidorFalso(responder) as servidor:
+            resultados = self.processar(servidor, espera_inicial=0.1)
+        self.assertEqual(resultados, [item['x'] * 2 for item in self.itens])
+        self.assertEqual(len(servidor.requisicoes), 30)
+        for primeiro in range(0, 200, 20):
+            primeira, segunda, terceira = servidor.tentativas(primeiro)
+            self.assertGreaterEqual(segunda - primeira, 0.2)  # Retry-After
+            self.assertGreaterEqual(terceira - segunda, 0.1)  # espera exponencial
+        self.assertEqual(self.avisos, [])
+
+    def test_lote_que_falha_fica_com_none(self):
+        def responder(tentativa, itens):
+            return (503, {}, 'indisponível') if itens[0]['x'] == 20 else None
+
+        with ServidorFalso(responder) as servidor:
+            resultados = self.processar(servidor, tentativas=3)
+        self.assertEqual(resultados[20:40], [None] * 20)
+        self.assertEqual(resultados[:20] + resultados[40:], [item['x'] * 2 for item in self.itens[:20] + self.itens[40:]])
+        self.assertEqual(len(servidor.tentativas(20)), 3)
+        self.assertEqual(len(self.avisos), 1)
+        self.assertIn("Lote 2 de 10", self.avisos[0][1])
+
+    def test_erro_permanente_cancela_os_lotes_pendentes(self):
+        with ServidorFalso(lambda tentativa, itens: (400, {}, 'API key not valid')) as servidor:
+            resultados = self.processar(servidor, concorrencia=1)
+        self.assertEqual(resultados, [None] * 200)
+        self.assertLessEqual(len(servidor.requisicoes), 2)  # o lote seguinte pode já ter saído
+        self.assertEqual(len(servidor.tentativas(0)), 1)  # erro permanente não é repetido
+        self.assertIn("HTTP 400", self.avisos[0][1])
+        self.assertIn("não foram enviados", self.avisos[-1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
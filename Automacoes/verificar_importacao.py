@@ -0,0 +1,102 @@
+# ==============================================================================
+# VERIFICAÇÃO DO TEMPO DE IMPORTAÇÃO
+# ==============================================================================
+# As páginas e o Menu devem abrir sem carregar as bibliotecas pesadas
+# (python-docx, openpyxl, Gemini, thefuzz, pypandoc), que só são importadas
+# dentro das funções do nucleo que as usam. Este script confere isso:
+#   * cada módulo do nucleo é importado num interpretador novo, com o pandas,
+#     o numpy e o streamlit já carregados (como numa página), e não pode
+#     carregar nenhuma biblioteca pesada nem passar do orçamento de tempo;
+#   * o Menu e as páginas não podem importar bibliotecas pesadas no nível do
+#     módulo.
+#
+# O orçamento por módulo é de 50 ms (variável de ambiente
+# PIERA_ORCAMENTO_IMPORTACAO_MS para mudar). Código de saída 1 se algo
+# falhar.
+#
+# Uso: python verificar_importacao.py
+# ==============================================================================
+
+import ast
+import json
+import os
+import subprocess
+import sys
+
+PESADOS = ('docx', 'openpyxl', 'google.generativeai', 'thefuzz', 'rapidfuzz', 'pypandoc', 'Levenshtein')
+PRE_CARREGADOS = ('pandas', 'numpy', 'streamlit')
+ORCAMENTO_MS = float(os.environ.get('PIERA_ORCAMENTO_IMPORTACAO_MS', 50))
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+# Roda no interpretador novo: importa o módulo e devolve o tempo e os pesados carregados
+MEDICAO = """
+import importlib, json, sys, time
+for nome in {pre!r}:
+    try: importlib.import_module(nome)
+    except ImportError: pass
+inicio = time.perf_counter()
+importlib.import_module({modulo!r})
+ms = (time.perf_counter() - inicio) * 1000
+pesados = [p for p in {pesados!r} if p in sys.modules]
+print(json.dumps({{'ms': ms, 'pesados': pesados}}))
+"""
+
+
+def _pesado(nome):
+    return any(nome == p or nome.startswith(p + '.') for p in PESADOS)
+
+def modulos_nucleo():
+    pasta = os.path.join(PASTA, 'nucleo')
+    return sorted(f"nucleo.{os.path.splitext(n)[0]}" for n in os.listdir(pasta) if n.endswith('.py') and n != '__init__.py')
+
+def medir_modulo(modulo):
+    """{'ms', 'pesados'} da importação de `modulo` num interpretador novo."""
+    codigo = MEDICAO.format(pre=PRE_CARREGADOS, modulo=modulo, pesados=PESADOS)
+    processo = subprocess.run([sys.executable, '-c', codigo], cwd=PASTA, capture_output=True, text=True)
+    if processo.returncode != 0: raise RuntimeError(processo.stderr.strip().splitlines()[-1])
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+def importacoes_pesadas(caminho):
+    """[(linha, módulo)] das importações pesadas no nível do módulo (fora de funções e classes)."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read(), filename=caminho)
+    encontradas, pendentes = [], list(arvore.body)
+    while pendentes:
+        no = pendentes.pop()
+        if isinstance(no, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)): continue
+        if isinstance(no, ast.Import): encontradas += [(no.lineno, a.name) for a in no.names if _pesado(a.name)]
+        elif isinstance(no, ast.ImportFrom) and no.module and _pesado(no.module): encontradas.append((no.lineno, no.module))
+        else: pendentes.extend(ast.iter_child_nodes(no))
+    return sorted(encontradas)
+
+
+def main():
+    falhas = 0
+    print(f"Módulos do nucleo (orçamento: {ORCAMENTO_MS:.0f} ms, com {', '.join(PRE_CARREGADOS)} já carregados):")
+    for modulo in modulos_nucleo():
+        try: medida = medir_modulo(modulo)
+        except RuntimeError as e:
+            print(f"  ERRO   {modulo}: {e}"); falhas += 1; continue
+        problemas = []
+        if medida['ms'] > ORCAMENTO_MS: problemas.append("acima do orçamento")
+        if medida['pesados']: problemas.append(f"carrega {', '.join(medida['pesados'])}")
+        falhas += bool(problemas)
+        print(f"  {'FALHA' if problemas else 'OK':6} {modulo}: {medida['ms']:.1f} ms" + (f" ({'; '.join(problemas)})" if problemas else ""))
+
+    print("Menu e páginas (importações pesadas no nível do módulo):")
+    pasta_paginas = os.path.join(PASTA, 'pages')
+    scripts = [os.path.join(PASTA, 'Menu.py'), os.path.join(PASTA, 'preencher_lote.py')]
+    scripts += sorted(os.path.join(pasta_paginas, n) for n in os.listdir(pasta_paginas) if n.endswith('.py'))
+    for caminho in scripts:
+        encontradas = importacoes_pesadas(caminho)
+        falhas += bool(encontradas)
+        nome = os.path.relpath(caminho, PASTA)
+        if encontradas: print(f"  FALHA  {nome}: " + ", ".join(f"{m} (linha {n})" for n, m in encontradas))
+        else: print(f"  OK     {nome}")
+
+    print(f"\n{falhas} falha(s)." if falhas else "\nTudo dentro do orçamento.")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())